@@ -0,0 +1,8 @@
+"""Offline benchmarks for sopel-lichess.
+
+Run a suite from the project's root directory, for example::
+
+    $ python -m benchmarks.parsers
+
+See :mod:`benchmarks.harness` for the options shared by every suite.
+"""
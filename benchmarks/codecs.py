@@ -0,0 +1,45 @@
+"""Benchmarks of :mod:`sopel_lichess.codec`.
+
+Each case decodes the same payloads with one JSON library, so the fast
+libraries can be compared to the stdlib. Libraries that are not installed
+are skipped.
+
+Usage::
+
+    $ python -m benchmarks.codecs                 # compare to the baseline
+    $ python -m benchmarks.codecs --save          # save a new baseline
+    $ python -m benchmarks.codecs --check-speed   # also check relative speeds
+"""
+from __future__ import generator_stop
+
+import json
+import sys
+from typing import List
+
+from sopel_lichess import codec
+
+from . import corpus, harness
+
+
+def cases(size: int, seed: int) -> List[harness.Case]:
+    """Get the cases of the codecs suite."""
+    games = corpus.generate('games', size, seed)
+    game_documents = [json.dumps(game).encode('utf-8') for game in games]
+
+    result = []
+    for name in (codec.STDLIB,) + codec.FAST_LIBRARIES:
+        if not codec.is_available(name):
+            continue
+
+        json_codec = codec.get_codec(name)
+        result.extend([
+            harness.Case(
+                'loads[game,%s]' % name, json_codec.loads, game_documents),
+            harness.Case('dumps[game,%s]' % name, json_codec.dumps, games),
+        ])
+
+    return result
+
+
+if __name__ == '__main__':
+    sys.exit(harness.main('codecs', cases))
@@ -0,0 +1,195 @@
+"""Generator of synthetic Lichess payloads.
+
+The payloads mimic the Lichess API: accounts from ``/api/user/{username}``
+and games from ``/game/export/{gameId}``, with titled players, variants,
+anonymous and AI players, missing fields, and long move strings. The same
+seed always generates the same corpus, so benchmarks can be compared.
+"""
+from __future__ import generator_stop
+
+import random
+import string
+from typing import List, Optional
+
+TITLES = ('GM', 'IM', 'FM', 'CM', 'NM', 'WGM', 'WIM', 'WFM', 'LM', 'BOT')
+SPEEDS = ('ultraBullet', 'bullet', 'blitz', 'rapid', 'classical',
+          'correspondence')
+VARIANTS = ('standard', 'chess960', 'crazyhouse', 'antichess', 'atomic',
+            'horde', 'kingOfTheHill', 'racingKings', 'threeCheck',
+            'fromPosition')
+STATUSES = ('mate', 'resign', 'stalemate', 'timeout', 'draw', 'outoftime',
+            'cheat', 'noStart', 'variantEnd', 'started', 'created')
+OPENINGS = (
+    ('B10', 'Caro-Kann Defense: Goldman Variation'),
+    ('C65', 'Ruy Lopez: Berlin Defense'),
+    ('D37', "Queen's Gambit Declined: Harrwitz Attack"),
+    ('E60', "King's Indian Defense: Normal Variation, "
+            "King's Knight Variation"),
+    ('A00', 'Van Geet Opening'),
+    ('B90', 'Sicilian Defense: Najdorf Variation, English Attack'),
+)
+PIECES = ('', '', '', 'N', 'B', 'R', 'Q', 'K')
+FILES = 'abcdefgh'
+RANKS = '12345678'
+
+
+class Corpus:
+    """Synthetic payloads generated from a ``seed``.
+
+    :param seed: seed of the random generator
+    """
+    def __init__(self, seed: int = 42) -> None:
+        self.random = random.Random(seed)
+
+    def maybe(self, probability: float) -> bool:
+        """Tell if an optional field is present."""
+        return self.random.random() < probability
+
+    def username(self) -> str:
+        """Generate a username."""
+        alphabet = string.ascii_letters + string.digits + '_-'
+        return ''.join(
+            self.random.choice(alphabet)
+            for _ in range(self.random.randint(3, 20)))
+
+    def move(self) -> str:
+        """Generate a SAN-like move."""
+        if self.maybe(0.02):
+            return self.random.choice(('O-O', 'O-O-O'))
+
+        move = self.random.choice(PIECES)
+        if self.maybe(0.2):
+            move += 'x'
+        move += self.random.choice(FILES) + self.random.choice(RANKS)
+        if self.maybe(0.1):
+            move += '+'
+        return move
+
+    def moves(self) -> str:
+        """Generate the moves of a game, from a few to a few hundreds."""
+        count = int(self.random.expovariate(1 / 80)) + 1
+        return ' '.join(self.move() for _ in range(count))
+
+    def player(self) -> dict:
+        """Generate a player's account data."""
+        data: dict = {
+            'id': '',
+            'username': self.username(),
+        }
+        data['id'] = data['username'].lower()
+
+        if self.maybe(0.1):
+            data['title'] = self.random.choice(TITLES)
+
+        if self.maybe(0.95):
+            games = self.random.randint(0, 50000)
+            rated = self.random.randint(0, games)
+            data['count'] = {
+                'all': games,
+                'rated': rated,
+                'win': self.random.randint(0, games),
+            }
+
+        if self.maybe(0.9):
+            data['nbFollowing'] = self.random.randint(0, 500)
+            data['nbFollowers'] = self.random.randint(0, 100000)
+
+        if self.maybe(0.2):
+            data['playing'] = 'https://lichess.org/%s/white' % self.game_id()
+
+        return data
+
+    def game_id(self) -> str:
+        """Generate a game ID."""
+        alphabet = string.ascii_letters + string.digits
+        return ''.join(self.random.choice(alphabet) for _ in range(8))
+
+    def game_player(self) -> dict:
+        """Generate a game's player: user, AI, or anonymous."""
+        if self.maybe(0.05):
+            return {'aiLevel': self.random.randint(1, 8)}
+        if self.maybe(0.05):
+            return {}
+
+        name = self.username()
+        user = {'id': name.lower(), 'name': name}
+        if self.maybe(0.1):
+            user['title'] = self.random.choice(TITLES)
+
+        data: dict = {
+            'user': user,
+            'rating': self.random.randint(600, 3300),
+        }
+        if self.maybe(0.8):
+            data['ratingDiff'] = self.random.randint(-30, 30)
+        if self.maybe(0.05):
+            data['provisional'] = True
+        return data
+
+    def game(self) -> dict:
+        """Generate a game's data."""
+        created_at = self.random.randint(1300000000000, 1700000000000)
+        data: dict = {
+            'id': self.game_id(),
+            'rated': self.maybe(0.7),
+            'createdAt': created_at,
+            'lastMoveAt': created_at + self.random.randint(0, 3600000),
+            'status': self.random.choice(STATUSES),
+            'players': {
+                'white': self.game_player(),
+                'black': self.game_player(),
+            },
+        }
+
+        if self.maybe(0.95):
+            speed = self.random.choice(SPEEDS)
+            data['speed'] = data['perf'] = speed
+        if self.maybe(0.95):
+            data['variant'] = self.random.choice(VARIANTS)
+        if data['status'] not in ('draw', 'stalemate', 'started', 'created'):
+            data['winner'] = self.random.choice(('white', 'black'))
+        if self.maybe(0.7):
+            eco, name = self.random.choice(OPENINGS)
+            data['opening'] = {
+                'eco': eco,
+                'name': name,
+                'ply': self.random.randint(1, 20),
+            }
+        if self.maybe(0.9):
+            data['moves'] = self.moves()
+        if self.maybe(0.8):
+            initial = self.random.choice((15, 60, 180, 300, 600, 900, 1800))
+            data['clock'] = {
+                'initial': initial,
+                'increment': self.random.choice((0, 1, 2, 3, 5, 10)),
+                'totalTime': initial + 40 * 2,
+            }
+
+        return data
+
+    def players(self, size: int) -> List[dict]:
+        """Generate ``size`` players' account data."""
+        return [self.player() for _ in range(size)]
+
+    def games(self, size: int) -> List[dict]:
+        """Generate ``size`` games' data."""
+        return [self.game() for _ in range(size)]
+
+
+def generate(
+    kind: str,
+    size: int,
+    seed: Optional[int] = None,
+) -> List[dict]:
+    """Generate a corpus of ``size`` payloads of a ``kind``.
+
+    :param kind: ``players`` or ``games``
+    :param size: number of payloads
+    :param seed: optional seed of the random generator
+    """
+    corpus = Corpus(42 if seed is None else seed)
+    if kind == 'players':
+        return corpus.players(size)
+    if kind == 'games':
+        return corpus.games(size)
+    raise ValueError('Unknown kind of payloads: %r' % kind)
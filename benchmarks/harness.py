@@ -0,0 +1,318 @@
+"""Harness shared by the benchmark suites.
+
+A suite is a list of :class:`Case`: each case calls a function with every
+input of a corpus, and is measured for speed (calls per second) and for
+memory (bytes and blocks allocated per call, with :mod:`tracemalloc`).
+
+Results can be saved as a baseline, and later runs compared to it: a run
+fails when a case allocates more than its baseline allows. Absolute speed
+depends on the machine, so it is never saved: a baseline only keeps each
+case's speed relative to the suite's first case (its reference), measured
+in the same run, and that relative speed is only checked on demand.
+"""
+from __future__ import generator_stop
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+"""Directory of the saved baselines, one JSON file per suite."""
+DEFAULT_SPEED_TOLERANCE = 0.3
+"""Default tolerated slowdown, as a ratio of the baseline's relative speed.
+"""
+DEFAULT_ALLOC_TOLERANCE = 0.1
+"""Default tolerated extra allocations, as a ratio of the baseline's."""
+
+Result = Dict[str, float]
+"""Measures of a case: ``ops_per_sec``, ``relative_speed``, ``alloc_bytes``,
+and ``alloc_blocks``."""
+SAVED_MEASURES = ('relative_speed', 'alloc_bytes', 'alloc_blocks')
+"""Measures saved in a baseline: they don't depend on the machine's speed."""
+
+
+class Case(NamedTuple):
+    """Benchmark case: a function called with each input of a corpus."""
+    name: str
+    """Name of the case, unique in its suite."""
+    func: Callable[[Any], Any]
+    """Function to measure, called with one input at a time."""
+    inputs: Sequence[Any]
+    """Inputs of the function."""
+
+
+def measure_speed(
+    case: Case,
+    *,
+    repeat: int = 5,
+    min_time: float = 0.2,
+) -> float:
+    """Measure the number of calls per second of a ``case``.
+
+    The corpus is run as many times as needed to last ``min_time`` seconds,
+    and the best of ``repeat`` runs is kept.
+    """
+    func, inputs = case.func, case.inputs
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            for item in inputs:
+                func(item)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            for item in inputs:
+                func(item)
+        best = min(best, time.perf_counter() - start)
+
+    return loops * len(inputs) / best
+
+
+def measure_allocations(case: Case) -> Dict[str, float]:
+    """Measure the memory allocated by each call of a ``case``.
+
+    :return: a dict with ``alloc_bytes``, the mean peak of memory allocated
+             during a call, and ``alloc_blocks``, the mean number of memory
+             blocks still allocated after a call (such as its result)
+    """
+    func, inputs = case.func, case.inputs
+    results: List[Any] = [None] * len(inputs)
+    peak_bytes = 0
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        for index, item in enumerate(inputs):
+            current = tracemalloc.get_traced_memory()[0]
+            _reset_peak()
+            results[index] = func(item)
+            peak_bytes += tracemalloc.get_traced_memory()[1] - current
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    blocks = sum(
+        stat.count_diff
+        for stat in after.compare_to(before, 'filename')
+        if stat.count_diff > 0
+        and stat.traceback[0].filename != tracemalloc.__file__)
+
+    return {
+        'alloc_bytes': peak_bytes / len(inputs),
+        'alloc_blocks': blocks / len(inputs),
+    }
+
+
+def _reset_peak() -> None:
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:  # pragma: no cover
+        # Python < 3.9: restarting clears the peak, and the traces
+        tracemalloc.clear_traces()
+
+
+def run(
+    cases: Sequence[Case],
+    *,
+    repeat: int = 5,
+    min_time: float = 0.2,
+) -> Dict[str, Result]:
+    """Measure every case of a suite.
+
+    :return: a dict of results by case's name
+
+    The ``relative_speed`` of each case is its speed divided by the speed of
+    the first case, the suite's reference.
+    """
+    results = {}
+    reference = None
+    for case in cases:
+        ops_per_sec = measure_speed(case, repeat=repeat, min_time=min_time)
+        if reference is None:
+            reference = ops_per_sec
+        result = {
+            'ops_per_sec': ops_per_sec,
+            'relative_speed': ops_per_sec / reference,
+        }
+        result.update(measure_allocations(case))
+        results[case.name] = result
+    return results
+
+
+def compare(
+    results: Dict[str, Result],
+    baseline: Dict[str, Result],
+    *,
+    check_speed: bool = False,
+    speed_tolerance: float = DEFAULT_SPEED_TOLERANCE,
+    alloc_tolerance: float = DEFAULT_ALLOC_TOLERANCE,
+) -> List[str]:
+    """Compare results to a baseline.
+
+    :param check_speed: also check each case's speed relative to the
+                        suite's reference case
+    :return: a message for each regression; empty if there is none
+
+    Cases missing from the baseline are ignored.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+
+        if check_speed and 'relative_speed' in expected:
+            min_speed = expected['relative_speed'] * (1 - speed_tolerance)
+            if result['relative_speed'] < min_speed:
+                regressions.append(
+                    '%s: %.2fx the reference speed, expected at least %.2fx'
+                    % (name, result['relative_speed'], min_speed))
+
+        for key in ('alloc_bytes', 'alloc_blocks'):
+            # a little slack for cases allocating almost nothing
+            max_alloc = expected[key] * (1 + alloc_tolerance) + 1
+            if result[key] > max_alloc:
+                regressions.append(
+                    '%s: %.1f %s per call, expected at most %.1f'
+                    % (name, result[key], key, max_alloc))
+
+    return regressions
+
+
+def load_baseline(filename: str) -> Optional[Dict[str, Result]]:
+    """Load a baseline saved with :func:`save_baseline`, if any."""
+    if not os.path.exists(filename):
+        return None
+
+    with open(filename, encoding='utf-8') as fd:
+        return json.load(fd)['cases']
+
+
+def save_baseline(filename: str, results: Dict[str, Result]) -> None:
+    """Save results as a baseline."""
+    with open(filename, 'w', encoding='utf-8') as fd:
+        json.dump({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cases': {
+                name: {
+                    key: round(result[key], 2)
+                    for key in SAVED_MEASURES
+                }
+                for name, result in results.items()
+            },
+        }, fd, indent=2, sort_keys=True)
+        fd.write('\n')
+
+
+def report(
+    results: Dict[str, Result],
+    baseline: Optional[Dict[str, Result]] = None,
+) -> str:
+    """Format results as a table, with the change of their relative speed
+    from a baseline."""
+    lines = ['%-32s %14s %9s %8s %12s %12s' % (
+        'case', 'ops/sec', 'relative', 'change', 'bytes/call', 'blocks/call')]
+    for name, result in results.items():
+        change = ''
+        expected = (baseline or {}).get(name)
+        if expected and expected.get('relative_speed'):
+            change = '%+.0f%%' % (100 * (
+                result['relative_speed'] / expected['relative_speed'] - 1))
+        lines.append('%-32s %14.0f %8.2fx %8s %12.1f %12.1f' % (
+            name,
+            result['ops_per_sec'],
+            result['relative_speed'],
+            change,
+            result['alloc_bytes'],
+            result['alloc_blocks'],
+        ))
+    return '\n'.join(lines)
+
+
+def main(
+    suite: str,
+    cases: Callable[[int, int], Sequence[Case]],
+    argv: Optional[Sequence[str]] = None,
+) -> int:
+    """Run a suite from the command line.
+
+    :param suite: the suite's name, used for its baseline's filename
+    :param cases: function returning the suite's cases for a corpus size
+                  and a seed
+    :param argv: command line arguments
+    :return: the exit code: ``1`` if a regression is found, ``0`` otherwise
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.%s' % suite,
+        description='Run the %s benchmarks.' % suite)
+    parser.add_argument(
+        '--size', type=int, default=1000,
+        help='number of payloads in the corpus (default: %(default)s)')
+    parser.add_argument(
+        '--seed', type=int, default=42,
+        help='seed of the corpus (default: %(default)s)')
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help='number of timed runs (default: %(default)s)')
+    parser.add_argument(
+        '--min-time', type=float, default=0.2,
+        help='minimum time in seconds of a timed run (default: %(default)s)')
+    parser.add_argument(
+        '--baseline', default=os.path.join(BASELINES_DIR, suite + '.json'),
+        help='baseline file (default: %(default)s)')
+    parser.add_argument(
+        '--save', action='store_true',
+        help='save the results as the new baseline')
+    parser.add_argument(
+        '--check-speed', action='store_true',
+        help='also fail when a case is slower, relative to the first case, '
+             'than its baseline allows')
+    parser.add_argument(
+        '--speed-tolerance', type=float, default=DEFAULT_SPEED_TOLERANCE,
+        help='tolerated slowdown ratio (default: %(default)s)')
+    parser.add_argument(
+        '--alloc-tolerance', type=float, default=DEFAULT_ALLOC_TOLERANCE,
+        help='tolerated extra allocations ratio (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    results = run(
+        cases(args.size, args.seed),
+        repeat=args.repeat,
+        min_time=args.min_time,
+    )
+    baseline = load_baseline(args.baseline)
+    print(report(results, baseline))
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print('Baseline saved to %s' % args.baseline)
+        return 0
+
+    if baseline is None:
+        print('No baseline to compare to: run with --save to create one.')
+        return 0
+
+    regressions = compare(
+        results,
+        baseline,
+        check_speed=args.check_speed,
+        speed_tolerance=args.speed_tolerance,
+        alloc_tolerance=args.alloc_tolerance,
+    )
+    for regression in regressions:
+        print('REGRESSION %s' % regression, file=sys.stderr)
+
+    return 1 if regressions else 0
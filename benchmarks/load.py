@@ -0,0 +1,441 @@
+"""Load test of the plugin, against a local stand-in for the Lichess API.
+
+The driver loads the plugin in a test bot (from Sopel's test factories),
+points it to a :class:`~benchmarks.stub.LichessStub`, and feeds it channel
+messages with Lichess URLs at a given rate. It reports the throughput of
+replies and their latency, from the message to the bot's reply.
+
+Usage::
+
+    $ python -m benchmarks.load
+    $ python -m benchmarks.load --backend asyncio --rate 200
+    $ python -m benchmarks.load --set game_cache_size=0 --output run.json
+
+Everything runs locally: no request leaves the machine.
+"""
+from __future__ import generator_stop
+
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sopel import config  # type: ignore
+from sopel.tests.factories import (BotFactory, IRCFactory,  # type: ignore
+                                   UserFactory)
+from sopel.tests.mocks import MockIRCBackend  # type: ignore
+
+from sopel_lichess import plugin
+
+from .corpus import Corpus
+from .stub import TV_CHANNELS, LichessStub
+
+CONFIG = """
+[core]
+owner = loader
+nick = LoadBot
+homedir = {homedir}
+enable = coretasks, lichess
+
+[lichess]
+api_token = LOAD_TEST_TOKEN
+game_store_size = 0
+{settings}
+"""
+"""Configuration of the test bot; the disk store is off by default."""
+CHANNEL_PREFIX = '#load'
+"""Prefix of the channels: each message is sent to its own channel."""
+REPLY_PATTERN = re.compile(
+    r'^PRIVMSG (?P<channel>%s\d+) :' % re.escape(CHANNEL_PREFIX))
+
+Message = Tuple[str, str]
+"""Kind of a simulated message (``game``, ``player``, ``tv``) and its
+text."""
+
+
+class Reply(NamedTuple):
+    """Outcome of a simulated message."""
+    kind: str
+    """Kind of the message."""
+    latency: Optional[float]
+    """Time (in seconds) to the reply, or ``None`` without reply."""
+
+
+class RecordingBackend(MockIRCBackend):
+    """IRC backend recording when each channel gets its first reply."""
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.replied_at: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def irc_send(self, data: bytes) -> None:
+        """Record the time of a reply, without storing the message."""
+        now = time.perf_counter()
+        match = REPLY_PATTERN.match(data.decode('utf-8', 'replace'))
+        if match:
+            with self.lock:
+                self.replied_at.setdefault(match.group('channel'), now)
+
+
+def generate_messages(
+    count: int,
+    *,
+    games: int = 500,
+    players: int = 200,
+    mix: Sequence[float] = (6, 3, 1),
+    skew: float = 1.0,
+    seed: int = 42,
+) -> List[Message]:
+    """Generate ``count`` channel messages with Lichess URLs.
+
+    :param games: number of distinct games
+    :param players: number of distinct players
+    :param mix: relative weights of games, players, and TV channels
+    :param skew: popularity skew: the n-th most popular game or player is
+                 linked ``1 / n ** skew`` as often as the first one
+    :param seed: seed of the random generator
+    """
+    corpus = Corpus(seed)
+    rand = corpus.random
+    game_ids = [corpus.game_id() for _ in range(games)]
+    player_ids = [corpus.username() for _ in range(players)]
+
+    def weights(size: int) -> List[float]:
+        return list(itertools.accumulate(
+            1 / (rank ** skew) for rank in range(1, size + 1)))
+
+    game_weights, player_weights = weights(games), weights(players)
+
+    messages = []
+    for kind in rand.choices(('game', 'player', 'tv'), mix, k=count):
+        if kind == 'game':
+            game_id, = rand.choices(game_ids, cum_weights=game_weights)
+            color = rand.choice(('', '', '/white', '/black'))
+            url = 'https://lichess.org/%s%s' % (game_id, color)
+        elif kind == 'player':
+            player_id, = rand.choices(player_ids, cum_weights=player_weights)
+            url = 'https://lichess.org/@/%s' % player_id
+        else:
+            url = 'https://lichess.org/tv/%s' % rand.choice(TV_CHANNELS)
+        messages.append((kind, 'have a look: %s' % url))
+
+    return messages
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Get the ``q`` percentile (between ``0`` and ``100``) of ``values``,
+    by the nearest rank method."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(-(-q * len(ordered) // 100)))
+    return ordered[rank - 1]
+
+
+def run(
+    messages: Sequence[Message],
+    stub: LichessStub,
+    *,
+    rate: float = 50.0,
+    idle: float = 5.0,
+    settings: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Send ``messages`` to a test bot using ``stub`` as the Lichess API.
+
+    :param messages: the simulated messages
+    :param stub: the running Lichess stand-in
+    :param rate: number of messages per second (``0`` for no pause)
+    :param idle: time (in seconds) to wait for a new reply before giving
+                 up on the messages left without one
+    :param settings: options of the ``[lichess]`` section
+    :return: the run's results
+    """
+    with tempfile.TemporaryDirectory(prefix='lichess-load-') as homedir:
+        filename = os.path.join(homedir, 'load.cfg')
+        with open(filename, 'w', encoding='utf-8') as fd:
+            fd.write(CONFIG.format(
+                homedir=homedir,
+                settings='\n'.join(
+                    '%s = %s' % item for item in (settings or {}).items()),
+            ))
+
+        bot = BotFactory().preloaded(
+            config.Config(filename), preloads=['lichess'])
+        backend = bot.backend = RecordingBackend(bot)
+        irc = IRCFactory()(bot, join_threads=False)
+        user = UserFactory()('loader')
+
+        try:
+            plugin.get_client(bot).base_url = stub.base_url
+            async_backend = plugin.get_backend(bot)
+            if async_backend is not None:
+                async_backend.base_url = stub.base_url
+
+            sent_at = _send(irc, user, messages, rate)
+            _wait(backend, len(messages), idle)
+            stats = plugin.format_stats(bot)
+        finally:
+            plugin.shutdown(bot)
+
+    replies = [
+        Reply(kind, (
+            backend.replied_at[channel] - sent_at[channel]
+            if channel in backend.replied_at else None
+        ))
+        for channel, (kind, _) in zip(sent_at, messages)
+    ]
+    return summarize(
+        replies,
+        start=min(sent_at.values()),
+        end=max(backend.replied_at.values(), default=max(sent_at.values())),
+        stub=stub.stats(),
+        plugin_stats=stats,
+    )
+
+
+def _send(
+    irc: Any,
+    user: Any,
+    messages: Sequence[Message],
+    rate: float,
+) -> Dict[str, float]:
+    sent_at = {}
+    start = time.perf_counter()
+    for index, (_, text) in enumerate(messages):
+        if rate > 0:
+            delay = start + index / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        channel = '%s%d' % (CHANNEL_PREFIX, index)
+        sent_at[channel] = time.perf_counter()
+        irc.say(user, channel, text)
+    return sent_at
+
+
+def _wait(backend: RecordingBackend, count: int, idle: float) -> None:
+    replied, last_change = 0, time.perf_counter()
+    while replied < count:
+        time.sleep(0.05)
+        with backend.lock:
+            current = len(backend.replied_at)
+        if current != replied:
+            replied, last_change = current, time.perf_counter()
+        elif time.perf_counter() - last_change >= idle:
+            return
+
+
+def summarize(
+    replies: Sequence[Reply],
+    *,
+    start: float,
+    end: float,
+    stub: Dict[str, Dict[int, int]],
+    plugin_stats: List[str],
+) -> Dict[str, Any]:
+    """Summarize the replies of a run.
+
+    :return: a dict with the number of messages and of replies, the
+             duration (in seconds), the throughput (in replies per second),
+             the latency percentiles (in seconds) overall and by kind of
+             message, the stub's answers, and the plugin's statistics
+    """
+    def latencies(kind: Optional[str] = None) -> Dict[str, Any]:
+        values = [
+            reply.latency
+            for reply in replies
+            if reply.latency is not None and kind in (None, reply.kind)
+        ]
+        return {
+            'replies': len(values),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+            'max': max(values, default=None),
+        }
+
+    overall = latencies()
+    duration = max(end - start, 1e-9)
+    return {
+        'messages': len(replies),
+        'replies': overall['replies'],
+        'duration': duration,
+        'throughput': overall['replies'] / duration,
+        'latency': overall,
+        'latency_by_kind': {
+            kind: latencies(kind)
+            for kind in sorted({reply.kind for reply in replies})
+        },
+        'stub': stub,
+        'plugin': plugin_stats,
+    }
+
+
+def report(results: Dict[str, Any]) -> str:
+    """Format the results of a run as a text report."""
+    def milliseconds(value: Optional[float]) -> str:
+        return '-' if value is None else '%.1f' % (value * 1000)
+
+    def latency_line(name: str, latency: Dict[str, Any]) -> str:
+        return '  %-8s %7d %9s %9s %9s %9s' % (
+            name,
+            latency['replies'],
+            milliseconds(latency['p50']),
+            milliseconds(latency['p95']),
+            milliseconds(latency['p99']),
+            milliseconds(latency['max']),
+        )
+
+    lines = [
+        'Messages: %d sent, %d replied, %d without reply' % (
+            results['messages'],
+            results['replies'],
+            results['messages'] - results['replies'],
+        ),
+        'Throughput: %.1f replies/s over %.2fs' % (
+            results['throughput'], results['duration']),
+        '',
+        'Latency (ms):',
+        '  %-8s %7s %9s %9s %9s %9s' % (
+            'kind', 'replies', 'p50', 'p95', 'p99', 'max'),
+        latency_line('all', results['latency']),
+    ]
+    lines.extend(
+        latency_line(kind, latency)
+        for kind, latency in results['latency_by_kind'].items())
+
+    lines.extend(['', 'Stub answers:'])
+    lines.extend(
+        '  %-8s %s' % (endpoint, ', '.join(
+            '%s=%d' % item for item in sorted(statuses.items())))
+        for endpoint, statuses in sorted(results['stub'].items()))
+
+    lines.extend(['', 'Plugin:'])
+    lines.extend('  %s' % line for line in results['plugin'])
+    return '\n'.join(lines)
+
+
+def parse_settings(values: Sequence[str]) -> Dict[str, str]:
+    """Parse ``name=value`` options of the ``[lichess]`` section."""
+    settings = {}
+    for value in values:
+        name, sep, setting = value.partition('=')
+        if not sep or not name.strip():
+            raise ValueError('Invalid setting: %r' % value)
+        settings[name.strip()] = setting.strip()
+    return settings
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run a load test from the command line.
+
+    :param argv: command line arguments
+    :return: the exit code
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.load',
+        description='Run a load test of the plugin against a local stub.')
+    parser.add_argument(
+        '--messages', type=int, default=2000,
+        help='number of messages (default: %(default)s)')
+    parser.add_argument(
+        '--rate', type=float, default=50.0,
+        help='messages per second, 0 for no pause (default: %(default)s)')
+    parser.add_argument(
+        '--games', type=int, default=500,
+        help='number of distinct games (default: %(default)s)')
+    parser.add_argument(
+        '--players', type=int, default=200,
+        help='number of distinct players (default: %(default)s)')
+    parser.add_argument(
+        '--mix', default='6:3:1',
+        help='weights of games, players, and TV channels '
+             '(default: %(default)s)')
+    parser.add_argument(
+        '--skew', type=float, default=1.0,
+        help='popularity skew of games and players (default: %(default)s)')
+    parser.add_argument(
+        '--seed', type=int, default=42,
+        help='seed of the messages and of the stub (default: %(default)s)')
+    parser.add_argument(
+        '--latency', type=float, default=0.05,
+        help='stub latency in seconds (default: %(default)s)')
+    parser.add_argument(
+        '--jitter', type=float, default=0.02,
+        help='stub latency jitter in seconds (default: %(default)s)')
+    parser.add_argument(
+        '--error-rate', type=float, default=0.0,
+        help='share of server errors (default: %(default)s)')
+    parser.add_argument(
+        '--throttle-rate', type=float, default=0.0,
+        help='share of 429 answers (default: %(default)s)')
+    parser.add_argument(
+        '--retry-after', type=int, default=1,
+        help='Retry-After of 429 answers in seconds (default: %(default)s)')
+    parser.add_argument(
+        '--not-found-rate', type=float, default=0.0,
+        help='share of unknown games and players (default: %(default)s)')
+    parser.add_argument(
+        '--backend', choices=('sync', 'asyncio'), default='sync',
+        help='backend of the plugin (default: %(default)s)')
+    parser.add_argument(
+        '--set', action='append', default=[], metavar='NAME=VALUE',
+        help='option of the [lichess] section, such as game_cache_size=0')
+    parser.add_argument(
+        '--idle', type=float, default=5.0,
+        help='seconds without reply before giving up (default: %(default)s)')
+    parser.add_argument(
+        '--output',
+        help='JSON file where the results are saved')
+    args = parser.parse_args(argv)
+
+    try:
+        mix = [float(weight) for weight in args.mix.split(':')]
+        settings = parse_settings(args.set)
+    except ValueError as error:
+        parser.error(str(error))
+    if len(mix) != 3:
+        parser.error('--mix needs three weights, such as 6:3:1')
+    settings.setdefault('backend', args.backend)
+
+    messages = generate_messages(
+        args.messages,
+        games=args.games,
+        players=args.players,
+        mix=mix,
+        skew=args.skew,
+        seed=args.seed,
+    )
+    stub = LichessStub(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        not_found_rate=args.not_found_rate,
+        seed=args.seed,
+    )
+    with stub:
+        results = run(
+            messages, stub, rate=args.rate, idle=args.idle, settings=settings)
+
+    results['settings'] = settings
+    print(report(results))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fd:
+            json.dump(results, fd, indent=2, sort_keys=True)
+            fd.write('\n')
+        print('Results saved to %s' % args.output)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Benchmarks of :mod:`sopel_lichess.parsers`.
+
+Usage::
+
+    $ python -m benchmarks.parsers                # compare to the baseline
+    $ python -m benchmarks.parsers --save         # save a new baseline
+    $ python -m benchmarks.parsers --check-speed  # also check relative speeds
+"""
+from __future__ import generator_stop
+
+import functools
+import sys
+from typing import List
+
+from sopel_lichess import models, parsers
+
+from . import corpus, harness
+
+
+def cases(size: int, seed: int) -> List[harness.Case]:
+    """Get the cases of the parsers suite."""
+    players = corpus.generate('players', size, seed)
+    games = corpus.generate('games', size, seed)
+    game_players = [
+        game['players'][color]
+        for game in games
+        for color in ('white', 'black')
+    ]
+    player_models = [models.Player.from_data(data) for data in players]
+    game_models = [models.Game.from_data(data) for data in games]
+
+    return [
+        harness.Case('format_player', parsers.format_player, players),
+        harness.Case(
+            'format_game_player', parsers.format_game_player, game_players),
+        harness.Case(
+            'format_game_player[mark]',
+            functools.partial(parsers.format_game_player, mark=True),
+            game_players),
+        harness.Case('parse_game_type', parsers.parse_game_type, games),
+        harness.Case('parse_game_data', parsers.parse_game_data, games),
+        harness.Case(
+            'parse_game_data[for_player]',
+            functools.partial(parsers.parse_game_data, for_player='black'),
+            games),
+        harness.Case('is_game_over', parsers.is_game_over, games),
+        harness.Case('Player.from_data', models.Player.from_data, players),
+        harness.Case('Game.from_data', models.Game.from_data, games),
+        harness.Case(
+            'format_player[model]', parsers.format_player, player_models),
+        harness.Case(
+            'parse_game_data[model]', parsers.parse_game_data, game_models),
+        harness.Case(
+            'parse_game_data[model,for_player]',
+            functools.partial(parsers.parse_game_data, for_player='black'),
+            game_models),
+    ]
+
+
+if __name__ == '__main__':
+    sys.exit(harness.main('parsers', cases))
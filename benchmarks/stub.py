@@ -0,0 +1,294 @@
+"""Local HTTP server standing in for the Lichess API.
+
+The stub answers the endpoints used by the plugin with payloads from
+:mod:`benchmarks.corpus`, generated from the requested IDs: the same ID
+always gets the same payload, so runs can be compared. Every answer can
+be delayed, and a share of them can fail, either with a server error or
+with a ``429 Too Many Requests``::
+
+    with LichessStub(latency=0.05, error_rate=0.01) as stub:
+        client = LichessClient('TOKEN', base_url=stub.base_url)
+        ...
+"""
+from __future__ import generator_stop
+
+import http.server
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from .corpus import Corpus
+
+Answer = Tuple[int, Dict[str, str], bytes]
+"""HTTP status, headers, and body of an answer."""
+
+NDJSON = 'application/x-ndjson'
+JSON = 'application/json'
+
+ROUTES = (
+    ('GET', re.compile(r'^/api/user/(?P<arg>[^/?]+)$'), 'user'),
+    ('GET', re.compile(r'^/game/export/(?P<arg>[^/?]+)$'), 'game'),
+    ('POST', re.compile(r'^/api/games/export/_ids$'), 'games'),
+    ('GET', re.compile(r'^/api/tv/(?P<arg>[^/?]+)$'), 'tv'),
+)
+"""Method, path pattern, and name of each stubbed endpoint."""
+TV_CHANNELS = (
+    'bot', 'blitz', 'racingKings', 'ultraBullet', 'bullet', 'classical',
+    'threeCheck', 'antichess', 'computer', 'horde', 'rapid', 'atomic',
+    'crazyhouse', 'chess960', 'kingOfTheHill', 'best',
+)
+"""TV channels known by the stub."""
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """Request handler answering from the stub's generated payloads."""
+    protocol_version = 'HTTP/1.1'
+    server: 'StubServer'
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Answer a GET request."""
+        self.answer(b'')
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Answer a POST request."""
+        length = int(self.headers.get('Content-Length') or 0)
+        self.answer(self.rfile.read(length))
+
+    def answer(self, body: bytes) -> None:
+        """Answer the request, after the stub's latency."""
+        status, headers, content = self.server.stub.answer(
+            self.command, self.path, body)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args: Any) -> None:
+        """Don't log requests."""
+
+
+class StubServer(http.server.ThreadingHTTPServer):
+    """HTTP server of a :class:`LichessStub`."""
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, stub: 'LichessStub') -> None:
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.stub = stub
+
+
+class LichessStub:
+    """Local stand-in for the Lichess API.
+
+    :param latency: mean time (in seconds) to answer a request
+    :param jitter: maximum variation (in seconds) of the latency
+    :param error_rate: share of requests answered with a server error
+    :param throttle_rate: share of requests answered with a ``429``
+    :param retry_after: ``Retry-After`` (in seconds) of a ``429``
+    :param not_found_rate: share of IDs unknown to the stub
+    :param seed: seed of the payloads and of the failures
+
+    The stub answers the user, game export, games export by IDs, and TV
+    endpoints. Anything else gets a ``404 Not Found``.
+    """
+    def __init__(
+        self,
+        *,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        not_found_rate: float = 0.0,
+        seed: int = 42,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.not_found_rate = not_found_rate
+        self.seed = seed
+        self.requests: 'Counter[Tuple[str, int]]' = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[StubServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'LichessStub':
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        """Base URL of the running stub."""
+        if self._server is None:
+            raise RuntimeError('The stub is not running.')
+        return 'http://127.0.0.1:%d' % self._server.server_address[1]
+
+    def start(self) -> None:
+        """Start serving requests in a background thread."""
+        self._server = StubServer(self)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            args=(0.05,),
+            name='lichess-stub',
+            daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving requests."""
+        if self._server is None:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self._server = self._thread = None
+
+    def stats(self) -> Dict[str, Dict[int, int]]:
+        """Get the number of answers by endpoint and by HTTP status."""
+        result: Dict[str, Dict[int, int]] = {}
+        with self._lock:
+            for (endpoint, status), count in sorted(self.requests.items()):
+                result.setdefault(endpoint, {})[status] = count
+        return result
+
+    def answer(self, method: str, path: str, body: bytes) -> Answer:
+        """Answer a request, after the stub's latency.
+
+        :param method: the request's HTTP method
+        :param path: the request's path, with its query string
+        :param body: the request's body
+        :return: the answer's status, headers, and body
+        """
+        path, _, query = path.partition('?')
+        for route_method, pattern, endpoint in ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                break
+        else:
+            return self._count('unknown', (404, {}, b''))
+
+        with self._lock:
+            delay = self.latency + self._random.uniform(
+                -self.jitter, self.jitter)
+            failure = self._random.random()
+
+        time.sleep(max(0.0, delay))
+
+        if failure < self.throttle_rate:
+            return self._count(endpoint, (
+                429, {'Retry-After': str(self.retry_after)}, b''))
+        if failure < self.throttle_rate + self.error_rate:
+            return self._count(endpoint, (500, {}, b''))
+
+        arg = match.groupdict().get('arg') or ''
+        ids = body.decode('utf-8').split(',') if body else []
+        params = dict(urllib.parse.parse_qsl(query))
+        if endpoint == 'user':
+            data = self.player(arg)
+            answer = self._json(data) if data else (404, {}, b'')
+        elif endpoint == 'game':
+            data = self.game(arg, params)
+            answer = self._json(data) if data else (404, {}, b'')
+        elif endpoint == 'games':
+            answer = self._ndjson([
+                data
+                for data in (self.game(game_id, params) for game_id in ids)
+                if data
+            ])
+        else:
+            answer = self._tv(arg, params)
+
+        return self._count(endpoint, answer)
+
+    def player(self, player_id: str) -> Optional[dict]:
+        """Generate the account data of a player, if known."""
+        corpus = self._corpus('user', player_id.lower())
+        if corpus.maybe(self.not_found_rate):
+            return None
+
+        data = corpus.player()
+        data['id'] = player_id.lower()
+        data['username'] = player_id
+        return data
+
+    def game(
+        self,
+        game_id: str,
+        params: Optional[Dict[str, str]] = None,
+    ) -> Optional[dict]:
+        """Generate the data of a game, if known.
+
+        :param game_id: the game's ID
+        :param params: export flags: the ``moves`` and the ``opening`` are
+                       left out when their flag is ``false``
+        """
+        corpus = self._corpus('game', game_id)
+        if corpus.maybe(self.not_found_rate):
+            return None
+
+        data = corpus.game()
+        data['id'] = game_id
+        return project(data, params or {})
+
+    def _corpus(self, kind: str, key: str) -> Corpus:
+        return Corpus(zlib.crc32(('%s:%s' % (kind, key)).encode('utf-8'))
+                      ^ self.seed)
+
+    def _tv(self, channel_id: str, params: Dict[str, str]) -> Answer:
+        if channel_id not in TV_CHANNELS:
+            return (404, {}, b'')
+
+        count = int(params.get('nb') or 10)
+        corpus = self._corpus('tv', channel_id)
+        games: List[dict] = []
+        for _ in range(count):
+            data = corpus.game()
+            data['status'] = 'started'
+            data.pop('winner', None)
+            games.append(project(data, params))
+        return self._ndjson(games)
+
+    def _count(self, endpoint: str, answer: Answer) -> Answer:
+        with self._lock:
+            self.requests[endpoint, answer[0]] += 1
+        return answer
+
+    @staticmethod
+    def _json(data: Any) -> Answer:
+        return (
+            200,
+            {'Content-Type': JSON},
+            json.dumps(data).encode('utf-8'),
+        )
+
+    @staticmethod
+    def _ndjson(items: List[dict]) -> Answer:
+        return (
+            200,
+            {'Content-Type': NDJSON},
+            b''.join(json.dumps(item).encode('utf-8') + b'\n'
+                     for item in items),
+        )
+
+
+def project(data: dict, params: Dict[str, str]) -> dict:
+    """Leave out the fields of a game disabled by its export flags."""
+    for flag in ('moves', 'opening'):
+        if params.get(flag) == 'false':
+            data.pop(flag, None)
+    return data
@@ -1,6 +1,10 @@
 """Sopel Lichess plugin."""
 from __future__ import generator_stop
 
-import pkg_resources  # type: ignore
+try:
+    from importlib import metadata
+except ImportError:  # pragma: no cover
+    # Python < 3.8
+    import importlib_metadata as metadata  # type: ignore
 
-__version__ = pkg_resources.get_distribution('sopel-lichess').version
+__version__ = metadata.version('sopel-lichess')
@@ -0,0 +1,547 @@
+"""Asyncio backend for the Lichess API.
+
+This backend requires :mod:`aiohttp`, which is an optional dependency: use
+:func:`is_available` to know if it can be used. Its fetchers mirror the ones
+from :mod:`sopel_lichess.api` as coroutines.
+"""
+from __future__ import generator_stop
+
+import asyncio
+import importlib.util
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (TYPE_CHECKING, Any, AsyncGenerator, Callable, Coroutine,
+                    Dict, Hashable, List, Optional, Union)
+
+from sopel_lichess import api, codec, ndjson, parsers, pgn
+from sopel_lichess.batch import Resolver
+from sopel_lichess.client import (BASE_URL, DEFAULT_MAX_CONNECTIONS,
+                                  DEFAULT_TIMEOUT)
+from sopel_lichess.metrics import REQUEST_SECONDS, RESPONSES_TOTAL, Metrics
+from sopel_lichess.ratelimit import Priority, RateLimiter, parse_retry_after
+
+if TYPE_CHECKING:  # pragma: no cover
+    import aiohttp
+
+DEFAULT_CALLBACK_WORKERS = 4
+"""Default number of threads running callbacks off the event loop."""
+
+
+def is_available() -> bool:
+    """Tell if the asyncio backend can be used.
+
+    :mod:`aiohttp` itself is only imported when a backend starts.
+    """
+    return importlib.util.find_spec('aiohttp') is not None
+
+
+class AsyncBackend:
+    """Event loop thread with an async HTTP client for the Lichess API.
+
+    :param api_token: Lichess personal API token
+    :param base_url: base URL of the Lichess API
+    :param max_connections: maximum number of concurrent requests per host
+    :param timeout: timeout (in seconds) of each request
+    :param rate_limiter: optional rate limiter to schedule requests
+    :param metrics: optional registry of the requests' metrics
+    :param callback_workers: number of threads running the callbacks of
+                             :meth:`detach`
+
+    The backend owns an event loop running in its own thread between
+    :meth:`start` and :meth:`stop`. Any thread can :meth:`submit` coroutines
+    to it and get a :class:`concurrent.futures.Future` right away, so
+    in-flight lookups don't need a thread each.
+
+    The callbacks of these futures run on the event loop's thread, where
+    blocking code (such as sending a message, or writing to disk) stalls
+    every other request: :meth:`detach` moves them to worker threads.
+    """
+    def __init__(
+        self,
+        api_token: str,
+        *,
+        base_url: str = BASE_URL,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        timeout: float = DEFAULT_TIMEOUT,
+        rate_limiter: Optional[RateLimiter] = None,
+        metrics: Optional[Metrics] = None,
+        callback_workers: int = DEFAULT_CALLBACK_WORKERS,
+    ) -> None:
+        if not is_available():
+            raise RuntimeError('The asyncio backend requires aiohttp')
+
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.callback_workers = callback_workers
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._api_token = api_token
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._session: Optional['aiohttp.ClientSession'] = None
+
+    @property
+    def running(self) -> bool:
+        """Tell if the backend's event loop is running."""
+        return self._thread is not None
+
+    def start(self) -> None:
+        """Start the event loop thread and open the HTTP session."""
+        if self._thread is not None:
+            return
+
+        self.loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.callback_workers,
+            thread_name_prefix='sopel-lichess-callback',
+        )
+        self._thread = threading.Thread(
+            target=self._run_loop,
+            args=(self.loop,),
+            name='sopel-lichess-asyncio',
+            daemon=True,
+        )
+        self._thread.start()
+        self.run(self._open())
+
+    def stop(self) -> None:
+        """Close the HTTP session and stop the event loop thread."""
+        if self.loop is None or self._thread is None:
+            return
+
+        try:
+            self.run(self._close())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self.loop.close()
+            self.loop = None
+            self._thread = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def _open(self) -> None:
+        import aiohttp
+
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit_per_host=self.max_connections),
+            headers={'Authorization': 'Bearer %s' % self._api_token},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+
+    async def _close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        """Submit a coroutine to the backend's event loop.
+
+        :param coro: the coroutine to run
+        :return: a future for the coroutine's result
+        :raise RuntimeError: when the backend is not running
+        """
+        if self.loop is None:
+            coro.close()
+            raise RuntimeError('The asyncio backend is not running')
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        """Run a coroutine and wait for its result.
+
+        This must not be called from the backend's event loop thread.
+        """
+        return self.submit(coro).result()
+
+    def detach(self, future: Future) -> Future:
+        """Get a future resolved as ``future``, off the event loop's thread.
+
+        :param future: a future that may be resolved by the event loop
+        :return: a new future, resolved with the outcome of ``future`` from
+                 a worker thread when ``future`` is resolved by the event
+                 loop, so that its callbacks can block
+        """
+        detached: Future = Future()
+
+        def resolve(future: Future) -> None:
+            error = future.exception()
+            if error is not None:
+                detached.set_exception(error)
+            else:
+                detached.set_result(future.result())
+
+        def relay(future: Future) -> None:
+            executor = self._executor
+            if (executor is None
+                    or threading.current_thread() is not self._thread):
+                resolve(future)
+                return
+
+            try:
+                executor.submit(resolve, future)
+            except RuntimeError:  # pragma: no cover
+                # the backend is stopping: its executor is shut down
+                resolve(future)
+
+        future.add_done_callback(relay)
+        return detached
+
+    def resolver(
+        self,
+        fetch: Callable[
+            ['AsyncBackend', List[Hashable], api.Deliver],
+            Coroutine[Any, Any, None]],
+    ) -> Resolver:
+        """Get a batch resolver running ``fetch`` on the event loop.
+
+        :param fetch: a bulk fetcher, such as :func:`fetch_games`
+        :return: a resolver for a :class:`~sopel_lichess.batch.Batcher`
+        """
+        def resolve(keys: List[Hashable], deliver: api.Deliver) -> Future:
+            return self.submit(fetch(self, keys, deliver))
+        return resolve
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        endpoint: str = 'default',
+        priority: Priority = Priority.NORMAL,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Union[str, bytes]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> 'aiohttp.ClientResponse':
+        """Send a ``method`` request to ``path``.
+
+        :param method: the HTTP method (``GET``, ``POST``, etc.)
+        :param path: the path to request, relative to the base URL
+        :param endpoint: the endpoint class, used for rate limiting
+        :param priority: the priority of the request
+        :param params: optional query parameters
+        :param data: optional body of the request
+        :param headers: optional extra headers
+        :return: the HTTP response, that the caller must release
+        :raise ~sopel_lichess.ratelimit.RequestShed: when the rate limiter
+                                                     sheds the request
+        """
+        if self._session is None:
+            raise RuntimeError('The asyncio backend is not running')
+
+        metrics = self.metrics
+        started_at = time.perf_counter()
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(endpoint, priority)
+
+        sent_at = time.perf_counter()
+        metrics.observe(
+            REQUEST_SECONDS, sent_at - started_at,
+            endpoint=endpoint, phase='wait')
+        try:
+            response = await self._session.request(
+                method,
+                self.base_url + path,
+                params=params,
+                data=data,
+                headers=headers,
+            )
+        except Exception:
+            metrics.increment(
+                RESPONSES_TOTAL, endpoint=endpoint, status='error')
+            raise
+        finally:
+            metrics.observe(
+                REQUEST_SECONDS, time.perf_counter() - sent_at,
+                endpoint=endpoint, phase='http')
+
+        metrics.increment(
+            RESPONSES_TOTAL, endpoint=endpoint, status=response.status)
+
+        if response.status == 429 and self.rate_limiter is not None:
+            self.rate_limiter.backoff(
+                parse_retry_after(response.headers.get('Retry-After')))
+
+        return response
+
+
+async def read_json(response: 'aiohttp.ClientResponse') -> Optional[Any]:
+    """Decode and release a JSON ``response``.
+
+    :return: the decoded body, or ``None`` if the status is not ``200``
+    """
+    try:
+        if response.status != 200:
+            return None
+        return codec.loads(await response.read())
+    finally:
+        response.release()
+
+
+async def iter_objects(
+    response: 'aiohttp.ClientResponse',
+) -> AsyncGenerator[Any, None]:
+    """Decode objects from a streamed NDJSON ``response`` as they arrive."""
+    buffer = ndjson.LineBuffer()
+    async for chunk in response.content.iter_any():
+        for line in buffer.feed(chunk):
+            yield codec.loads(line)
+    for line in buffer.flush():
+        yield codec.loads(line)
+
+
+async def read_objects(
+    response: 'aiohttp.ClientResponse',
+    limit: Optional[int] = None,
+) -> List[Any]:
+    """Decode up to ``limit`` objects from an NDJSON ``response``.
+
+    The response is released once ``limit`` objects have been read, so the
+    rest of its body is never downloaded.
+    """
+    objects: List[Any] = []
+    try:
+        if response.status != 200 or (limit is not None and limit <= 0):
+            return objects
+
+        stream = iter_objects(response)
+        async for obj in stream:
+            objects.append(obj)
+            if limit is not None and len(objects) >= limit:
+                break
+        await stream.aclose()
+    finally:
+        response.release()
+
+    return objects
+
+
+async def fetch_player(
+    backend: AsyncBackend,
+    player_id: str,
+) -> Optional[dict]:
+    """Fetch a player's account data.
+
+    See :func:`sopel_lichess.api.fetch_player`.
+    """
+    response = await backend.request(
+        'GET',
+        '/api/user/%s' % player_id,
+        endpoint=api.ENDPOINT_USER,
+        headers={'Accept': 'application/json'})
+    return await read_json(response)
+
+
+async def fetch_game(
+    backend: AsyncBackend,
+    game_id: str,
+    *,
+    priority: Priority = Priority.NORMAL,
+) -> Optional[dict]:
+    """Fetch a game's data.
+
+    See :func:`sopel_lichess.api.fetch_game`.
+    """
+    response = await backend.request(
+        'GET',
+        '/game/export/%s' % game_id,
+        endpoint=api.ENDPOINT_GAME,
+        priority=priority,
+        params=parsers.get_export_params(),
+        headers={'Accept': 'application/json'})
+    return await read_json(response)
+
+
+async def fetch_games(
+    backend: AsyncBackend,
+    game_ids: List[Hashable],
+    deliver: api.Deliver,
+    *,
+    priority: Priority = Priority.NORMAL,
+) -> None:
+    """Fetch several games' data at once.
+
+    See :func:`sopel_lichess.api.fetch_games`.
+    """
+    if len(game_ids) == 1:
+        game_id = str(game_ids[0])
+        deliver(
+            game_id, await fetch_game(backend, game_id, priority=priority))
+        return
+
+    response = await backend.request(
+        'POST',
+        '/api/games/export/_ids',
+        endpoint=api.ENDPOINT_GAME,
+        priority=priority,
+        params=parsers.get_export_params(),
+        data=','.join(str(game_id) for game_id in game_ids),
+        headers={
+            'Accept': 'application/x-ndjson',
+            'Content-Type': 'text/plain',
+        })
+
+    try:
+        if response.status != 200:
+            return
+
+        async for data in iter_objects(response):
+            deliver(data.get('id'), data)
+    finally:
+        response.release()
+
+
+async def fetch_tv_games(
+    backend: AsyncBackend,
+    channel_id: str,
+    nb: int = 1,
+) -> List[dict]:
+    """Fetch the games currently played on a TV channel.
+
+    See :func:`sopel_lichess.api.fetch_tv_games`.
+    """
+    response = await backend.request(
+        'GET',
+        '/api/tv/%s' % channel_id,
+        endpoint=api.ENDPOINT_TV,
+        params=dict(parsers.get_export_params(api.TV_EXPORT_FLAGS), nb=nb),
+        headers={'Accept': 'application/x-ndjson'})
+    return await read_objects(response, limit=nb)
+
+
+async def fetch_tv_channels(
+    backend: AsyncBackend,
+    *,
+    priority: Priority = Priority.NORMAL,
+) -> Optional[Dict[str, dict]]:
+    """Fetch the current game of every TV channel at once.
+
+    See :func:`sopel_lichess.api.fetch_tv_channels`.
+    """
+    response = await backend.request(
+        'GET',
+        '/api/tv/channels',
+        endpoint=api.ENDPOINT_TV,
+        priority=priority,
+        headers={'Accept': 'application/json'})
+    return await read_json(response)
+
+
+async def fetch_daily_puzzle(
+    backend: AsyncBackend,
+    *,
+    priority: Priority = Priority.NORMAL,
+) -> Optional[dict]:
+    """Fetch the daily puzzle.
+
+    See :func:`sopel_lichess.api.fetch_daily_puzzle`.
+    """
+    response = await backend.request(
+        'GET',
+        '/api/puzzle/daily',
+        endpoint=api.ENDPOINT_PUZZLE,
+        priority=priority,
+        headers={'Accept': 'application/json'})
+    return await read_json(response)
+
+
+async def fetch_leaderboard(
+    backend: AsyncBackend,
+    perf: str,
+    nb: int = api.LEADERBOARD_SIZE,
+) -> Optional[List[dict]]:
+    """Fetch the top players of a perf type.
+
+    See :func:`sopel_lichess.api.fetch_leaderboard`.
+    """
+    response = await backend.request(
+        'GET',
+        '/api/player/top/%d/%s' % (min(nb, api.LEADERBOARD_SIZE), perf),
+        endpoint=api.ENDPOINT_LEADERBOARD,
+        headers={'Accept': 'application/vnd.lichess.v3+json'})
+    data = await read_json(response)
+    if data is None:
+        return None
+
+    return data.get('users', [])
+
+
+async def fetch_tournament(
+    backend: AsyncBackend,
+    kind: str,
+    tournament_id: str,
+    nb: int = 3,
+) -> Optional[dict]:
+    """Fetch a tournament's summary and its top standings.
+
+    See :func:`sopel_lichess.api.fetch_tournament`.
+    """
+    path = api.TOURNAMENT_PATHS[kind] % tournament_id
+    response = await backend.request(
+        'GET',
+        path,
+        endpoint=api.ENDPOINT_TOURNAMENT,
+        headers={'Accept': 'application/json'})
+    data = await read_json(response)
+    if data is None:
+        return None
+
+    data['standings'] = []
+    if nb <= 0:
+        return data
+
+    response = await backend.request(
+        'GET',
+        path + '/results',
+        endpoint=api.ENDPOINT_TOURNAMENT,
+        params={'nb': nb},
+        headers={'Accept': 'application/x-ndjson'})
+    data['standings'] = await read_objects(response, limit=nb)
+    return data
+
+
+async def fetch_pgn_headers(
+    backend: AsyncBackend,
+    source: str,
+    pgn_id: str,
+    nb: int = 3,
+) -> Optional[List[Dict[str, str]]]:
+    """Fetch the headers of the first games of a PGN export.
+
+    See :func:`sopel_lichess.api.fetch_pgn_headers`.
+    """
+    params = (api.PGN_EXPORT_PARAMS
+              if source in ('study', 'chapter') else None)
+    response = await backend.request(
+        'GET',
+        api.PGN_PATHS[source] % pgn_id,
+        endpoint=api.ENDPOINT_STUDY,
+        params=params,
+        headers={'Accept': 'application/x-chess-pgn'})
+
+    headers: List[Dict[str, str]] = []
+    try:
+        if response.status != 200:
+            return None
+        if nb <= 0:
+            return headers
+
+        parser = pgn.HeaderParser()
+        async for chunk in response.content.iter_any():
+            headers.extend(parser.feed(chunk))
+            if len(headers) >= nb:
+                return headers[:nb]
+        headers.extend(parser.flush())
+    finally:
+        response.release()
+
+    return headers[:nb]
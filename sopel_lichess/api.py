@@ -0,0 +1,389 @@
+"""Fetchers for the Lichess API."""
+from __future__ import generator_stop
+
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, List, Optional
+
+from sopel_lichess import codec, ndjson, parsers, pgn
+from sopel_lichess.ratelimit import Priority
+
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+    from sopel_lichess.client import LichessClient
+
+MAX_GAMES_PER_REQUEST = 300
+"""Maximum number of games exported by the export by IDs endpoint."""
+MAX_GAMES_PER_STREAM = 1000
+"""Maximum number of games followed by the games stream endpoint."""
+
+ENDPOINT_USER = 'user'
+"""Endpoint class of player requests."""
+ENDPOINT_GAME = 'game'
+"""Endpoint class of game export requests."""
+ENDPOINT_TV = 'tv'
+"""Endpoint class of TV requests."""
+ENDPOINT_STREAM = 'stream'
+"""Endpoint class of games stream requests."""
+ENDPOINT_TOURNAMENT = 'tournament'
+"""Endpoint class of arena and Swiss tournament requests."""
+ENDPOINT_STUDY = 'study'
+"""Endpoint class of study and broadcast PGN exports."""
+ENDPOINT_PUZZLE = 'puzzle'
+"""Endpoint class of puzzle requests."""
+ENDPOINT_LEADERBOARD = 'leaderboard'
+"""Endpoint class of leaderboard requests."""
+
+LEADERBOARD_SIZE = 200
+"""Maximum number of players of a leaderboard, as sent by Lichess."""
+LEADERBOARD_PERFS = (
+    'ultraBullet', 'bullet', 'blitz', 'rapid', 'classical', 'chess960',
+    'crazyhouse', 'antichess', 'atomic', 'horde', 'kingOfTheHill',
+    'racingKings', 'threeCheck',
+)
+"""Perf types with a leaderboard."""
+
+TOURNAMENT_PATHS = {
+    'tournament': '/api/tournament/%s',
+    'swiss': '/api/swiss/%s',
+}
+"""Path of each kind of tournament (arena or Swiss), by kind."""
+
+PGN_PATHS = {
+    'study': '/api/study/%s.pgn',
+    'chapter': '/api/study/%s.pgn',
+    'broadcast': '/api/broadcast/%s.pgn',
+    'round': '/api/broadcast/round/%s.pgn',
+}
+"""Path of each source of PGN export, by source."""
+PGN_EXPORT_PARAMS = {'clocks': 'false', 'comments': 'false',
+                     'variations': 'false'}
+"""Export flags of a study's PGN: only the headers are read anyway."""
+
+TV_EXPORT_FLAGS = ('moves', 'pgnInJson', 'tags', 'clocks', 'opening')
+"""Export flags supported by the TV endpoint."""
+
+Deliver = Callable[[Hashable, Optional[dict]], None]
+"""Callback called with each fetched object's ID and data."""
+
+
+def fetch_player(client: 'LichessClient', player_id: str) -> Optional[dict]:
+    """Fetch a player's account data.
+
+    :param client: the Lichess API client
+    :param player_id: the player's ID
+    :return: the player's account data, or ``None`` if not found
+    """
+    response = client.get(
+        '/api/user/%s' % player_id,
+        endpoint=ENDPOINT_USER,
+        headers={'Accept': 'application/json'})
+
+    if response.status_code != 200:
+        return None
+
+    return codec.loads(response.content)
+
+
+def fetch_game(
+    client: 'LichessClient',
+    game_id: str,
+    *,
+    priority: Priority = Priority.NORMAL,
+) -> Optional[dict]:
+    """Fetch a game's data.
+
+    :param client: the Lichess API client
+    :param game_id: the game's ID
+    :param priority: the priority of the request
+    :return: the game's data, or ``None`` if not found
+    """
+    response = client.get(
+        '/game/export/%s' % game_id,
+        endpoint=ENDPOINT_GAME,
+        priority=priority,
+        params=parsers.get_export_params(),
+        headers={'Accept': 'application/json'})
+
+    if response.status_code != 200:
+        return None
+
+    return codec.loads(response.content)
+
+
+def fetch_games(
+    client: 'LichessClient',
+    game_ids: List[Hashable],
+    deliver: Deliver,
+    *,
+    priority: Priority = Priority.NORMAL,
+) -> None:
+    """Fetch several games' data at once.
+
+    :param client: the Lichess API client
+    :param game_ids: the games' IDs
+    :param deliver: callback called with each game's ID and data
+    :param priority: the priority of the request
+
+    Games are streamed from the export by IDs endpoint, and each game is
+    delivered as soon as it is read. A single game is fetched with
+    :func:`fetch_game` instead.
+    """
+    if len(game_ids) == 1:
+        game_id = str(game_ids[0])
+        deliver(game_id, fetch_game(client, game_id, priority=priority))
+        return
+
+    response = client.post(
+        '/api/games/export/_ids',
+        endpoint=ENDPOINT_GAME,
+        priority=priority,
+        params=parsers.get_export_params(),
+        data=','.join(str(game_id) for game_id in game_ids),
+        headers={
+            'Accept': 'application/x-ndjson',
+            'Content-Type': 'text/plain',
+        },
+        stream=True)
+
+    if response.status_code != 200:
+        response.close()
+        return
+
+    for data in ndjson.read_objects(response):
+        deliver(data.get('id'), data)
+
+
+def fetch_tv_games(
+    client: 'LichessClient',
+    channel_id: str,
+    nb: int = 1,
+) -> List[dict]:
+    """Fetch the games currently played on a TV channel.
+
+    :param client: the Lichess API client
+    :param channel_id: the TV channel's ID (``blitz``, ``bullet``, etc.)
+    :param nb: number of games to fetch
+    :return: a list of up to ``nb`` games' data (empty if not found)
+    """
+    response = client.get(
+        '/api/tv/%s' % channel_id,
+        endpoint=ENDPOINT_TV,
+        params=dict(parsers.get_export_params(TV_EXPORT_FLAGS), nb=nb),
+        headers={'Accept': 'application/x-ndjson'},
+        stream=True)
+
+    if response.status_code != 200:
+        response.close()
+        return []
+
+    return list(ndjson.read_objects(response, limit=nb))
+
+
+def fetch_tv_channels(
+    client: 'LichessClient',
+    *,
+    priority: Priority = Priority.NORMAL,
+) -> Optional[Dict[str, dict]]:
+    """Fetch the current game of every TV channel at once.
+
+    :param client: the Lichess API client
+    :param priority: the priority of the request
+    :return: the featured player and game ID (``gameId``) of each channel,
+             by channel's name; ``None`` on error
+    """
+    response = client.get(
+        '/api/tv/channels',
+        endpoint=ENDPOINT_TV,
+        priority=priority,
+        headers={'Accept': 'application/json'})
+
+    if response.status_code != 200:
+        return None
+
+    return codec.loads(response.content)
+
+
+def fetch_daily_puzzle(
+    client: 'LichessClient',
+    *,
+    priority: Priority = Priority.NORMAL,
+) -> Optional[dict]:
+    """Fetch the daily puzzle.
+
+    :param client: the Lichess API client
+    :param priority: the priority of the request
+    :return: the daily puzzle's data, or ``None`` on error
+    """
+    response = client.get(
+        '/api/puzzle/daily',
+        endpoint=ENDPOINT_PUZZLE,
+        priority=priority,
+        headers={'Accept': 'application/json'})
+
+    if response.status_code != 200:
+        return None
+
+    return codec.loads(response.content)
+
+
+def fetch_leaderboard(
+    client: 'LichessClient',
+    perf: str,
+    nb: int = LEADERBOARD_SIZE,
+) -> Optional[List[dict]]:
+    """Fetch the top players of a perf type.
+
+    :param client: the Lichess API client
+    :param perf: the perf type, from :data:`LEADERBOARD_PERFS`
+    :param nb: number of players to fetch, up to :data:`LEADERBOARD_SIZE`
+    :return: the players' data, by rank; ``None`` on error
+    """
+    response = client.get(
+        '/api/player/top/%d/%s' % (min(nb, LEADERBOARD_SIZE), perf),
+        endpoint=ENDPOINT_LEADERBOARD,
+        headers={'Accept': 'application/vnd.lichess.v3+json'})
+
+    if response.status_code != 200:
+        return None
+
+    return codec.loads(response.content).get('users', [])
+
+
+def fetch_tournament(
+    client: 'LichessClient',
+    kind: str,
+    tournament_id: str,
+    nb: int = 3,
+) -> Optional[dict]:
+    """Fetch a tournament's summary and its top standings.
+
+    :param client: the Lichess API client
+    :param kind: the kind of tournament (``tournament`` for an arena, or
+                 ``swiss``), from :data:`TOURNAMENT_PATHS`
+    :param tournament_id: the tournament's ID
+    :param nb: number of standings to fetch
+    :return: the tournament's data, with its top ``nb`` results as a list
+             in ``standings``; ``None`` if not found
+
+    The results are streamed, and the response is closed once ``nb``
+    results are read: the results of thousands of players are never
+    downloaded for the top few.
+    """
+    path = TOURNAMENT_PATHS[kind] % tournament_id
+    response = client.get(
+        path,
+        endpoint=ENDPOINT_TOURNAMENT,
+        headers={'Accept': 'application/json'})
+
+    if response.status_code != 200:
+        return None
+
+    data = codec.loads(response.content)
+    data['standings'] = []
+    if nb <= 0:
+        return data
+
+    response = client.get(
+        path + '/results',
+        endpoint=ENDPOINT_TOURNAMENT,
+        params={'nb': nb},
+        headers={'Accept': 'application/x-ndjson'},
+        stream=True)
+
+    if response.status_code != 200:
+        response.close()
+        return data
+
+    data['standings'] = list(ndjson.read_objects(response, limit=nb))
+    return data
+
+
+def fetch_pgn_headers(
+    client: 'LichessClient',
+    source: str,
+    pgn_id: str,
+    nb: int = 3,
+) -> Optional[List[Dict[str, str]]]:
+    """Fetch the headers of the first games of a PGN export.
+
+    :param client: the Lichess API client
+    :param source: the source of the export (``study``, ``chapter``,
+                   ``broadcast``, or ``round``), from :data:`PGN_PATHS`
+    :param pgn_id: the ID of the study, chapter, broadcast, or round
+                   (a chapter's ID is ``<studyId>/<chapterId>``)
+    :param nb: number of games to read
+    :return: the tag pairs of the first ``nb`` games' headers; ``None``
+             if not found
+
+    The export is streamed, and the response is closed once ``nb``
+    headers are read: the moves of a study's chapters, or of a
+    broadcast's games, are never downloaded past the headers needed.
+    """
+    params = PGN_EXPORT_PARAMS if source in ('study', 'chapter') else None
+    response = client.get(
+        PGN_PATHS[source] % pgn_id,
+        endpoint=ENDPOINT_STUDY,
+        params=params,
+        headers={'Accept': 'application/x-chess-pgn'},
+        stream=True)
+
+    if response.status_code != 200:
+        response.close()
+        return None
+
+    return list(pgn.read_headers(response, limit=nb))
+
+
+def stream_games(
+    client: 'LichessClient',
+    stream_id: str,
+    game_ids: List[str],
+    *,
+    timeout: Optional[float] = None,
+) -> Optional['requests.Response']:
+    """Open a stream of the status of several games.
+
+    :param client: the Lichess API client
+    :param stream_id: the stream's ID, chosen by the caller
+    :param game_ids: the games' IDs
+    :param timeout: optional timeout overriding the client's default
+    :return: the streamed NDJSON response, or ``None`` on error
+
+    Lichess sends each game once when the stream starts, then again each
+    time a game starts or is over. Games can be added to the stream with
+    :func:`add_games_to_stream`. The caller must close the response.
+    """
+    response = client.post(
+        '/api/stream/games/%s' % stream_id,
+        endpoint=ENDPOINT_STREAM,
+        data=','.join(game_ids),
+        headers={'Content-Type': 'text/plain'},
+        stream=True,
+        timeout=timeout)
+
+    if response.status_code != 200:
+        response.close()
+        return None
+
+    return response
+
+
+def add_games_to_stream(
+    client: 'LichessClient',
+    stream_id: str,
+    game_ids: List[str],
+) -> bool:
+    """Add games to a stream opened with :func:`stream_games`.
+
+    :param client: the Lichess API client
+    :param stream_id: the stream's ID
+    :param game_ids: the IDs of the games to add
+    :return: ``True`` if the games were added
+    """
+    response = client.post(
+        '/api/stream/games/%s/add' % stream_id,
+        endpoint=ENDPOINT_STREAM,
+        data=','.join(game_ids),
+        headers={'Content-Type': 'text/plain'})
+
+    return response.status_code == 200
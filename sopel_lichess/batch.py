@@ -0,0 +1,159 @@
+"""Micro-batching of Lichess API lookups."""
+from __future__ import generator_stop
+
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+Deliver = Callable[[Hashable, Any], None]
+"""Callback used by a resolver to deliver the value of one key."""
+Resolver = Callable[[List[Hashable], Deliver], Optional[Future]]
+"""Function resolving a batch of keys."""
+
+
+class Batcher:
+    """Collect lookups for a short window and resolve them in batches.
+
+    :param resolve: function called with a batch of keys and a ``deliver``
+                    callback to call with each key and its value
+    :param window: time (in seconds) to wait for more keys before resolving
+                   a batch; ``0`` resolves each key on its own right away
+    :param max_size: maximum number of keys in a batch
+
+    Each call to :meth:`submit` returns a future for the key's value. The
+    first key of a batch starts the window; when the window elapses or when
+    the batch is full, the batch is resolved and every key not delivered by
+    the resolver gets ``None`` as value. If the resolver raises an
+    exception, the futures not yet delivered get that exception.
+
+    The resolver can also return a future instead of delivering every key
+    before it returns, for example when the batch is resolved by a
+    coroutine: the batch is then complete once that future is done.
+
+    The batcher keeps a histogram of its batches' sizes, available through
+    :meth:`stats`.
+    """
+    def __init__(
+        self,
+        resolve: Resolver,
+        *,
+        window: float,
+        max_size: int,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError(
+                'max_size must be at least 1, got %d' % max_size)
+
+        self.window = window
+        self.max_size = max_size
+        self._resolve = resolve
+        self._lock = threading.Lock()
+        self._pending: 'OrderedDict[Hashable, Future]' = OrderedDict()
+        self._timer: Optional[threading.Timer] = None
+        self._sizes: 'Counter[int]' = Counter()
+
+    def submit(self, key: Hashable) -> Future:
+        """Submit a lookup for ``key``.
+
+        :param key: the key to look up
+        :return: a future for the key's value
+
+        When the same key is submitted more than once for the same batch,
+        the same future is returned.
+        """
+        future: Future
+        if self.window <= 0:
+            future = Future()
+            self._run(OrderedDict([(key, future)]))
+            return future
+
+        batch = None
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+
+            future = Future()
+            self._pending[key] = future
+
+            if len(self._pending) >= self.max_size:
+                batch = self._take_batch()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if batch:
+            self._run(batch)
+
+        return future
+
+    def flush(self) -> None:
+        """Resolve the pending batch now."""
+        with self._lock:
+            batch = self._take_batch()
+
+        if batch:
+            self._run(batch)
+
+    def close(self) -> None:
+        """Stop waiting and resolve the pending batch."""
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the batcher's statistics.
+
+        :return: a dict with the number of batches, the number of keys,
+                 the histogram of batch sizes (as a ``{size: count}`` dict),
+                 and the number of keys waiting for the next batch
+        """
+        with self._lock:
+            sizes = dict(sorted(self._sizes.items()))
+            pending = len(self._pending)
+
+        return {
+            'batches': sum(sizes.values()),
+            'keys': sum(size * count for size, count in sizes.items()),
+            'sizes': sizes,
+            'pending': pending,
+        }
+
+    def _take_batch(self) -> 'OrderedDict[Hashable, Future]':
+        # must be called with the lock acquired
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch = self._pending
+        self._pending = OrderedDict()
+        return batch
+
+    def _run(self, batch: 'OrderedDict[Hashable, Future]') -> None:
+        with self._lock:
+            self._sizes[len(batch)] += 1
+
+        def deliver(key: Hashable, value: Any) -> None:
+            future = batch.get(key)
+            if future is not None and not future.done():
+                future.set_result(value)
+
+        def complete(error: Optional[BaseException]) -> None:
+            for future in batch.values():
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(None)
+
+        try:
+            outcome = self._resolve(list(batch), deliver)
+        except Exception as error:  # pylint: disable=broad-except
+            complete(error)
+            return
+
+        if outcome is None:
+            complete(None)
+        else:
+            outcome.add_done_callback(
+                lambda outcome: complete(outcome.exception()))
@@ -0,0 +1,251 @@
+"""In-memory caches for Lichess API data."""
+from __future__ import generator_stop
+
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from sopel_lichess.futures import after, resolved
+
+LOGGER = logging.getLogger(__name__)
+
+
+def spawn_thread(target: Callable[[], None]) -> None:
+    """Run ``target`` in a new daemon thread."""
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional time-to-live per entry.
+
+    :param maxsize: maximum number of entries; ``0`` disables the cache
+    :param clock: function returning the current time in seconds
+
+    When the cache is full, the least recently used entry is evicted. An
+    entry stored with a ``ttl`` expires after that many seconds, while an
+    entry stored without one stays in the cache until it is evicted.
+    """
+    def __init__(
+        self,
+        maxsize: int,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, Optional[float]]]'
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_entry(
+        self,
+        key: Hashable,
+    ) -> Optional[Tuple[Any, Optional[float]]]:
+        # must be called with the lock acquired
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expire_at = entry[1]
+        if expire_at is not None and expire_at <= self._clock():
+            del self._entries[key]
+            return None
+
+        return entry
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get the value stored for ``key``.
+
+        :param key: the entry's key
+        :return: the stored value or ``None`` if missing or expired
+        """
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """Store ``value`` for ``key``.
+
+        :param key: the entry's key
+        :param value: the value to store
+        :param ttl: optional time-to-live (in seconds) of the entry
+
+        If ``ttl`` is zero or negative, the value is not stored.
+        """
+        if self.maxsize <= 0 or (ttl is not None and ttl <= 0):
+            return
+
+        expire_at = None
+        if ttl is not None:
+            expire_at = self._clock() + ttl
+
+        with self._lock:
+            self._entries[key] = (value, expire_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Remove the entry for ``key``.
+
+        :param key: the entry's key
+        :return: the removed value or ``None`` if missing
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[0] if entry is not None else None
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Get the cache's statistics.
+
+        :return: a dict with the cache's size, hits, misses, and evictions
+        """
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class RefreshingCache:
+    """LRU cache refreshing stale entries in the background.
+
+    :param maxsize: maximum number of entries; ``0`` disables the cache
+    :param refresh_after: age (in seconds) after which an entry is stale
+    :param max_age: age (in seconds) after which an entry is discarded
+    :param clock: function returning the current time in seconds
+    :param spawn: function running a refresh in the background
+
+    A stale entry is still returned as is, but the first access to it also
+    triggers a background refresh using the loader given to :meth:`get`;
+    only one refresh per key can run at the same time. An entry older than
+    ``max_age`` is discarded and loaded again by the caller.
+    """
+    def __init__(
+        self,
+        maxsize: int,
+        *,
+        refresh_after: float,
+        max_age: float,
+        clock: Callable[[], float] = time.monotonic,
+        spawn: Callable[[Callable[[], None]], None] = spawn_thread,
+    ) -> None:
+        self.refresh_after = refresh_after
+        self.max_age = max_age
+        self.refreshes = 0
+        self._clock = clock
+        self._spawn = spawn
+        self._cache = LRUCache(maxsize, clock=clock)
+        self._refreshing: Set[Hashable] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(
+        self,
+        key: Hashable,
+        loader: Callable[[], Future],
+    ) -> Future:
+        """Get the value for ``key``, using ``loader`` to (re)load it.
+
+        :param key: the entry's key
+        :param loader: function returning a future for the value, resolved
+                       with ``None`` if there is no value for this key
+        :return: a future for the value of this key
+
+        The ``loader`` is called from the caller's thread when the entry is
+        missing or too old, and from the background otherwise.
+        """
+        entry = self._cache.get(key)
+        if entry is None:
+            return after(loader(), functools.partial(self._store, key))
+
+        value, loaded_at = entry
+        if self._clock() - loaded_at >= self.refresh_after:
+            self._schedule_refresh(key, loader)
+
+        return resolved(value)
+
+    def set(self, key: Hashable, value: Optional[Any]) -> None:
+        """Store ``value`` for ``key``, unless ``value`` is ``None``."""
+        if value is not None:
+            self._cache.set(key, (value, self._clock()), ttl=self.max_age)
+
+    def _store(self, key: Hashable, future: Future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            self.set(key, future.result())
+
+    def _schedule_refresh(
+        self,
+        key: Hashable,
+        loader: Callable[[], Future],
+    ) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def done(future: Future) -> None:
+            try:
+                self.set(key, future.result())
+                self.refreshes += 1
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception('Unable to refresh cache entry %r', key)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        def refresh() -> None:
+            try:
+                future = loader()
+            except Exception as error:  # pylint: disable=broad-except
+                future = Future()
+                future.set_exception(error)
+            future.add_done_callback(done)
+
+        self._spawn(refresh)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Get the cache's statistics.
+
+        :return: a dict with the cache's size, hits, misses, evictions, and
+                 background refreshes
+        """
+        stats = self._cache.stats()
+        stats['refreshes'] = self.refreshes
+        return stats
@@ -0,0 +1,179 @@
+"""HTTP client for the Lichess API."""
+from __future__ import generator_stop
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
+from urllib.parse import urlsplit
+
+from sopel_lichess.metrics import REQUEST_SECONDS, RESPONSES_TOTAL, Metrics
+from sopel_lichess.ratelimit import Priority, RateLimiter, parse_retry_after
+
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+BASE_URL = 'https://lichess.org'
+"""Base URL of the Lichess API."""
+DEFAULT_MAX_CONNECTIONS = 4
+"""Default maximum number of concurrent requests per host."""
+DEFAULT_TIMEOUT = 10.0
+"""Default timeout (in seconds) of a request."""
+
+
+class LichessClient:
+    """Connection-pooled HTTP client for the Lichess API.
+
+    :param api_token: Lichess personal API token
+    :param base_url: base URL of the Lichess API
+    :param max_connections: maximum number of concurrent requests per host
+    :param timeout: timeout (in seconds) of each request
+    :param rate_limiter: optional rate limiter to schedule requests
+    :param metrics: optional registry of the requests' metrics
+
+    The client can be shared between threads: each host gets its own
+    connection pool and its own semaphore, so at most ``max_connections``
+    requests are in flight for a given host, and independent requests don't
+    wait for each other.
+
+    With a ``rate_limiter``, each request first acquires a token for its
+    endpoint class, and a ``429 Too Many Requests`` response makes every
+    request back off for the time asked by Lichess.
+
+    :mod:`requests` is only imported when the first client is created, so
+    the plugin stays fast to load.
+    """
+    def __init__(
+        self,
+        api_token: str,
+        *,
+        base_url: str = BASE_URL,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        timeout: float = DEFAULT_TIMEOUT,
+        rate_limiter: Optional[RateLimiter] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        if max_connections < 1:
+            raise ValueError(
+                'max_connections must be at least 1, got %d'
+                % max_connections)
+
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics if metrics is not None else Metrics()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._slots_lock = threading.Lock()
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        adapter = HTTPAdapter(
+            pool_maxsize=max_connections,
+            pool_block=True,
+        )
+        self._session = requests.Session()
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._session.headers.update({
+            'Authorization': 'Bearer %s' % api_token,
+        })
+
+    def get_slot(self, url: str) -> threading.BoundedSemaphore:
+        """Get the concurrency slot for the host of ``url``.
+
+        :param url: the URL to request
+        :return: the semaphore limiting concurrent requests to this host
+        """
+        host = urlsplit(url).netloc
+        with self._slots_lock:
+            slot = self._slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_connections)
+                self._slots[host] = slot
+        return slot
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        endpoint: str = 'default',
+        priority: Priority = Priority.NORMAL,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Union[str, bytes]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        stream: bool = False,
+        timeout: Optional[float] = None,
+    ) -> 'requests.Response':
+        """Send a ``method`` request to ``path``.
+
+        :param method: the HTTP method (``GET``, ``POST``, etc.)
+        :param path: the path to request, relative to the base URL
+        :param endpoint: the endpoint class, used for rate limiting
+        :param priority: the priority of the request
+        :param params: optional query parameters
+        :param data: optional body of the request
+        :param headers: optional extra headers
+        :param stream: if ``True``, don't download the body right away
+        :param timeout: optional timeout overriding the client's default
+        :return: the HTTP response
+        :raise ~sopel_lichess.ratelimit.RequestShed: when the rate limiter
+                                                     sheds the request
+        """
+        metrics = self.metrics
+        started_at = time.perf_counter()
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(endpoint, priority)
+
+        url = self.base_url + path
+        with self.get_slot(url):
+            sent_at = time.perf_counter()
+            metrics.observe(
+                REQUEST_SECONDS, sent_at - started_at,
+                endpoint=endpoint, phase='wait')
+            try:
+                response = self._session.request(
+                    method,
+                    url,
+                    params=params,
+                    data=data,
+                    headers=headers,
+                    stream=stream,
+                    timeout=timeout or self.timeout,
+                )
+            except Exception:
+                metrics.increment(
+                    RESPONSES_TOTAL, endpoint=endpoint, status='error')
+                raise
+            finally:
+                metrics.observe(
+                    REQUEST_SECONDS, time.perf_counter() - sent_at,
+                    endpoint=endpoint, phase='http')
+
+        metrics.increment(
+            RESPONSES_TOTAL, endpoint=endpoint, status=response.status_code)
+
+        if response.status_code == 429 and self.rate_limiter is not None:
+            self.rate_limiter.backoff(
+                parse_retry_after(response.headers.get('Retry-After')))
+
+        return response
+
+    def get(self, path: str, **kwargs: Any) -> 'requests.Response':
+        """Send a ``GET`` request to ``path``.
+
+        See :meth:`request` for the accepted keyword arguments.
+        """
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs: Any) -> 'requests.Response':
+        """Send a ``POST`` request to ``path``.
+
+        See :meth:`request` for the accepted keyword arguments.
+        """
+        return self.request('POST', path, **kwargs)
+
+    def close(self) -> None:
+        """Close the client and its connection pools."""
+        self._session.close()
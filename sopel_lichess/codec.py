@@ -0,0 +1,92 @@
+"""JSON codec of the plugin: a fast library if installed, or the stdlib.
+
+Decoding the Lichess API's responses, and its NDJSON streams in particular,
+is where the plugin spends most of its CPU time. When ``orjson`` (or
+``ujson``) is installed, the plugin uses it instead of :mod:`json`::
+
+    $ pip install sopel-lichess[fast]
+
+Every codec decodes straight from the bytes of a response, and encodes to
+bytes. The library is imported on first use, not with the plugin.
+"""
+from __future__ import generator_stop
+
+import functools
+import importlib
+import importlib.util
+import json
+from typing import Any, Callable, NamedTuple, Optional, Union
+
+STDLIB = 'json'
+"""Name of the stdlib's codec, always available."""
+FAST_LIBRARIES = ('orjson', 'ujson')
+"""Fast JSON libraries, by order of preference."""
+
+Data = Union[bytes, bytearray, str]
+"""JSON document to decode."""
+
+
+class Codec(NamedTuple):
+    """Functions to decode and encode JSON with a library."""
+    name: str
+    """Name of the library."""
+    loads: Callable[[Data], Any]
+    """Decode a JSON document, from bytes or from a string."""
+    dumps: Callable[[Any], bytes]
+    """Encode an object as a compact JSON document, in UTF-8 bytes."""
+
+
+def is_available(name: str) -> bool:
+    """Tell if the JSON library ``name`` is installed, without importing
+    it."""
+    return name == STDLIB or importlib.util.find_spec(name) is not None
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(
+        obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+@functools.lru_cache(maxsize=None)
+def get_codec(name: Optional[str] = None) -> Codec:
+    """Get the codec of a JSON library.
+
+    :param name: the library's name (``orjson``, ``ujson``, or ``json``);
+                 by default, the first available from
+                 :data:`FAST_LIBRARIES`, or else the stdlib
+    :raise ValueError: when the library is not supported
+    :raise ImportError: when the library is not installed
+    """
+    if name is None:
+        name = next(
+            (library for library in FAST_LIBRARIES if is_available(library)),
+            STDLIB)
+
+    if name == STDLIB:
+        return Codec(STDLIB, json.loads, _stdlib_dumps)
+
+    if name not in FAST_LIBRARIES:
+        raise ValueError('Unsupported JSON library: %s' % name)
+
+    module: Any = importlib.import_module(name)
+    if name == 'orjson':
+        return Codec(name, module.loads, module.dumps)
+
+    def dumps(obj: Any) -> bytes:
+        return module.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    return Codec(name, module.loads, dumps)
+
+
+def loads(data: Data) -> Any:
+    """Decode a JSON document with the default codec.
+
+    :param data: the document, preferably as bytes
+    :raise ValueError: when the document is not valid JSON
+    """
+    return get_codec().loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode an object as compact JSON with the default codec."""
+    return get_codec().dumps(obj)
@@ -3,8 +3,99 @@ from __future__ import generator_stop
 
 from sopel.config import types  # type: ignore
 
+BACKEND_SYNC = 'sync'
+"""Backend using blocking requests from Sopel's handler threads."""
+BACKEND_ASYNCIO = 'asyncio'
+"""Backend using an event loop thread (requires ``aiohttp``)."""
+
 
 class LichessSection(types.StaticSection):
     """Lichess configuration section."""
     api_token = types.SecretAttribute('api_token', default=None)
     """Lichess personnal API token."""
+    max_connections = types.ValidatedAttribute(
+        'max_connections', int, default=4)
+    """Maximum number of concurrent requests to the Lichess API."""
+    timeout = types.ValidatedAttribute('timeout', float, default=10.0)
+    """Timeout (in seconds) of a request to the Lichess API."""
+    game_cache_size = types.ValidatedAttribute(
+        'game_cache_size', int, default=512)
+    """Maximum number of games kept in cache (``0`` to disable)."""
+    game_cache_ttl = types.ValidatedAttribute(
+        'game_cache_ttl', float, default=30.0)
+    """Time (in seconds) to keep an ongoing game in cache."""
+    player_cache_size = types.ValidatedAttribute(
+        'player_cache_size', int, default=256)
+    """Maximum number of players kept in cache (``0`` to disable)."""
+    player_cache_refresh = types.ValidatedAttribute(
+        'player_cache_refresh', float, default=60.0)
+    """Age (in seconds) after which a player is refreshed in background."""
+    player_cache_max_age = types.ValidatedAttribute(
+        'player_cache_max_age', float, default=600.0)
+    """Maximum age (in seconds) of a player in cache."""
+    tournament_cache_size = types.ValidatedAttribute(
+        'tournament_cache_size', int, default=64)
+    """Maximum number of finished tournaments kept in cache (``0`` to
+    disable)."""
+    tournament_standings = types.ValidatedAttribute(
+        'tournament_standings', int, default=3)
+    """Number of top players shown for a tournament."""
+    study_games = types.ValidatedAttribute('study_games', int, default=3)
+    """Number of chapters (or games) shown for a study or a broadcast."""
+    prefetch_interval = types.ValidatedAttribute(
+        'prefetch_interval', float, default=0.0)
+    """Time (in seconds) between two prefetches of the TV channels and of the
+    daily puzzle (``0`` to disable)."""
+    leaderboard_refresh = types.ValidatedAttribute(
+        'leaderboard_refresh', float, default=600.0)
+    """Age (in seconds) after which a leaderboard is refreshed in background.
+    """
+    leaderboard_max_age = types.ValidatedAttribute(
+        'leaderboard_max_age', float, default=3600.0)
+    """Maximum age (in seconds) of a leaderboard in cache."""
+    batch_window = types.ValidatedAttribute(
+        'batch_window', float, default=0.02)
+    """Time (in seconds) to collect lookups into a batch (``0`` to disable)."""
+    batch_max_size = types.ValidatedAttribute(
+        'batch_max_size', int, default=50)
+    """Maximum number of lookups in a batch."""
+    rate_limit = types.ValidatedAttribute('rate_limit', float, default=2.0)
+    """Number of requests per second for each kind of Lichess endpoint."""
+    rate_burst = types.ValidatedAttribute('rate_burst', int, default=10)
+    """Maximum number of requests in a burst."""
+    rate_max_wait = types.ValidatedAttribute(
+        'rate_max_wait', float, default=5.0)
+    """Maximum time (in seconds) a lookup waits before being dropped."""
+    backend = types.ChoiceAttribute(
+        'backend', [BACKEND_SYNC, BACKEND_ASYNCIO], default=BACKEND_SYNC)
+    """HTTP backend: ``sync`` or ``asyncio`` (requires ``aiohttp``)."""
+    game_store_size = types.ValidatedAttribute(
+        'game_store_size', int, default=64)
+    """Maximum size (in MiB) of finished games stored on disk (``0`` to
+    disable)."""
+    game_store_file = types.ValidatedAttribute(
+        'game_store_file', default='lichess-games.db')
+    """Database file of finished games (relative to Sopel's homedir)."""
+    max_links_per_message = types.ValidatedAttribute(
+        'max_links_per_message', int, default=3)
+    """Maximum number of Lichess links handled in a message."""
+    output_window = types.ValidatedAttribute(
+        'output_window', float, default=0.5)
+    """Maximum time (in seconds) to gather the results of a message."""
+    output_cooldown = types.ValidatedAttribute(
+        'output_cooldown', float, default=30.0)
+    """Time (in seconds) before the same result is said again to the same
+    channel (``0`` to disable)."""
+    follow_games = types.ValidatedAttribute(
+        'follow_games', bool, default=False)
+    """Announce the result of ongoing games once they are over."""
+    follow_max_per_channel = types.ValidatedAttribute(
+        'follow_max_per_channel', int, default=10)
+    """Maximum number of ongoing games followed per channel."""
+    metrics_file = types.ValidatedAttribute('metrics_file', default=None)
+    """Metrics file in the Prometheus text format (relative to Sopel's
+    homedir; disabled by default)."""
+    profile_file = types.ValidatedAttribute(
+        'profile_file', default='lichess-profile.txt')
+    """File of the ``.lichess profile`` command's results (relative to
+    Sopel's homedir)."""
@@ -0,0 +1,194 @@
+"""Persistent on-disk cache for finished Lichess games."""
+from __future__ import generator_stop
+
+import threading
+import time
+import zlib
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from sopel_lichess import codec
+
+if TYPE_CHECKING:  # pragma: no cover
+    import sqlite3
+
+MAX_PENDING_ACCESSES = 1024
+"""Maximum number of access times kept in memory until the next store."""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_accessed_at ON games (accessed_at);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    count INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals (id, count, size)
+    SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM games
+    WHERE NOT EXISTS (SELECT 1 FROM totals);
+CREATE TRIGGER IF NOT EXISTS games_insert AFTER INSERT ON games BEGIN
+    UPDATE totals SET count = count + 1, size = size + NEW.size
+    WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS games_delete AFTER DELETE ON games BEGIN
+    UPDATE totals SET count = count - 1, size = size - OLD.size
+    WHERE id = 0;
+END;
+"""
+
+
+class DiskCache:
+    """SQLite-backed cache of finished games, shared between processes.
+
+    :param filename: path to the SQLite database file
+    :param max_size: maximum size (in bytes) of the stored games
+    :param timeout: time (in seconds) to wait for another process's lock
+    :param clock: function returning the current time in seconds
+
+    Games are stored as zlib-compressed JSON, keyed by game ID. The cache
+    uses a single connection, shared by every thread behind a lock, and the
+    database uses SQLite's write-ahead log so several bot instances can
+    share the same file. When the stored games exceed ``max_size`` bytes,
+    the least recently used ones are evicted.
+
+    Getting a game doesn't write to the database: its access time is kept
+    in memory, and written with the next stored game. The number and the
+    total size of the stored games are kept up to date by triggers, so a
+    store never scans the whole table.
+
+    Only finished games should be stored: they never change, so an entry
+    never expires.
+    """
+    def __init__(
+        self,
+        filename: str,
+        *,
+        max_size: int,
+        timeout: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.filename = filename
+        self.max_size = max_size
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._accessed: Dict[str, float] = {}
+
+        import sqlite3
+
+        self._connection: Optional['sqlite3.Connection'] = sqlite3.connect(
+            filename,
+            timeout=timeout,
+            check_same_thread=False,
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+
+        with self._connection as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> 'sqlite3.Connection':
+        # to be called with the lock held
+        if self._connection is None:
+            raise RuntimeError('The disk cache is closed')
+        return self._connection
+
+    def get(self, game_id: str) -> Optional[dict]:
+        """Get the stored data of a game.
+
+        :param game_id: the game's ID
+        :return: the game's data, or ``None`` if not stored
+        """
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT data FROM games WHERE id = ?', (game_id,),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            if (game_id in self._accessed
+                    or len(self._accessed) < MAX_PENDING_ACCESSES):
+                self._accessed[game_id] = self._clock()
+
+        return codec.loads(zlib.decompress(row[0]))
+
+    def set(self, game_id: str, data: dict) -> None:
+        """Store the data of a finished game.
+
+        :param game_id: the game's ID
+        :param data: the game's data
+        """
+        blob = zlib.compress(codec.dumps(data))
+        if self.max_size <= 0 or len(blob) > self.max_size:
+            return
+
+        with self._lock, self._connect() as connection:
+            accessed, self._accessed = self._accessed, {}
+            connection.executemany(
+                'UPDATE games SET accessed_at = ? WHERE id = ?',
+                [(accessed_at, key) for key, accessed_at in accessed.items()])
+            # delete then insert, so the triggers count the replaced game
+            connection.execute('DELETE FROM games WHERE id = ?', (game_id,))
+            connection.execute(
+                'INSERT INTO games (id, data, size, accessed_at) '
+                'VALUES (?, ?, ?, ?)',
+                (game_id, blob, len(blob), self._clock()))
+            self._evict(connection)
+
+    def _evict(self, connection: 'sqlite3.Connection') -> None:
+        total = connection.execute(
+            'SELECT size FROM totals WHERE id = 0').fetchone()[0]
+        if total <= self.max_size:
+            return
+
+        rows = connection.execute(
+            'SELECT id, size FROM games ORDER BY accessed_at')
+        evicted = []
+        for game_id, size in rows:
+            if total <= self.max_size:
+                break
+            evicted.append((game_id,))
+            total -= size
+
+        connection.executemany('DELETE FROM games WHERE id = ?', evicted)
+        self.evictions += len(evicted)
+
+    def close(self) -> None:
+        """Close the connection to the database.
+
+        The cache must not be used once closed.
+        """
+        with self._lock:
+            connection, self._connection = self._connection, None
+
+        if connection is not None:
+            connection.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the cache's statistics.
+
+        :return: a dict with the number of stored games, their total size,
+                 and the cache's hits, misses, and evictions
+        """
+        with self._lock:
+            count, size = self._connect().execute(
+                'SELECT count, size FROM totals WHERE id = 0',
+            ).fetchone()
+
+        return {
+            'count': count,
+            'size': size,
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,283 @@
+"""Follow ongoing Lichess games until they are over."""
+from __future__ import generator_stop
+
+import logging
+import secrets
+import threading
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional, Set
+
+from sopel_lichess import api, ndjson, parsers
+from sopel_lichess.cache import spawn_thread
+
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+    from sopel_lichess.client import LichessClient
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_STREAM_TIMEOUT = 300.0
+"""Default time (in seconds) to wait for news from the games stream."""
+DEFAULT_RETRY_DELAY = 5.0
+"""Default time (in seconds) to wait before reopening a dropped stream."""
+STREAM_CONNECTIONS = 2
+"""Connections used by a follower: one for its stream, one to add games."""
+
+OnOver = Callable[[str, Set[str]], None]
+"""Callback called with a game's ID and its channels once it is over."""
+
+
+class GameFollower:
+    """Follow ongoing games on one shared stream, until they are over.
+
+    :param client: the Lichess API client, dedicated to the follower
+    :param on_over: function called with a game's ID and the channels that
+                    followed it, once the game is over
+    :param max_per_channel: maximum number of games followed per channel
+    :param stream_id: ID of the stream; a random one by default
+    :param timeout: time (in seconds) to wait for news from the stream
+                    before reopening it
+    :param retry_delay: time (in seconds) to wait before reopening a
+                        dropped stream
+    :param spawn: function running the stream reader in a new thread
+    :param sleep: function used to wait
+
+    Every followed game shares the same connection to the games stream of
+    Lichess, read by a single thread: the reader starts with the first
+    followed game, games followed later are added to the open stream, and
+    the reader stops once no game is followed anymore.
+
+    Lichess can't remove a game from a stream: once a game is unfollowed by
+    every channel, the stream is reopened without it.
+
+    The open stream holds one of the ``client``'s connections for as long as
+    a game is followed: the client should not be shared with lookups, which
+    would otherwise wait for a free connection. It needs
+    :data:`STREAM_CONNECTIONS` connections.
+    """
+    def __init__(
+        self,
+        client: 'LichessClient',
+        *,
+        on_over: OnOver,
+        max_per_channel: int,
+        stream_id: Optional[str] = None,
+        timeout: float = DEFAULT_STREAM_TIMEOUT,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+        spawn: Callable[[Callable[[], None]], None] = spawn_thread,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.client = client
+        self.max_per_channel = max_per_channel
+        self.stream_id = stream_id or 'sopel-%s' % secrets.token_hex(8)
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.reconnections = 0
+        self._on_over = on_over
+        self._spawn = spawn
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._games: Dict[str, Set[str]] = {}
+        self._channels: 'Counter[str]' = Counter()
+        self._running = False
+        self._closed = False
+        self._response: Optional['requests.Response'] = None
+        self._reopen = False
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def __contains__(self, game_id: object) -> bool:
+        return game_id in self._games
+
+    def follow(self, game_id: str, channel: str) -> bool:
+        """Follow a game for a channel.
+
+        :param game_id: the game's ID
+        :param channel: the channel to announce the game's result to
+        :return: ``True`` if the game is followed for this channel, or
+                 ``False`` if the channel already follows too many games
+        """
+        start = add = False
+        with self._lock:
+            if self._closed:
+                return False
+
+            channels = self._games.get(game_id)
+            if channels is not None and channel in channels:
+                return True
+
+            if self._channels[channel] >= self.max_per_channel:
+                return False
+
+            if channels is None:
+                if len(self._games) >= api.MAX_GAMES_PER_STREAM:
+                    return False
+                channels = self._games[game_id] = set()
+                start = not self._running
+                add = self._response is not None
+                self._running = True
+
+            channels.add(channel)
+            self._channels[channel] += 1
+
+        if start:
+            self._spawn(self._read)
+        elif add:
+            self._add([game_id])
+
+        return True
+
+    def unfollow(self, game_id: str, channel: str) -> bool:
+        """Stop following a game for a channel.
+
+        :param game_id: the game's ID
+        :param channel: the channel that followed the game
+        :return: ``True`` if the game was followed for this channel
+        """
+        with self._lock:
+            channels = self._games.get(game_id)
+            if channels is None or channel not in channels:
+                return False
+
+            channels.discard(channel)
+            self._release(channel)
+            response = None
+            if not channels:
+                del self._games[game_id]
+                response = self._response
+                self._reopen = response is not None
+
+        if response is not None:
+            # the reader reopens the stream without this game
+            response.close()
+
+        return True
+
+    def followed(self, channel: str) -> int:
+        """Get the number of games followed for a ``channel``."""
+        with self._lock:
+            return self._channels[channel]
+
+    def close(self) -> None:
+        """Stop following every game and close the stream."""
+        with self._lock:
+            self._closed = True
+            self._games.clear()
+            self._channels.clear()
+            response = self._response
+
+        if response is not None:
+            response.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Get the follower's statistics.
+
+        :return: a dict with the number of followed games, the number of
+                 channels following them, and the number of reconnections
+        """
+        with self._lock:
+            return {
+                'games': len(self._games),
+                'channels': len(self._channels),
+                'reconnections': self.reconnections,
+            }
+
+    def _release(self, channel: str) -> None:
+        # must be called with the lock acquired
+        self._channels[channel] -= 1
+        if self._channels[channel] <= 0:
+            del self._channels[channel]
+
+    def _add(self, game_ids: Iterable[str]) -> None:
+        try:
+            added = api.add_games_to_stream(
+                self.client, self.stream_id, list(game_ids))
+        except Exception:  # pylint: disable=broad-except
+            LOGGER.exception('Unable to add games to the Lichess stream.')
+            return
+
+        if not added:
+            LOGGER.warning('Unable to add games to the Lichess stream.')
+
+    def _land(self, game_id: str) -> None:
+        with self._lock:
+            channels = self._games.pop(game_id, None)
+            for channel in channels or ():
+                self._release(channel)
+
+        if channels:
+            try:
+                self._on_over(game_id, channels)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception('Unable to announce game %s.', game_id)
+
+    def _read(self) -> None:
+        while True:
+            with self._lock:
+                game_ids = list(self._games)
+                if self._closed or not game_ids:
+                    self._running = False
+                    return
+
+            if self._stream(game_ids):
+                continue
+
+            with self._lock:
+                retry = bool(self._games) and not self._closed
+            if retry:
+                self.reconnections += 1
+                self._sleep(self.retry_delay)
+
+    def _stream(self, game_ids: Iterable[str]) -> bool:
+        # read the stream once; return True if every game is over, or if the
+        # stream must be reopened right away for an unfollowed game
+        try:
+            response = api.stream_games(
+                self.client,
+                self.stream_id,
+                list(game_ids),
+                timeout=self.timeout,
+            )
+        except Exception:  # pylint: disable=broad-except
+            LOGGER.exception('Unable to open the Lichess games stream.')
+            return False
+
+        if response is None:
+            LOGGER.warning('Unable to open the Lichess games stream.')
+            return False
+
+        with self._lock:
+            self._response = response
+            missing = set(self._games).difference(game_ids)
+
+        if missing:
+            # followed while the stream was opening
+            self._add(missing)
+
+        try:
+            for data in ndjson.read_objects(response):
+                if parsers.is_game_over(data):
+                    self._land(data.get('id'))
+
+                with self._lock:
+                    if not self._games:
+                        return True
+        except Exception:  # pylint: disable=broad-except
+            with self._lock:
+                dropped = (
+                    bool(self._games)
+                    and not self._closed
+                    and not self._reopen
+                )
+            if dropped:
+                LOGGER.exception('Lichess games stream dropped.')
+        finally:
+            response.close()
+            with self._lock:
+                self._response = None
+                reopen, self._reopen = self._reopen, False
+
+        return reopen
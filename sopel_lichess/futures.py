@@ -0,0 +1,80 @@
+"""Helpers for futures used by lookups."""
+from __future__ import generator_stop
+
+from concurrent.futures import Future
+from typing import Any, Callable
+
+
+def resolved(value: Any) -> Future:
+    """Get a future already resolved with ``value``."""
+    future: Future = Future()
+    future.set_result(value)
+    return future
+
+
+def call(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Call ``func`` and get its outcome as a resolved future.
+
+    :param func: the function to call
+    :return: a future resolved with the value returned by ``func``, or
+             with the exception it raised
+    """
+    future: Future = Future()
+    try:
+        future.set_result(func(*args, **kwargs))
+    except Exception as error:  # pylint: disable=broad-except
+        future.set_exception(error)
+    return future
+
+
+def after(future: Future, callback: Callable[[Future], None]) -> Future:
+    """Get a future resolved as ``future`` once ``callback`` was called.
+
+    :param future: the future to wait for
+    :param callback: function called with ``future`` once it is done
+    :return: a new future, resolved with the outcome of ``future`` after
+             ``callback`` returned
+
+    Unlike with :meth:`~concurrent.futures.Future.add_done_callback`, code
+    waiting for the returned future can rely on the callback's side effects,
+    such as storing the result in a cache.
+    """
+    chained: Future = Future()
+
+    def done(future: Future) -> None:
+        try:
+            callback(future)
+        finally:
+            error = future.exception()
+            if error is not None:
+                chained.set_exception(error)
+            else:
+                chained.set_result(future.result())
+
+    future.add_done_callback(done)
+    return chained
+
+
+def then(future: Future, func: Callable[[Any], Any]) -> Future:
+    """Get a future resolved with ``func`` called with ``future``'s result.
+
+    :param future: the future to wait for
+    :param func: function called with the result of ``future``
+    :return: a new future, resolved with the value returned by ``func``, or
+             with the exception raised by ``future`` or by ``func``
+    """
+    chained: Future = Future()
+
+    def done(future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            chained.set_exception(error)
+            return
+
+        try:
+            chained.set_result(func(future.result()))
+        except Exception as func_error:  # pylint: disable=broad-except
+            chained.set_exception(func_error)
+
+    future.add_done_callback(done)
+    return chained
@@ -0,0 +1,259 @@
+"""Metrics of the lichess plugin: histograms and counters."""
+from __future__ import generator_stop
+
+import bisect
+import contextlib
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+    10.0,
+)
+"""Default upper bounds (in seconds) of the latency histograms' buckets."""
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 300)
+"""Upper bounds of the batch sizes histogram's buckets."""
+
+REQUEST_SECONDS = 'lichess_request_seconds'
+"""Histogram of requests' latency, by endpoint class and phase.
+
+The ``wait`` phase is the time spent waiting for the rate limiter and for
+a free connection; the ``http`` phase is the time to get the response.
+"""
+RESPONSES_TOTAL = 'lichess_responses_total'
+"""Counter of responses, by endpoint class and HTTP status (or ``error``)."""
+HANDLER_SECONDS = 'lichess_handler_seconds'
+"""Histogram of handlers' latency, by handler and phase.
+
+The ``lookup`` phase is the time to get the data (from a cache or from the
+Lichess API), the ``parse`` phase is the time to format it, and the ``say``
+phase is the time to send it.
+"""
+BATCH_SIZE = 'lichess_batch_size'
+"""Histogram of batches' sizes (number of keys), by batcher."""
+
+Labels = Tuple[Tuple[str, str], ...]
+"""Sorted ``(name, value)`` pairs identifying a series of a metric."""
+
+
+def make_labels(**labels: object) -> Labels:
+    """Get the labels of a series from keyword arguments."""
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Histogram:
+    """Histogram of observed values, such as latencies.
+
+    :param buckets: sorted upper bounds of the buckets
+
+    Values greater than the last bound are counted in an implicit ``+Inf``
+    bucket. This class is not thread-safe by itself.
+    """
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float, count: int = 1) -> None:
+        """Count an observed ``value``, ``count`` times."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += count
+        self.count += count
+        self.sum += value * count
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """Get the cumulative count of each bucket, ``+Inf`` included."""
+        result = []
+        total = 0
+        bounds = self.buckets + (float('inf'),)
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the ``q`` quantile (between ``0`` and ``1``).
+
+        :return: the estimated value, or ``None`` if nothing was observed
+
+        The value is interpolated inside the bucket holding the quantile; a
+        quantile in the ``+Inf`` bucket is estimated as the last bound.
+        """
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        lower, previous = 0.0, 0
+        for bound, total in self.cumulative():
+            if total >= rank and total > previous:
+                if bound == float('inf'):
+                    return lower
+                return lower + (bound - lower) * (
+                    (rank - previous) / (total - previous))
+            lower, previous = bound, total
+
+        return lower  # pragma: no cover
+
+
+class Metrics:
+    """Thread-safe registry of counters and latency histograms.
+
+    :param buckets: upper bounds of the histograms' buckets
+    :param clock: function returning the current time in seconds
+
+    Each metric has a name, and a series per set of labels::
+
+        metrics.increment('lichess_responses_total',
+                          endpoint='game', status=200)
+        with metrics.time('lichess_request_seconds',
+                          endpoint='game', phase='http'):
+            ...
+    """
+    def __init__(
+        self,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        *,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.buckets = tuple(buckets)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def increment(self, name: str, value: float = 1, **labels: object) -> None:
+        """Increment the counter ``name`` by ``value``."""
+        key = make_labels(**labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: object) -> None:
+        """Observe a ``value`` in the histogram ``name``."""
+        key = make_labels(**labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextlib.contextmanager
+    def time(self, name: str, **labels: object) -> Iterator[None]:
+        """Observe the time spent in a ``with`` block."""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self._clock() - start, **labels)
+
+    def counters(self, name: str) -> Dict[Labels, float]:
+        """Get a copy of the series of the counter ``name``."""
+        with self._lock:
+            return dict(self._counters.get(name, {}))
+
+    def quantiles(
+        self,
+        name: str,
+        qs: Sequence[float] = (0.5, 0.95, 0.99),
+    ) -> Dict[Labels, Tuple[int, List[Optional[float]]]]:
+        """Get the count and the quantiles of each series of a histogram.
+
+        :return: a dict of ``(count, [quantile, ...])`` by labels
+        """
+        with self._lock:
+            return {
+                labels: (
+                    histogram.count,
+                    [histogram.quantile(q) for q in qs],
+                )
+                for labels, histogram in self._histograms.get(
+                    name, {}).items()
+            }
+
+    def to_prometheus(
+        self,
+        gauges: Optional[Dict[str, Dict[Labels, float]]] = None,
+        histograms: Optional[Dict[str, Dict[Labels, Histogram]]] = None,
+    ) -> str:
+        """Format every metric in the Prometheus text format.
+
+        :param gauges: optional gauges (such as caches' sizes) to include
+        :param histograms: optional histograms collected elsewhere (such as
+                           batches' sizes) to include
+        :return: the metrics, one sample per line
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append('# TYPE %s counter' % name)
+                for labels, value in sorted(series.items()):
+                    lines.append(format_sample(name, labels, value))
+
+            all_histograms = dict(self._histograms)
+            all_histograms.update(histograms or {})
+            for name, by_labels in sorted(all_histograms.items()):
+                lines.append('# TYPE %s histogram' % name)
+                for labels, histogram in sorted(by_labels.items()):
+                    for bound, total in histogram.cumulative():
+                        lines.append(format_sample(
+                            name + '_bucket',
+                            labels + (('le', format_value(bound)),),
+                            total))
+                    lines.append(format_sample(
+                        name + '_sum', labels, histogram.sum))
+                    lines.append(format_sample(
+                        name + '_count', labels, histogram.count))
+
+        for name, series in sorted((gauges or {}).items()):
+            lines.append('# TYPE %s gauge' % name)
+            for labels, value in sorted(series.items()):
+                lines.append(format_sample(name, labels, value))
+
+        return '\n'.join(lines) + '\n'
+
+
+def format_value(value: float) -> str:
+    """Format a sample's value for the Prometheus text format."""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_sample(name: str, labels: Labels, value: float) -> str:
+    """Format a sample as a line of the Prometheus text format."""
+    if not labels:
+        return '%s %s' % (name, format_value(value))
+
+    label_text = ','.join(
+        '%s="%s"' % (
+            label,
+            text.replace('\\', '\\\\').replace('"', '\\"').replace(
+                '\n', '\\n'),
+        )
+        for label, text in labels)
+    return '%s{%s} %s' % (name, label_text, format_value(value))
+
+
+def write_file(filename: str, text: str) -> None:
+    """Write ``text`` to ``filename`` atomically.
+
+    The text is written to a temporary file first, then moved, so readers
+    such as node_exporter's textfile collector never see a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_filename = tempfile.mkstemp(
+        dir=directory, prefix='.lichess-metrics-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+            tmp_file.write(text)
+        os.chmod(tmp_filename, 0o644)
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        os.unlink(tmp_filename)
+        raise
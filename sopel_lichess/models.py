@@ -0,0 +1,453 @@
+"""Compact models of Lichess data, built once from the API payloads.
+
+The Lichess API returns large JSON documents, of which the formatters only
+read a few fields. The models keep only these fields, in ``__slots__``
+instead of dicts, and intern the strings repeated across games (such as
+speeds, variants, statuses, titles, and openings), so cached entries take
+less memory and are faster to format.
+
+Each model can be built from an API payload with ``from_data``. A game can
+also be turned back into a (smaller) payload with ``to_data``, so the game
+store can keep it as JSON.
+"""
+from __future__ import generator_stop
+
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+def intern(value: Any) -> Optional[str]:
+    """Intern a string repeated across payloads, such as a speed."""
+    if value is None:
+        return None
+    return sys.intern(str(value))
+
+
+class Model:
+    """Base class of the models: equality and representation by slots."""
+    __slots__: Tuple[str, ...] = ()
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()  # type: ignore
+
+    def __repr__(self) -> str:
+        return '%s(%s)' % (type(self).__name__, ', '.join(
+            '%s=%r' % (name, getattr(self, name))
+            for name in self.__slots__))
+
+
+class Opening(Model):
+    """Opening of a game."""
+    __slots__ = ('eco', 'name')
+
+    def __init__(
+        self,
+        eco: Optional[str] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        self.eco = intern(eco)
+        self.name = intern(name)
+
+    @classmethod
+    def from_data(cls, data: dict) -> 'Opening':
+        """Build an opening from a game's ``opening`` dict."""
+        return cls(data.get('eco'), data.get('name'))
+
+    def to_data(self) -> Dict[str, Any]:
+        """Get the opening as an API payload."""
+        return _compact({'eco': self.eco, 'name': self.name})
+
+
+class GamePlayer(Model):
+    """Player of a game: a user, an AI, or an anonymous player."""
+    __slots__ = ('name', 'title', 'rating', 'rating_diff')
+
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        title: Optional[str] = None,
+        rating: Optional[int] = None,
+        rating_diff: int = 0,
+    ) -> None:
+        self.name = name
+        self.title = intern(title)
+        self.rating = rating
+        self.rating_diff = rating_diff
+
+    @classmethod
+    def from_data(cls, data: dict) -> 'GamePlayer':
+        """Build a game's player from a game's ``players`` entry."""
+        user = data.get('user') or {}
+        return cls(
+            name=user.get('name') or None,
+            title=user.get('title') or None,
+            rating=data.get('rating') or None,
+            rating_diff=int(data.get('ratingDiff') or 0),
+        )
+
+    def to_data(self) -> Dict[str, Any]:
+        """Get the game's player as an API payload."""
+        return _compact({
+            'user': _compact({'name': self.name, 'title': self.title}),
+            'rating': self.rating,
+            'ratingDiff': self.rating_diff or None,
+        })
+
+
+class Game(Model):
+    """Game, ongoing or over."""
+    __slots__ = (
+        'id', 'rated', 'speed', 'variant', 'status', 'winner', 'white',
+        'black', 'opening',
+    )
+
+    def __init__(
+        self,
+        id: Optional[str] = None,  # pylint: disable=redefined-builtin
+        *,
+        rated: bool = False,
+        speed: Optional[str] = None,
+        variant: Optional[str] = None,
+        status: Optional[str] = None,
+        winner: Optional[str] = None,
+        white: Optional[GamePlayer] = None,
+        black: Optional[GamePlayer] = None,
+        opening: Optional[Opening] = None,
+    ) -> None:
+        self.id = id
+        self.rated = rated
+        self.speed = intern(speed)
+        self.variant = intern(variant)
+        self.status = intern(status)
+        self.winner = intern(winner)
+        self.white = white or GamePlayer()
+        self.black = black or GamePlayer()
+        self.opening = opening
+
+    @classmethod
+    def from_data(cls, data: dict) -> 'Game':
+        """Build a game from a game export's payload."""
+        players = data.get('players') or {}
+        opening = data.get('opening')
+        return cls(
+            data.get('id'),
+            rated=bool(data.get('rated')),
+            speed=data.get('speed') or None,
+            variant=data.get('variant') or None,
+            status=data.get('statusName', data.get('status')) or None,
+            winner=data.get('winner') or None,
+            white=GamePlayer.from_data(players.get('white') or {}),
+            black=GamePlayer.from_data(players.get('black') or {}),
+            opening=Opening.from_data(opening) if opening else None,
+        )
+
+    def to_data(self) -> Dict[str, Any]:
+        """Get the game as an API payload."""
+        return _compact({
+            'id': self.id,
+            'rated': self.rated,
+            'speed': self.speed,
+            'variant': self.variant,
+            'status': self.status,
+            'winner': self.winner,
+            'players': {
+                'white': self.white.to_data(),
+                'black': self.black.to_data(),
+            },
+            'opening': self.opening.to_data() if self.opening else None,
+        })
+
+
+class Player(Model):
+    """Player's account."""
+    __slots__ = (
+        'id', 'username', 'title', 'games', 'rated_games', 'wins',
+        'following', 'followers', 'playing',
+    )
+
+    def __init__(
+        self,
+        id: Optional[str] = None,  # pylint: disable=redefined-builtin
+        *,
+        username: Optional[str] = None,
+        title: Optional[str] = None,
+        games: int = 0,
+        rated_games: int = 0,
+        wins: int = 0,
+        following: int = 0,
+        followers: int = 0,
+        playing: Optional[str] = None,
+    ) -> None:
+        self.id = id
+        self.username = username
+        self.title = intern(title)
+        self.games = games
+        self.rated_games = rated_games
+        self.wins = wins
+        self.following = following
+        self.followers = followers
+        self.playing = playing
+
+    @classmethod
+    def from_data(cls, data: dict) -> 'Player':
+        """Build a player from a user's payload."""
+        count = data.get('count') or {}
+        return cls(
+            data.get('id'),
+            username=data.get('username'),
+            title=data.get('title') or None,
+            games=count.get('all', 0),
+            rated_games=count.get('rated', 0),
+            wins=count.get('win', 0),
+            following=data.get('nbFollowing', 0),
+            followers=data.get('nbFollowers', 0),
+            playing=data.get('playing') or None,
+        )
+
+
+class Standing(Model):
+    """Player's standing in a tournament."""
+    __slots__ = ('rank', 'username', 'title', 'rating', 'score')
+
+    def __init__(
+        self,
+        rank: int = 0,
+        username: Optional[str] = None,
+        *,
+        title: Optional[str] = None,
+        rating: Optional[int] = None,
+        score: float = 0,
+    ) -> None:
+        self.rank = rank
+        self.username = username
+        self.title = intern(title)
+        self.rating = rating
+        self.score = score
+
+    @classmethod
+    def from_data(cls, data: dict) -> 'Standing':
+        """Build a standing from a tournament's results entry.
+
+        An arena's result has a ``score``, while a Swiss tournament's result
+        has ``points``.
+        """
+        return cls(
+            data.get('rank', 0),
+            data.get('username'),
+            title=data.get('title') or None,
+            rating=data.get('rating') or None,
+            score=data.get('score', data.get('points', 0)),
+        )
+
+
+class Tournament(Model):
+    """Arena or Swiss tournament, with its top standings."""
+    __slots__ = (
+        'id', 'kind', 'name', 'clock_limit', 'clock_increment', 'variant',
+        'rated', 'players', 'status', 'round', 'rounds', 'standings',
+    )
+
+    def __init__(
+        self,
+        id: Optional[str] = None,  # pylint: disable=redefined-builtin
+        *,
+        kind: str = 'tournament',
+        name: Optional[str] = None,
+        clock_limit: Optional[int] = None,
+        clock_increment: Optional[int] = None,
+        variant: Optional[str] = None,
+        rated: bool = False,
+        players: int = 0,
+        status: Optional[str] = None,
+        round: int = 0,  # pylint: disable=redefined-builtin
+        rounds: int = 0,
+        standings: Sequence[Standing] = (),
+    ) -> None:
+        self.id = id
+        self.kind = intern(kind)
+        self.name = name
+        self.clock_limit = clock_limit
+        self.clock_increment = clock_increment
+        self.variant = intern(variant)
+        self.rated = rated
+        self.players = players
+        self.status = intern(status)
+        self.round = round
+        self.rounds = rounds
+        self.standings: List[Standing] = list(standings)
+
+    @property
+    def is_finished(self) -> bool:
+        """Tell if the tournament is over."""
+        return self.status == 'finished'
+
+    @classmethod
+    def from_data(cls, data: dict, kind: str = 'tournament') -> 'Tournament':
+        """Build a tournament from its payload and its ``standings``.
+
+        :param data: an arena's or a Swiss tournament's payload
+        :param kind: the kind of tournament (``tournament`` for an arena,
+                     or ``swiss``)
+
+        An arena tells its status with ``isFinished`` and ``isStarted``,
+        while a Swiss tournament has a ``status``.
+        """
+        status = data.get('status')
+        if not isinstance(status, str):
+            status = (
+                'finished' if data.get('isFinished')
+                else 'started' if data.get('isStarted')
+                else 'created')
+
+        clock = data.get('clock') or {}
+        variant = data.get('variant')
+        if isinstance(variant, dict):
+            variant = variant.get('key')
+
+        return cls(
+            data.get('id'),
+            kind=kind,
+            name=data.get('fullName') or data.get('name'),
+            clock_limit=clock.get('limit'),
+            clock_increment=clock.get('increment'),
+            variant=variant or None,
+            rated=bool(data.get('rated')),
+            players=data.get('nbPlayers', 0),
+            status=status,
+            round=data.get('round', 0),
+            rounds=data.get('nbRounds', 0),
+            standings=[
+                Standing.from_data(standing)
+                for standing in data.get('standings') or ()
+            ],
+        )
+
+
+class Puzzle(Model):
+    """Puzzle, with the game it comes from."""
+    __slots__ = ('id', 'rating', 'plays', 'themes', 'game_id', 'perf')
+
+    def __init__(
+        self,
+        id: Optional[str] = None,  # pylint: disable=redefined-builtin
+        *,
+        rating: Optional[int] = None,
+        plays: int = 0,
+        themes: Sequence[str] = (),
+        game_id: Optional[str] = None,
+        perf: Optional[str] = None,
+    ) -> None:
+        self.id = id
+        self.rating = rating
+        self.plays = plays
+        self.themes: Tuple[Optional[str], ...] = tuple(
+            intern(theme) for theme in themes)
+        self.game_id = game_id
+        self.perf = intern(perf)
+
+    @classmethod
+    def from_data(cls, data: dict) -> 'Puzzle':
+        """Build a puzzle from its payload, with its ``puzzle`` and its
+        ``game``.
+
+        The puzzle's solution is not kept.
+        """
+        puzzle = data.get('puzzle') or {}
+        game = data.get('game') or {}
+        perf = game.get('perf') or {}
+        return cls(
+            puzzle.get('id'),
+            rating=puzzle.get('rating'),
+            plays=puzzle.get('plays', 0),
+            themes=puzzle.get('themes') or (),
+            game_id=game.get('id'),
+            perf=perf.get('key') or None,
+        )
+
+
+class Leader(Model):
+    """Player of a leaderboard."""
+    __slots__ = ('rank', 'id', 'username', 'title', 'rating', 'progress')
+
+    def __init__(
+        self,
+        rank: int = 0,
+        id: Optional[str] = None,  # pylint: disable=redefined-builtin
+        username: Optional[str] = None,
+        *,
+        title: Optional[str] = None,
+        rating: Optional[int] = None,
+        progress: int = 0,
+    ) -> None:
+        self.rank = rank
+        self.id = id
+        self.username = username
+        self.title = intern(title)
+        self.rating = rating
+        self.progress = progress
+
+    @classmethod
+    def from_data(cls, data: dict, perf: str, rank: int) -> 'Leader':
+        """Build a leader from a leaderboard's user.
+
+        :param data: the user's payload, with its ``perfs``
+        :param perf: the leaderboard's perf type
+        :param rank: the user's rank in the leaderboard
+        """
+        perf_data = (data.get('perfs') or {}).get(perf) or {}
+        username = data.get('username')
+        return cls(
+            rank,
+            data.get('id') or (username.lower() if username else None),
+            username,
+            title=data.get('title') or None,
+            rating=perf_data.get('rating') or None,
+            progress=int(perf_data.get('progress') or 0),
+        )
+
+
+class Leaderboard(Model):
+    """Top players of a perf type, indexed by rank and by ID."""
+    __slots__ = ('perf', 'leaders', 'index')
+
+    def __init__(self, perf: str, leaders: Sequence[Leader] = ()) -> None:
+        self.perf = intern(perf)
+        self.leaders: List[Leader] = list(leaders)
+        self.index: Dict[str, Leader] = {
+            leader.id: leader for leader in self.leaders if leader.id}
+        """Leaders by ID (their lowercase username)."""
+
+    def __len__(self) -> int:
+        return len(self.leaders)
+
+    def top(self, nb: int) -> List[Leader]:
+        """Get the top ``nb`` leaders."""
+        return self.leaders[:max(nb, 0)]
+
+    def get(self, username: str) -> Optional[Leader]:
+        """Get a leader by username (case insensitive).
+
+        :return: the leader, or ``None`` if not in the leaderboard
+        """
+        return self.index.get(username.lower())
+
+    @classmethod
+    def from_data(cls, data: Sequence[dict], perf: str) -> 'Leaderboard':
+        """Build a leaderboard from its users, by rank.
+
+        :param data: the users' payloads, by rank
+        :param perf: the leaderboard's perf type
+        """
+        return cls(perf, [
+            Leader.from_data(user, perf, rank)
+            for rank, user in enumerate(data, start=1)
+        ])
+
+
+def _compact(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in data.items() if value is not None}
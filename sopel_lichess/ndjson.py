@@ -0,0 +1,102 @@
+"""Streaming reader for NDJSON responses of the Lichess API."""
+from __future__ import generator_stop
+
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, List, Optional
+
+from sopel_lichess import codec
+
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+
+class LineBuffer:
+    """Incremental splitter of a stream of bytes into non-empty lines.
+
+    Feed it with chunks as they are received: each call to :meth:`feed`
+    returns the lines completed by that chunk, and :meth:`flush` returns
+    the last line if the stream doesn't end with a line separator.
+    """
+    def __init__(self) -> None:
+        self._pending = bytearray()
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Add a ``chunk`` to the buffer.
+
+        :param chunk: the next chunk of bytes
+        :return: the lines completed by this chunk, without separator
+        """
+        pending = self._pending
+        pending.extend(chunk)
+        lines = []
+        start = 0
+        end = pending.find(b'\n')
+        while end >= 0:
+            line = bytes(pending[start:end]).strip()
+            if line:
+                lines.append(line)
+            start = end + 1
+            end = pending.find(b'\n', start)
+        del pending[:start]
+        return lines
+
+    def flush(self) -> List[bytes]:
+        """Empty the buffer.
+
+        :return: the last line, if any, as a list of at most one line
+        """
+        line = bytes(self._pending).strip()
+        self._pending.clear()
+        return [line] if line else []
+
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Split a stream of ``chunks`` into non-empty lines.
+
+    :param chunks: chunks of bytes, as they are received
+    :return: an iterator of lines, without their line separator
+
+    Each line is yielded as soon as it is complete, without waiting for the
+    next chunk.
+    """
+    buffer = LineBuffer()
+    for chunk in chunks:
+        yield from buffer.feed(chunk)
+    yield from buffer.flush()
+
+
+def iter_objects(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Decode a stream of NDJSON ``chunks`` into objects.
+
+    :param chunks: chunks of bytes, as they are received
+    :return: an iterator of decoded objects, one per line
+    """
+    for line in iter_lines(chunks):
+        yield codec.loads(line)
+
+
+def read_objects(
+    response: 'requests.Response',
+    limit: Optional[int] = None,
+) -> Iterator[Any]:
+    """Decode objects from a streamed NDJSON ``response``.
+
+    :param response: a response obtained with ``stream=True``
+    :param limit: optional maximum number of objects to read
+    :return: an iterator of decoded objects
+
+    The response is closed once ``limit`` objects have been read, once the
+    body is exhausted, or when the iterator is closed, whichever comes
+    first: the rest of the body is never downloaded.
+    """
+    try:
+        count = 0
+        if limit is not None and limit <= 0:
+            return
+
+        for obj in iter_objects(response.iter_content(chunk_size=None)):
+            yield obj
+            count += 1
+            if limit is not None and count >= limit:
+                return
+    finally:
+        response.close()
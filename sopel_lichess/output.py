@@ -0,0 +1,229 @@
+"""Coalescing of the plugin's output, to stay under IRC flood limits.
+
+Each result of a message's links used to be its own IRC line, so a message
+with five links made the bot say five lines, and Sopel's flood protection
+then delayed everything else the bot had to say. Instead, the results of
+the same message are gathered into an :class:`OutputGroup`, then said in as
+few lines as the line length allows::
+
+    group = coalescer.open('#channel', send, expected=2, max_length=400)
+    group.add(('rated blitz (standard) | ...', ''))
+    group.add(None)  # a link without any result
+
+The group is flushed once every expected result is added, or once its
+window elapses, whichever comes first. A result said to the same
+destination within the cooldown is dropped.
+"""
+from __future__ import generator_stop
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from sopel_lichess.parsers import SEPARATOR
+
+Output = Tuple[str, str]
+"""Text of a result, and its trailing part (never truncated)."""
+Send = Callable[[str, str], None]
+"""Function saying a line's text, with its trailing part."""
+
+
+def get_length(text: str) -> int:
+    """Get the length of ``text`` in an IRC line (in bytes)."""
+    return len(text.encode('utf-8'))
+
+
+def pack_lines(outputs: List[Output], max_length: int) -> List[Output]:
+    """Pack results into as few lines as possible.
+
+    :param outputs: the results, in order
+    :param max_length: maximum length (in bytes) of a line's text
+    :return: the lines, in order
+
+    Results are joined with :data:`~.parsers.SEPARATOR`, in their order. A
+    result too long to fit a line is left on its own line, so its trailing
+    part is kept when the line is truncated.
+    """
+    lines: List[Output] = []
+    texts: List[str] = []
+    length = 0
+    for text, trailing in outputs:
+        full_text = text + trailing
+        full_length = get_length(full_text)
+        if texts and length + len(SEPARATOR) + full_length <= max_length:
+            texts.append(full_text)
+            length += len(SEPARATOR) + full_length
+            continue
+
+        if texts:
+            lines.append((SEPARATOR.join(texts), ''))
+            texts, length = [], 0
+
+        if full_length > max_length:
+            lines.append((text, trailing))
+        else:
+            texts, length = [full_text], full_length
+
+    if texts:
+        lines.append((SEPARATOR.join(texts), ''))
+
+    return lines
+
+
+class OutputGroup:
+    """Results of a triggering message, said together.
+
+    :param coalescer: the coalescer that opened the group
+    :param destination: the channel (or nick) to say the results to
+    :param send: function saying a line
+    :param expected: number of results to expect before flushing
+    :param max_length: maximum length (in bytes) of a line's text
+    """
+    def __init__(
+        self,
+        coalescer: 'OutputCoalescer',
+        destination: str,
+        send: Send,
+        *,
+        expected: int,
+        max_length: int,
+    ) -> None:
+        self.destination = destination
+        self._coalescer = coalescer
+        self._send = send
+        self._max_length = max_length
+        self._pending = expected
+        self._outputs: List[Output] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def add(self, output: Optional[Output]) -> None:
+        """Add one of the expected results.
+
+        :param output: the result, or ``None`` if there is nothing to say
+
+        The group is flushed when this is the last expected result.
+        """
+        keep = output is not None and self._coalescer.check(
+            self.destination, output)
+
+        with self._lock:
+            if keep and output not in self._outputs:
+                self._outputs.append(output)  # type: ignore
+            self._pending -= 1
+            complete = self._pending <= 0
+            window = self._coalescer.window
+            if not complete and window > 0 and self._timer is None:
+                self._timer = threading.Timer(window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if complete or window <= 0:
+            self.flush()
+
+    def flush(self) -> None:
+        """Say the results added so far."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            outputs, self._outputs = self._outputs, []
+
+        if not outputs:
+            return
+
+        lines = pack_lines(outputs, self._max_length)
+        self._coalescer.count(len(outputs), len(lines))
+        for text, trailing in lines:
+            self._send(text, trailing)
+
+
+class OutputCoalescer:
+    """Open output groups and drop the results said too recently.
+
+    :param window: maximum time (in seconds) a group waits for its results;
+                   ``0`` says each result right away
+    :param cooldown: time (in seconds) during which the same result is not
+                     said again to the same destination; ``0`` to disable
+    :param max_recent: maximum number of recent results remembered
+    :param clock: monotonic clock, in seconds
+    """
+    def __init__(
+        self,
+        *,
+        window: float,
+        cooldown: float,
+        max_recent: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.window = window
+        self.cooldown = cooldown
+        self.max_recent = max_recent
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._recent: 'OrderedDict[Hashable, float]' = OrderedDict()
+        self._results = 0
+        self._lines = 0
+        self._dropped = 0
+
+    def open(
+        self,
+        destination: str,
+        send: Send,
+        *,
+        expected: int,
+        max_length: int,
+    ) -> OutputGroup:
+        """Open a group for the results of a triggering message.
+
+        :param destination: the channel (or nick) to say the results to
+        :param send: function saying a line's text with its trailing part
+        :param expected: number of results to expect
+        :param max_length: maximum length (in bytes) of a line's text
+        """
+        return OutputGroup(
+            self, destination, send, expected=expected, max_length=max_length)
+
+    def check(self, destination: str, output: Output) -> bool:
+        """Tell if a result can be said, and remember it if so.
+
+        :return: ``False`` if the same result was said to the same
+                 destination within the cooldown
+        """
+        if self.cooldown <= 0:
+            return True
+
+        key = (destination.lower(), output)
+        now = self._clock()
+        with self._lock:
+            while self._recent:
+                oldest, said_at = next(iter(self._recent.items()))
+                if now - said_at < self.cooldown:
+                    break
+                del self._recent[oldest]
+
+            if key in self._recent:
+                self._dropped += 1
+                return False
+
+            self._recent[key] = now
+            while len(self._recent) > self.max_recent:
+                self._recent.popitem(last=False)
+        return True
+
+    def count(self, results: int, lines: int) -> None:
+        """Count results said in a number of lines."""
+        with self._lock:
+            self._results += results
+            self._lines += lines
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of results said, of lines, and of dropped
+        results."""
+        with self._lock:
+            return {
+                'results': self._results,
+                'lines': self._lines,
+                'dropped': self._dropped,
+            }
@@ -2,75 +2,146 @@
 from __future__ import generator_stop
 
 import unicodedata
-from typing import List, Optional, cast
+from typing import (Any, Callable, Dict, FrozenSet, List, Optional, Sequence,
+                    TypeVar, Union)
 
 from sopel import formatting  # type: ignore
 
+from sopel_lichess.models import (Game, GamePlayer, Leader, Leaderboard,
+                                  Player, Puzzle, Standing, Tournament)
+
 BLACK = unicodedata.lookup('BLACK MEDIUM SMALL SQUARE')
 WHITE = unicodedata.lookup('WHITE MEDIUM SMALL SQUARE')
 WINNER = unicodedata.lookup('TROPHY')
+SEPARATOR = ' | '
+"""Separator of the parts of a formatted result, and of results."""
+
+ONGOING_STATUSES = frozenset(('created', 'started'))
+"""Status of a game that is not over yet."""
+CLOCK_FRACTIONS = {15: '\N{VULGAR FRACTION ONE QUARTER}',
+                   30: '\N{VULGAR FRACTION ONE HALF}',
+                   45: '\N{VULGAR FRACTION THREE QUARTERS}'}
+"""Initial times (in seconds) below a minute, as shown by Lichess."""
+
+EXPORT_FLAGS = (
+    'moves', 'pgnInJson', 'tags', 'clocks', 'evals', 'accuracy', 'opening',
+    'division', 'literate',
+)
+"""Query parameters of Lichess's game export, each adding data to a game.
+
+Without these flags, a game has its players, type, status, and winner.
+"""
+
+GAME_FORMATTERS_NEEDS: Dict[str, FrozenSet[str]] = {}
+"""Export flags needed by each game formatter, by formatter's name."""
+
+Formatter = TypeVar('Formatter', bound=Callable[..., Any])
+
+
+def needs_export(*flags: str) -> Callable[[Formatter], Formatter]:
+    """Declare the export flags needed by a game formatter.
+
+    :param flags: flags from :data:`EXPORT_FLAGS`
+    :raise ValueError: when a flag is unknown
+
+    Games are exported with only the flags needed by the formatters, so
+    a formatter reading more of a game must declare it::
 
+        @needs_export('moves', 'clocks')
+        def format_game_moves(data: dict) -> str:
+            ...
 
-def format_player(data: dict) -> str:
-    """Format a player account ``data`` dict.
+    The fields it reads must also be kept by :class:`~.models.Game`.
+    """
+    unknown = set(flags).difference(EXPORT_FLAGS)
+    if unknown:
+        raise ValueError(
+            'Unknown export flags: %s' % ', '.join(sorted(unknown)))
+
+    def decorator(formatter: Formatter) -> Formatter:
+        GAME_FORMATTERS_NEEDS[formatter.__name__] = frozenset(flags)
+        return formatter
+    return decorator
+
+
+def get_export_params(
+    flags: Sequence[str] = EXPORT_FLAGS,
+) -> Dict[str, str]:
+    """Get the query parameters to export games for the formatters.
+
+    :param flags: the export flags supported by the endpoint
+    :return: every supported flag, ``true`` if a formatter needs it,
+             ``false`` otherwise
+    """
+    needed = frozenset().union(*GAME_FORMATTERS_NEEDS.values())
+    return {
+        flag: 'true' if flag in needed else 'false'
+        for flag in flags
+    }
+
+
+def format_player(data: Union[dict, Player]) -> str:
+    """Format a player account ``data`` dict (or :class:`Player`).
 
     :return: formatted player's account information
     """
+    player = data if isinstance(data, Player) else Player.from_data(data)
     parts: List[str]
 
     # names
-    name: str = cast(str, data.get('username', 'anonymous'))
-    title: str = cast(str, data.get('title'))
-    if title:
-        name = '%s %s' % (formatting.bold(title), name)
+    name = player.username or 'anonymous'
+    if player.title:
+        name = '%s %s' % (formatting.bold(player.title), name)
 
     parts = [name]
 
     # game count
-    count = data.get('count', {})
     game_count = 'Played %s rated/%s' % (
-        count.get('rated', 0),
-        count.get('all', 0),
+        player.rated_games,
+        player.games,
     )
     parts.append(game_count)
 
     # game won
-    parts.append('%s %s' % (WINNER, count.get('win', 0)))
+    parts.append('%s %s' % (WINNER, player.wins))
 
     # following/followers
     following = 'Following %d/%d' % (
-        data.get('nbFollowing', 0),
-        data.get('nbFollowers', 0),
+        player.following,
+        player.followers,
     )
     parts.append(following)
 
     # now playing
-    playing = data.get('playing')
-    if playing:
-        parts.append('Now playing: %s' % playing)
+    if player.playing:
+        parts.append('Now playing: %s' % player.playing)
 
     # join parts
-    return ' | '.join(parts)
+    return SEPARATOR.join(parts)
 
 
-def format_game_player(data: dict, *, mark: bool = False) -> str:
-    """Format a game's player ``data`` dict.
+def format_game_player(
+    data: Union[dict, GamePlayer],
+    *,
+    mark: bool = False,
+) -> str:
+    """Format a game's player ``data`` dict (or :class:`GamePlayer`).
 
     If ``mark`` is ``True``, the player's nick will be formatted with bold.
 
     :return: formatted player's game information
     """
-    rating = data.get('rating') or '???'
-    diff = int(data.get('ratingDiff') or '0')
-    user = data.get('user') or {}
-    name = user.get('name') or 'unknown'
-    title = user.get('title')
+    player = (
+        data if isinstance(data, GamePlayer) else GamePlayer.from_data(data))
+    rating = player.rating or '???'
+    diff = player.rating_diff
+    name = player.name or 'unknown'
 
     if mark:
         name = formatting.bold(name)
 
-    if title:
-        name = '%s %s' % (formatting.bold(title), name)
+    if player.title:
+        name = '%s %s' % (formatting.bold(player.title), name)
 
     rating_diff = '+0'
     if diff > 0:
@@ -81,11 +152,29 @@ def format_game_player(data: dict, *, mark: bool = False) -> str:
     return '%s (%s) %s' % (name, rating, rating_diff)
 
 
-def parse_game_type(data: dict) -> str:
+def is_game_over(data: Union[dict, Game]) -> bool:
+    """Tell if a game ``data`` dict (or :class:`Game`) is for a game that is
+    over.
+
+    A game without status is considered ongoing. Games from a games stream
+    have a numeric ``status`` and their status name in ``statusName``.
+    """
+    if isinstance(data, Game):
+        status = data.status
+    else:
+        status = data.get('statusName', data.get('status'))
+    return bool(status) and status not in ONGOING_STATUSES
+
+
+def parse_game_type(data: Union[dict, Game]) -> str:
     """Parse and format a game's type."""
-    is_rated = data.get('rated')
-    speed = data.get('speed')
-    variant = data.get('variant')
+    if isinstance(data, Game):
+        is_rated, speed, variant = data.rated, data.speed, data.variant
+    else:
+        # no need to build a whole game for three fields
+        is_rated = bool(data.get('rated'))
+        speed = data.get('speed')
+        variant = data.get('variant')
 
     game_type = 'unknown'
 
@@ -100,32 +189,35 @@ def parse_game_type(data: dict) -> str:
     return game_type
 
 
-def parse_game_data(data: dict, for_player: Optional[str] = None) -> List[str]:
-    """Parse and format a game ``data`` dict.
+@needs_export('opening')
+def parse_game_data(
+    data: Union[dict, Game],
+    for_player: Optional[str] = None,
+) -> List[str]:
+    """Parse and format a game ``data`` dict (or :class:`Game`).
 
     :return: an ordered list of formatted information for that game data
     """
+    game = data if isinstance(data, Game) else Game.from_data(data)
+
     # build output
     result: List[str] = []
 
     # game type (speed & variant)
-    result.append(parse_game_type(data))
+    result.append(parse_game_type(game))
 
     # players
-    players = data.get('players') or {}
-    white = players.get('white') or {}
-    black = players.get('black') or {}
+    white_username = format_game_player(
+        game.white, mark=for_player == 'white')
+    black_username = format_game_player(
+        game.black, mark=for_player == 'black')
 
-    white_username = format_game_player(white, mark=for_player == 'white')
-    black_username = format_game_player(black, mark=for_player == 'black')
-
-    who_won = data.get('winner')
     white_status = WHITE
     black_status = BLACK
 
-    if who_won == 'white':
+    if game.winner == 'white':
         white_status = '%s %s' % (WINNER, white_status)
-    elif who_won == 'black':
+    elif game.winner == 'black':
         black_status = '%s %s' % (black_status, WINNER)
 
     result.append(
@@ -138,11 +230,182 @@ def parse_game_data(data: dict, for_player: Optional[str] = None) -> List[str]:
     )
 
     # opening
-    opening = data.get('opening')
+    opening = game.opening
     if opening:
-        opening_info = opening.get('name') or '(unknown opening)'
-        eco = opening.get('eco') or '(?)'
+        opening_info = opening.name or '(unknown opening)'
+        eco = opening.eco or '(?)'
         opening_info = '%s: %s' % (eco, opening_info)
         result.append(opening_info)
 
     return result
+
+
+def format_clock(limit: Optional[int], increment: Optional[int]) -> str:
+    """Format a time control, such as ``3+2`` or ``½+0``.
+
+    :param limit: initial time (in seconds)
+    :param increment: increment (in seconds)
+    """
+    if limit is None:
+        return '?'
+
+    minutes = '%g' % (limit / 60)
+    if limit in CLOCK_FRACTIONS:
+        minutes = CLOCK_FRACTIONS[limit]
+
+    return '%s+%d' % (minutes, increment or 0)
+
+
+def format_standing(data: Union[dict, Standing]) -> str:
+    """Format a tournament's standing ``data`` dict (or :class:`Standing`).
+
+    :return: the player's rank, name, rating, and score
+    """
+    standing = (
+        data if isinstance(data, Standing) else Standing.from_data(data))
+    name = standing.username or 'unknown'
+    if standing.title:
+        name = '%s %s' % (formatting.bold(standing.title), name)
+
+    if standing.rank == 1:
+        name = '%s %s' % (WINNER, name)
+
+    return '#%d %s (%s) %g' % (
+        standing.rank, name, standing.rating or '???', standing.score)
+
+
+def parse_tournament_data(data: Tournament) -> List[str]:
+    """Parse and format a :class:`Tournament`, with its standings.
+
+    :return: an ordered list of formatted information for that tournament
+    """
+    result = [formatting.bold(data.name or 'Unknown tournament')]
+
+    # tournament type (rated, clock & variant)
+    result.append('%s %s (%s)' % (
+        'rated' if data.rated else 'unrated',
+        format_clock(data.clock_limit, data.clock_increment),
+        data.variant or 'standard',
+    ))
+
+    # status
+    status = data.status or 'created'
+    if data.kind == 'swiss' and data.rounds:
+        if data.is_finished:
+            status = '%s after %d rounds' % (status, data.rounds)
+        elif data.round:
+            status = 'round %d/%d' % (data.round, data.rounds)
+    result.append('%s, %d players' % (status, data.players))
+
+    # top standings
+    if data.standings:
+        result.append(', '.join(map(format_standing, data.standings)))
+
+    return result
+
+
+def parse_puzzle_data(data: Puzzle, title: str = 'Puzzle') -> List[str]:
+    """Parse and format a :class:`Puzzle`, without its solution.
+
+    :param data: the puzzle
+    :param title: the title of the puzzle, such as ``Daily puzzle``
+    :return: an ordered list of formatted information for that puzzle
+    """
+    result = [formatting.bold(title)]
+
+    details = []
+    if data.rating:
+        details.append('rating %d' % data.rating)
+    details.append('%d plays' % data.plays)
+    result.append(', '.join(details))
+
+    if data.perf:
+        result.append('from a %s game' % data.perf)
+
+    if data.themes:
+        result.append(', '.join(str(theme) for theme in data.themes))
+
+    return result
+
+
+def format_leader(data: Leader) -> str:
+    """Format a :class:`Leader`, such as a game's player with its rank.
+
+    :return: the player's rank, name, rating, and recent progress
+    """
+    return '#%d %s' % (data.rank, format_game_player(GamePlayer(
+        data.username,
+        data.title,
+        data.rating,
+        data.progress,
+    )))
+
+
+def parse_leader_data(data: Leader, perf: str) -> List[str]:
+    """Parse and format a :class:`Leader` of a ``perf`` leaderboard.
+
+    :return: an ordered list of formatted information for that leader
+    """
+    return [formatting.bold('%s leaderboard' % perf), format_leader(data)]
+
+
+def parse_leaderboard_data(data: Leaderboard, nb: int) -> List[str]:
+    """Parse and format the top ``nb`` players of a :class:`Leaderboard`.
+
+    :return: an ordered list of formatted information for that leaderboard
+    """
+    return [
+        formatting.bold('Top %d %s' % (min(nb, len(data)), data.perf)),
+        ', '.join(map(format_leader, data.top(nb))) or 'nobody',
+    ]
+
+
+def format_pgn_game(header: Dict[str, str], event: str = '') -> str:
+    """Format a game's PGN header, such as ``Alice vs Bob 1-0 (B90)``.
+
+    :param header: the tag pairs of the game's header
+    :param event: the game's name, used when its players are unknown
+    """
+    players = [header.get(side, '?') or '?' for side in ('White', 'Black')]
+    if players == ['?', '?']:
+        text = event or header.get('Event') or '?'
+    else:
+        text = '%s vs %s' % tuple(players)
+
+    result = header.get('Result')
+    if result and result != '*':
+        text = '%s %s' % (text, result)
+
+    eco = header.get('ECO')
+    if eco and eco != '?':
+        text = '%s (%s)' % (text, eco)
+
+    return text
+
+
+def parse_pgn_headers(headers: Sequence[Dict[str, str]]) -> List[str]:
+    """Parse and format the PGN headers of a study's or a broadcast's games.
+
+    :param headers: the tag pairs of the first games' headers
+    :return: an ordered list of formatted information for these games
+
+    When the games' events share a name (such as a study's chapters, named
+    ``<study>: <chapter>``), that name is said once, then each chapter's.
+    """
+    if not headers:
+        return []
+
+    events = [header.get('Event') or '' for header in headers]
+    name, sep, _ = events[0].partition(': ')
+    prefix = name + sep
+    if sep and all(event.startswith(prefix) for event in events):
+        events = [event[len(prefix):] for event in events]
+    else:
+        name = events[0]
+
+    return [
+        formatting.bold(name or 'Unknown event'),
+        ', '.join(
+            format_pgn_game(header, event)
+            for header, event in zip(headers, events)),
+    ]
@@ -0,0 +1,182 @@
+"""Streaming reader for the headers of PGN exports.
+
+A study or a broadcast is exported as a single PGN document with one game
+per chapter, which can be huge. The plugin only needs a few tag pairs of
+the first games, so :class:`HeaderParser` reads the PGN as it is
+received: it keeps the tag pairs of each game's header, skips its
+movetext without buffering it, and the reader stops after a number of
+games. Memory and latency don't depend on the size of the export.
+"""
+from __future__ import generator_stop
+
+import re
+from typing import (TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional,
+                    Sequence, Tuple)
+
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+
+HEADER_TAGS = ('Event', 'White', 'Black', 'Result', 'ECO')
+"""Tag pairs kept from each game's header."""
+MAX_TAG_LENGTH = 1024
+"""Maximum length (in bytes) of a tag pair's line; longer ones are skipped."""
+TAG_REGEX = re.compile(rb'^\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+ESCAPE_REGEX = re.compile(r'\\(.)')
+
+Header = Dict[str, str]
+"""Tag pairs of a game's header, by tag name."""
+
+
+def parse_tag(line: bytes) -> Optional[Tuple[str, str]]:
+    """Parse a tag pair's line, such as ``[White "Carlsen, Magnus"]``.
+
+    :return: the tag's name and value, or ``None`` if not a valid tag pair
+    """
+    match = TAG_REGEX.match(line)
+    if match is None:
+        return None
+
+    value = match.group(2).decode('utf-8', errors='replace')
+    return match.group(1).decode('ascii'), ESCAPE_REGEX.sub(r'\1', value)
+
+
+class HeaderParser:
+    """Incremental parser of the headers of a PGN document.
+
+    :param tags: names of the tag pairs to keep
+
+    Feed it with chunks as they are received: each call to :meth:`feed`
+    returns the headers completed by that chunk, and :meth:`flush` returns
+    the last header if the document ends without its movetext.
+
+    Only the current tag pair's line is buffered: the movetext is skipped
+    as it is received, however long it is.
+    """
+    LINE_START = 0
+    """The current line has only whitespace so far."""
+    LINE_TAG = 1
+    """The current line is a tag pair, kept until its end."""
+    LINE_SKIP = 2
+    """The current line is skipped until its end."""
+
+    def __init__(self, tags: Sequence[str] = HEADER_TAGS) -> None:
+        self.tags = frozenset(tags)
+        self._mode = self.LINE_START
+        self._line = bytearray()
+        self._header: Header = {}
+        self._in_header = False
+
+    def feed(self, chunk: bytes) -> List[Header]:
+        """Add a ``chunk`` of the document.
+
+        :param chunk: the next chunk of bytes
+        :return: the headers completed by this chunk
+        """
+        headers: List[Header] = []
+        start, size = 0, len(chunk)
+        while start < size:
+            end = chunk.find(b'\n', start)
+            stop = size if end < 0 else end
+            self._read(chunk[start:stop], headers)
+            if end < 0:
+                break
+
+            self._end_line(headers)
+            start = end + 1
+
+        return headers
+
+    def flush(self) -> List[Header]:
+        """Finish the document.
+
+        :return: the last header, if any, as a list of at most one header
+        """
+        headers: List[Header] = []
+        self._end_line(headers)
+        self._end_header(headers)
+        return headers
+
+    def _read(self, text: bytes, headers: List[Header]) -> None:
+        # read (a part of) the current line, without its line separator
+        if self._mode == self.LINE_START:
+            first = text.lstrip()[:1]
+            if not first:
+                return
+            if first == b'[':
+                self._mode = self.LINE_TAG
+                self._in_header = True
+            else:
+                # the movetext (or anything else) ends the header
+                self._end_header(headers)
+                self._mode = self.LINE_SKIP
+
+        if self._mode == self.LINE_TAG:
+            self._line.extend(text)
+            if len(self._line) > MAX_TAG_LENGTH:
+                self._line.clear()
+                self._mode = self.LINE_SKIP
+
+    def _end_line(self, headers: List[Header]) -> None:
+        if self._mode == self.LINE_TAG:
+            tag = parse_tag(bytes(self._line).strip())
+            if tag is not None and tag[0] in self.tags:
+                self._header[tag[0]] = tag[1]
+        elif self._mode == self.LINE_START:
+            # an empty line ends the header
+            self._end_header(headers)
+
+        self._line.clear()
+        self._mode = self.LINE_START
+
+    def _end_header(self, headers: List[Header]) -> None:
+        if self._in_header:
+            headers.append(self._header)
+        self._header = {}
+        self._in_header = False
+
+
+def iter_headers(
+    chunks: Iterable[bytes],
+    tags: Sequence[str] = HEADER_TAGS,
+) -> Iterator[Header]:
+    """Read the headers of a PGN document from a stream of ``chunks``.
+
+    :param chunks: chunks of bytes, as they are received
+    :param tags: names of the tag pairs to keep
+    :return: an iterator of headers, one per game
+    """
+    parser = HeaderParser(tags)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.flush()
+
+
+def read_headers(
+    response: 'requests.Response',
+    limit: Optional[int] = None,
+    tags: Sequence[str] = HEADER_TAGS,
+) -> Iterator[Header]:
+    """Read the headers of a streamed PGN ``response``.
+
+    :param response: a response obtained with ``stream=True``
+    :param limit: optional maximum number of headers to read
+    :param tags: names of the tag pairs to keep
+    :return: an iterator of headers, one per game
+
+    The response is closed once ``limit`` headers have been read, once the
+    body is exhausted, or when the iterator is closed, whichever comes
+    first: the rest of the body is never downloaded.
+    """
+    try:
+        count = 0
+        if limit is not None and limit <= 0:
+            return
+
+        for header in iter_headers(
+                response.iter_content(chunk_size=None), tags):
+            yield header
+            count += 1
+            if limit is not None and count >= limit:
+                return
+    finally:
+        response.close()
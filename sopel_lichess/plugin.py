@@ -1,58 +1,319 @@
 """Lichess plugin."""
 from __future__ import generator_stop
 
-import json
+import functools
+import os
 import re
 import threading
-from typing import Optional
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Hashable, List,
+                    Optional, Set, Tuple, Type)
 
-import requests
 from sopel import plugin  # type: ignore
 from sopel.bot import Sopel, SopelWrapper  # type: ignore
 from sopel.config import Config  # type: ignore
+from sopel.tools import get_logger  # type: ignore
 from sopel.trigger import Trigger  # type: ignore
 
-from sopel_lichess import config, parsers
+from sopel_lichess import api, config, futures, parsers, urls
+from sopel_lichess.batch import Batcher, Deliver
+from sopel_lichess.cache import LRUCache, RefreshingCache
+from sopel_lichess.client import LichessClient
+from sopel_lichess.diskcache import DiskCache
+from sopel_lichess.follow import STREAM_CONNECTIONS, GameFollower
+from sopel_lichess.metrics import (BATCH_SIZE, BATCH_SIZE_BUCKETS,
+                                   HANDLER_SECONDS, REQUEST_SECONDS,
+                                   RESPONSES_TOTAL, Histogram, Labels, Metrics,
+                                   make_labels, write_file)
+from sopel_lichess.models import Game, Leaderboard, Player, Puzzle, Tournament
+from sopel_lichess.output import Output, OutputCoalescer
+from sopel_lichess.profiling import ProfileSession, profiled
+from sopel_lichess.ratelimit import Priority, RateLimiter, RequestShed
+from sopel_lichess.singleflight import SingleFlight
+from sopel_lichess.snapshot import Snapshot
+from sopel_lichess.urls import Link
 
-# pattern
-BASE_PATTERN = re.escape(r'https://lichess.org/')
-"""Lichess base URL."""
-GAME_ID_PATTERN = r'(?P<game_id>[a-zA-Z0-9]{8})'
-"""Game ID pattern."""
-TRAILING_PATTERN = r'/?(:?\#.*)?$'
-"""Trailing pattern: optional trailing slash and anchor."""
-FOR_PLAYER_PATTERN = r'/(?P<for_player>white|black)'
-"""Game URL with a selected player (white or black)."""
+if TYPE_CHECKING:  # pragma: no cover
+    from sopel_lichess import aio
+
+LOGGER = get_logger('lichess')
 
 # constants
 MEMORY_KEY = '__sopel_lichess_api__'
-LOCK = threading.Lock()
+GAME_CACHE_KEY = '__sopel_lichess_games__'
+PLAYER_CACHE_KEY = '__sopel_lichess_players__'
+TOURNAMENT_CACHE_KEY = '__sopel_lichess_tournaments__'
+LEADERBOARD_CACHE_KEY = '__sopel_lichess_leaderboards__'
+PUZZLE_CACHE_KEY = '__sopel_lichess_puzzle__'
+PUZZLE_CACHE_TTL = 600
+"""Time (in seconds) the daily puzzle is cached without a snapshot."""
+GAME_BATCH_KEY = '__sopel_lichess_games_batch__'
+ASYNC_KEY = '__sopel_lichess_asyncio__'
+GAME_STORE_KEY = '__sopel_lichess_game_store__'
+FLIGHT_KEY = '__sopel_lichess_flights__'
+FOLLOW_KEY = '__sopel_lichess_follow__'
+RATE_LIMITER_KEY = '__sopel_lichess_rate_limiter__'
+METRICS_KEY = '__sopel_lichess_metrics__'
+METRICS_INTERVAL = 60
+"""Interval (in seconds) between two writes of the metrics file."""
+PROFILE_KEY = '__sopel_lichess_profile__'
+OUTPUT_KEY = '__sopel_lichess_output__'
+SNAPSHOT_KEY = '__sopel_lichess_snapshot__'
+SNAPSHOT_CHECK_INTERVAL = 5
+"""Interval (in seconds) between two checks for a due prefetch."""
+SNAPSHOT_MAX_AGE = 3
+"""Age (in prefetch intervals) after which the snapshot is not used."""
+PROFILE_TRIGGERS = 100
+"""Default maximum number of triggers profiled by ``.lichess profile``."""
+PROFILE_SECONDS = 300
+"""Default maximum duration (in seconds) of ``.lichess profile``."""
+LEADERBOARD_SHOWN = 5
+"""Default number of players shown by ``.lichess top``."""
+LEADERBOARD_MAX_SHOWN = 10
+"""Maximum number of players shown by ``.lichess top``."""
+LEADERBOARD_PERFS = {perf.lower(): perf for perf in api.LEADERBOARD_PERFS}
+"""Perf types with a leaderboard, by lowercase name."""
 OUTPUT_PREFIX = '[lichess] '
 
+LAZY_LOCK = threading.RLock()
+"""Lock used to create objects on first use, see :func:`get_lazy`."""
+
 
 def setup(bot: Sopel) -> None:
-    """Set up the plugin with its config section."""
+    """Set up the plugin with its config section.
+
+    The HTTP client (and the asyncio backend, if enabled) is created on
+    first use rather than here: see :func:`get_client` and
+    :func:`get_backend`.
+    """
     bot.settings.define_section('lichess', config.LichessSection)
     api_token = bot.settings.lichess.api_token
 
     if not api_token:
         raise ValueError('Missing required value for lichess.api_token')
 
-    client = requests.Session()
-    client.headers.update({
-        'Authorization': 'Bearer %s' % api_token,
-    })
+    bot.memory[METRICS_KEY] = Metrics()
+    bot.memory[RATE_LIMITER_KEY] = RateLimiter(
+        bot.settings.lichess.rate_limit,
+        bot.settings.lichess.rate_burst,
+        max_wait=bot.settings.lichess.rate_max_wait,
+    )
+    bot.memory[FLIGHT_KEY] = SingleFlight()
+    bot.memory[OUTPUT_KEY] = OutputCoalescer(
+        window=bot.settings.lichess.output_window,
+        cooldown=bot.settings.lichess.output_cooldown,
+    )
+    bot.memory[GAME_CACHE_KEY] = LRUCache(
+        bot.settings.lichess.game_cache_size)
+    bot.memory[TOURNAMENT_CACHE_KEY] = LRUCache(
+        bot.settings.lichess.tournament_cache_size)
+    bot.memory[LEADERBOARD_CACHE_KEY] = RefreshingCache(
+        len(api.LEADERBOARD_PERFS),
+        refresh_after=bot.settings.lichess.leaderboard_refresh,
+        max_age=bot.settings.lichess.leaderboard_max_age,
+    )
+    bot.memory[PUZZLE_CACHE_KEY] = LRUCache(1)
+
+    prefetch_interval = bot.settings.lichess.prefetch_interval
+    if prefetch_interval > 0:
+        bot.memory[SNAPSHOT_KEY] = Snapshot(
+            interval=prefetch_interval,
+            max_age=prefetch_interval * SNAPSHOT_MAX_AGE,
+        )
+
+    if bot.settings.lichess.game_store_size > 0:
+        bot.memory[GAME_STORE_KEY] = DiskCache(
+            os.path.join(
+                bot.settings.core.homedir,
+                bot.settings.lichess.game_store_file),
+            max_size=bot.settings.lichess.game_store_size * 1024 * 1024,
+        )
 
-    bot.memory[MEMORY_KEY] = client
+    bot.memory[PLAYER_CACHE_KEY] = RefreshingCache(
+        bot.settings.lichess.player_cache_size,
+        refresh_after=bot.settings.lichess.player_cache_refresh,
+        max_age=bot.settings.lichess.player_cache_max_age,
+    )
+    bot.memory[GAME_BATCH_KEY] = Batcher(
+        functools.partial(resolve_games, bot),
+        window=bot.settings.lichess.batch_window,
+        max_size=min(
+            bot.settings.lichess.batch_max_size, api.MAX_GAMES_PER_REQUEST),
+    )
 
 
 def shutdown(bot: Sopel) -> None:
     """Tear down the plugin."""
+    follower = bot.memory.pop(FOLLOW_KEY, None)
+    if follower is not None:
+        follower.close()
+        follower.client.close()
+
+    bot.memory.pop(GAME_CACHE_KEY, None)
+    bot.memory.pop(PLAYER_CACHE_KEY, None)
+    bot.memory.pop(TOURNAMENT_CACHE_KEY, None)
+    bot.memory.pop(LEADERBOARD_CACHE_KEY, None)
+    bot.memory.pop(PUZZLE_CACHE_KEY, None)
+    bot.memory.pop(SNAPSHOT_KEY, None)
+    bot.memory.pop(FLIGHT_KEY, None)
+    bot.memory.pop(OUTPUT_KEY, None)
+
+    batcher = bot.memory.pop(GAME_BATCH_KEY, None)
+    if batcher is not None:
+        batcher.close()
+
+    backend = bot.memory.pop(ASYNC_KEY, None)
+    if backend is not None:
+        backend.stop()
+
+    store = bot.memory.pop(GAME_STORE_KEY, None)
+    if store is not None:
+        store.close()
+
+    bot.memory.pop(RATE_LIMITER_KEY, None)
+    bot.memory.pop(METRICS_KEY, None)
+    bot.memory.pop(PROFILE_KEY, None)
+
+    try:
+        client = bot.memory.pop(MEMORY_KEY)
+    except KeyError:
+        return
+
+    if isinstance(client, LichessClient):
+        client.close()
+
+
+def get_lazy(bot: Sopel, key: str, factory: Callable[[], Any]) -> Any:
+    """Get ``bot.memory[key]``, created by ``factory`` on first use.
+
+    :param bot: the bot instance
+    :param key: the memory key of the object
+    :param factory: function creating the object
+    :return: the object stored in the bot's memory under ``key``
+    """
     try:
-        del bot.memory[MEMORY_KEY]
+        return bot.memory[key]
     except KeyError:
         pass
 
+    with LAZY_LOCK:
+        if key not in bot.memory:
+            bot.memory[key] = factory()
+        return bot.memory[key]
+
+
+def get_client(bot: Sopel) -> LichessClient:
+    """Get the Lichess API client, created on first use."""
+    def create() -> LichessClient:
+        return LichessClient(
+            bot.settings.lichess.api_token,
+            max_connections=bot.settings.lichess.max_connections,
+            timeout=bot.settings.lichess.timeout,
+            rate_limiter=bot.memory[RATE_LIMITER_KEY],
+            metrics=bot.memory[METRICS_KEY],
+        )
+
+    return get_lazy(bot, MEMORY_KEY, create)
+
+
+def get_backend(bot: Sopel) -> Optional['aio.AsyncBackend']:
+    """Get the asyncio backend, started on first use.
+
+    :return: the running asyncio backend, or ``None`` when the plugin uses
+             the sync backend
+    """
+    if bot.settings.lichess.backend != config.BACKEND_ASYNCIO:
+        return None
+
+    from sopel_lichess import aio
+
+    def create() -> Optional['aio.AsyncBackend']:
+        if not aio.is_available():
+            LOGGER.warning(
+                'The asyncio backend requires aiohttp; '
+                'using the sync backend instead.')
+            return None
+
+        backend = aio.AsyncBackend(
+            bot.settings.lichess.api_token,
+            max_connections=bot.settings.lichess.max_connections,
+            timeout=bot.settings.lichess.timeout,
+            rate_limiter=bot.memory[RATE_LIMITER_KEY],
+            metrics=bot.memory[METRICS_KEY],
+        )
+        backend.start()
+        return backend
+
+    return get_lazy(bot, ASYNC_KEY, create)
+
+
+def get_follower(bot: Sopel) -> Optional[GameFollower]:
+    """Get the follower of ongoing games, created on first use.
+
+    :return: the follower, or ``None`` when games are not followed
+    """
+    if not bot.settings.lichess.follow_games:
+        return None
+
+    def create() -> GameFollower:
+        # the stream holds a connection while it is open: it gets a client
+        # of its own, so lookups never wait for that connection
+        client = LichessClient(
+            bot.settings.lichess.api_token,
+            max_connections=STREAM_CONNECTIONS,
+            timeout=bot.settings.lichess.timeout,
+            rate_limiter=bot.memory[RATE_LIMITER_KEY],
+            metrics=bot.memory[METRICS_KEY],
+        )
+        return GameFollower(
+            client,
+            on_over=functools.partial(announce_game_over, bot),
+            max_per_channel=bot.settings.lichess.follow_max_per_channel,
+        )
+
+    return get_lazy(bot, FOLLOW_KEY, create)
+
+
+def resolve_games(
+    bot: Sopel,
+    game_ids: List[Hashable],
+    deliver: Deliver,
+    *,
+    priority: Priority = Priority.NORMAL,
+) -> Optional[Future]:
+    """Resolve a batch of games with the plugin's backend.
+
+    Each game is delivered as a :class:`~.models.Game`.
+    """
+    deliver_data = deliver_models(Game, deliver)
+    backend = get_backend(bot)
+    if backend is not None:
+        from sopel_lichess import aio
+
+        return backend.submit(aio.fetch_games(
+            backend, game_ids, deliver_data, priority=priority))
+
+    api.fetch_games(
+        get_client(bot), game_ids, deliver_data, priority=priority)
+    return None
+
+
+def deliver_models(
+    model: Type[Game],
+    deliver: Deliver,
+) -> api.Deliver:
+    """Wrap ``deliver`` to build a ``model`` from each delivered payload.
+
+    The payloads are parsed once, as they are fetched, so caches only keep
+    the compact models.
+    """
+    def deliver_model(key: Hashable, data: Optional[dict]) -> None:
+        deliver(key, None if data is None else model.from_data(data))
+
+    return deliver_model
+
 
 def configure(settings: Config) -> None:
     """Configuration wizard handler for the lichess plugin."""
@@ -63,59 +324,1186 @@ def configure(settings: Config) -> None:
     )
 
 
-@plugin.url(BASE_PATTERN + r'@/(?P<player_id>[^/\s]+)/?')
-@plugin.output_prefix(OUTPUT_PREFIX)
-def lichess_player(bot: SopelWrapper, trigger: Trigger) -> None:
+def when_done(
+    bot: SopelWrapper,
+    future: Future,
+    callback: Callable[[Any], None],
+    *,
+    handler: Optional[str] = None,
+) -> None:
+    """Call ``callback`` with the result of ``future`` once it is done.
+
+    :param bot: the bot wrapper of the current trigger
+    :param future: the future of a lookup
+    :param callback: function called with the lookup's result
+    :param handler: optional name of the handler, to measure the lookup's
+                    latency
+
+    With the sync backend, this waits for the lookup from the current
+    thread. With the asyncio backend, this returns right away, and the
+    callback is called by whichever thread completes the lookup, but never
+    by the event loop's thread (see :func:`detach`). In both cases, shed
+    requests are silently dropped.
+    """
+    if handler is not None:
+        callback = timed_lookup(bot, handler, callback)
+
+    if get_backend(bot) is None:
+        try:
+            result = future.result()
+        except RequestShed:
+            return
+        callback(result)
+        return
+
+    detach(bot, future).add_done_callback(
+        functools.partial(call_with_result, callback))
+
+
+def detach(bot: Sopel, future: Future) -> Future:
+    """Get a future resolved as ``future``, off the event loop's thread.
+
+    :param bot: the bot instance
+    :param future: the future of a lookup
+    :return: a future whose callbacks are free to block, such as to send
+             messages or to write to disk
+
+    With the sync backend, ``future`` itself is returned.
+    """
+    backend = get_backend(bot)
+    if backend is None:
+        return future
+
+    return backend.detach(future)
+
+
+def timed_lookup(
+    bot: SopelWrapper,
+    handler: str,
+    callback: Callable[[Any], None],
+) -> Callable[[Any], None]:
+    """Wrap ``callback`` to measure the latency of a lookup from now."""
+    metrics = bot.memory[METRICS_KEY]
+    started_at = time.perf_counter()
+
+    def timed(result: Any) -> None:
+        metrics.observe(
+            HANDLER_SECONDS, time.perf_counter() - started_at,
+            handler=handler, phase='lookup')
+        callback(result)
+
+    return timed
+
+
+def call_with_result(callback: Callable[[Any], None], future: Future) -> None:
+    """Call ``callback`` with the result of a done ``future``.
+
+    Shed requests are silently dropped, and other errors are logged.
+    """
+    try:
+        result = future.result()
+    except RequestShed:
+        return
+    except Exception:  # pylint: disable=broad-except
+        LOGGER.exception('Unable to look up Lichess data.')
+        return
+    callback(result)
+
+
+def lookup_player(bot: SopelWrapper, player_id: str) -> Future:
+    """Look up a player's account data.
+
+    :param bot: the bot wrapper of the current trigger
+    :param player_id: the player's ID (in lowercase)
+    :return: a future for the :class:`~.models.Player` (``None`` if not
+             found)
+    """
+    flights = bot.memory[FLIGHT_KEY]
+
+    def start() -> Future:
+        backend = get_backend(bot)
+        if backend is not None:
+            from sopel_lichess import aio
+
+            fetched = backend.submit(aio.fetch_player(backend, player_id))
+        else:
+            fetched = futures.call(
+                api.fetch_player, get_client(bot), player_id)
+
+        return futures.then(fetched, lambda data: (
+            None if data is None else Player.from_data(data)))
+
+    return bot.memory[PLAYER_CACHE_KEY].get(
+        player_id, lambda: flights.do((api.ENDPOINT_USER, player_id), start))
+
+
+def lookup_game(bot: SopelWrapper, game_id: str) -> Future:
+    """Look up a game's data.
+
+    :param bot: the bot wrapper of the current trigger
+    :param game_id: the game's ID
+    :return: a future for the :class:`~.models.Game` (``None`` if not
+             found)
+
+    The game is looked up in memory first, then in the game store on disk,
+    and then from the Lichess API. Once fetched, a finished game is saved
+    in both caches, while an ongoing game is kept in memory only.
+
+    Concurrent lookups of the same game share the same request.
+    """
+    cache = bot.memory[GAME_CACHE_KEY]
+    data = cache.get(game_id)
+    if data is not None:
+        return futures.resolved(data)
+
+    store = bot.memory.get(GAME_STORE_KEY)
+    if store is not None:
+        stored = store.get(game_id)
+        if stored is not None:
+            data = Game.from_data(stored)
+            cache.set(game_id, data)
+            return futures.resolved(data)
+
+    ongoing_ttl = bot.settings.lichess.game_cache_ttl
+
+    def save(future: Future) -> None:
+        if future.exception() is not None:
+            return
+
+        data = future.result()
+        if data is None:
+            return
+
+        if not parsers.is_game_over(data):
+            cache.set(game_id, data, ttl=ongoing_ttl)
+            return
+
+        cache.set(game_id, data)
+        if store is not None:
+            store.set(game_id, data.to_data())
+
+    batcher = bot.memory[GAME_BATCH_KEY]
+    return bot.memory[FLIGHT_KEY].do(
+        (api.ENDPOINT_GAME, game_id),
+        lambda: futures.after(detach(bot, batcher.submit(game_id)), save))
+
+
+def announce_game_over(bot: Sopel, game_id: str, channels: Set[str]) -> None:
+    """Announce the result of a followed game to its channels.
+
+    :param bot: the bot instance
+    :param game_id: the ID of the game that is over
+    :param channels: the channels that followed the game
+
+    The game is fetched again, as the cached data is for the ongoing game.
+    """
+    bot.memory[GAME_CACHE_KEY].pop(game_id)
+
+    def say_game(data: Optional[Game]) -> None:
+        if data is None:
+            return
+
+        line = parsers.SEPARATOR.join(parsers.parse_game_data(data))
+        game_url = 'https://lichess.org/%s' % game_id
+        for channel in sorted(channels):
+            bot.say(
+                OUTPUT_PREFIX + line,
+                channel,
+                trailing=parsers.SEPARATOR + game_url)
+
+    detach(bot, lookup_game(bot, game_id)).add_done_callback(
+        functools.partial(call_with_result, say_game))
+
+
+def lookup_tv_games(bot: SopelWrapper, channel_id: str) -> Future:
+    """Look up the games currently played on a TV channel.
+
+    :param bot: the bot wrapper of the current trigger
+    :param channel_id: the TV channel's ID
+    :return: a future for the list of :class:`~.models.Game`
+
+    The channel's game is taken from the prefetched snapshot, if any: the
+    channel is requested only if it is not in the snapshot.
+    """
+    snapshot = bot.memory.get(SNAPSHOT_KEY)
+    if snapshot is not None:
+        game = snapshot.get_tv_game(channel_id)
+        if game is not None:
+            return futures.resolved([game])
+
+    def start() -> Future:
+        backend = get_backend(bot)
+        if backend is not None:
+            from sopel_lichess import aio
+
+            fetched = backend.submit(aio.fetch_tv_games(backend, channel_id))
+        else:
+            fetched = futures.call(
+                api.fetch_tv_games, get_client(bot), channel_id)
+
+        return futures.then(fetched, lambda games: [
+            Game.from_data(data) for data in games])
+
+    return bot.memory[FLIGHT_KEY].do((api.ENDPOINT_TV, channel_id), start)
+
+
+def lookup_daily_puzzle(bot: SopelWrapper) -> Future:
+    """Look up the daily puzzle.
+
+    :param bot: the bot wrapper of the current trigger
+    :return: a future for the :class:`~.models.Puzzle` (``None`` if not
+             available)
+
+    The puzzle is taken from the prefetched snapshot, if any, and is
+    requested otherwise (then saved in the snapshot). Without a snapshot,
+    it is cached for :data:`PUZZLE_CACHE_TTL` seconds instead.
+    """
+    snapshot = bot.memory.get(SNAPSHOT_KEY)
+    cache = bot.memory[PUZZLE_CACHE_KEY]
+    if snapshot is not None:
+        puzzle = snapshot.get_puzzle()
+    else:
+        puzzle = cache.get('daily')
+
+    if puzzle is not None:
+        return futures.resolved(puzzle)
+
+    def start() -> Future:
+        backend = get_backend(bot)
+        if backend is not None:
+            from sopel_lichess import aio
+
+            fetched = backend.submit(aio.fetch_daily_puzzle(backend))
+        else:
+            fetched = futures.call(api.fetch_daily_puzzle, get_client(bot))
+
+        return futures.then(fetched, lambda data: (
+            None if data is None else Puzzle.from_data(data)))
+
+    def save(future: Future) -> None:
+        if future.exception() is not None:
+            return
+
+        data = future.result()
+        if data is None:
+            return
+
+        if snapshot is not None:
+            snapshot.set_puzzle(data)
+        else:
+            cache.set('daily', data, ttl=PUZZLE_CACHE_TTL)
+
+    return bot.memory[FLIGHT_KEY].do(
+        (api.ENDPOINT_PUZZLE, 'daily'),
+        lambda: futures.after(start(), save))
+
+
+def lookup_leaderboard(bot: SopelWrapper, perf: str) -> Future:
+    """Look up the leaderboard of a perf type.
+
+    :param bot: the bot wrapper of the current trigger
+    :param perf: the perf type, from :data:`~.api.LEADERBOARD_PERFS`
+    :return: a future for the :class:`~.models.Leaderboard` (``None`` if
+             not available)
+
+    Each leaderboard is fetched once, then kept in cache and refreshed in
+    the background: commands never wait for a request, except for a
+    leaderboard not fetched yet.
+    """
+    def start() -> Future:
+        backend = get_backend(bot)
+        if backend is not None:
+            from sopel_lichess import aio
+
+            fetched = backend.submit(aio.fetch_leaderboard(backend, perf))
+        else:
+            fetched = futures.call(
+                api.fetch_leaderboard, get_client(bot), perf)
+
+        return futures.then(fetched, lambda data: (
+            None if data is None else Leaderboard.from_data(data, perf)))
+
+    flights = bot.memory[FLIGHT_KEY]
+    return bot.memory[LEADERBOARD_CACHE_KEY].get(
+        perf,
+        lambda: flights.do((api.ENDPOINT_LEADERBOARD, perf), start))
+
+
+def refresh_snapshot(bot: Sopel, snapshot: Snapshot) -> None:
+    """Prefetch the current game of every TV channel, and the daily puzzle.
+
+    :param bot: the bot instance
+    :param snapshot: the snapshot to refresh
+
+    This takes three requests, made with a low priority: one for the
+    channels, one for their games, and one for the puzzle. It runs from an
+    interval job, so it waits for them. A part that can't be fetched is
+    left as is, until it is too old to be used.
+    """
+    backend = get_backend(bot)
+    if backend is not None:
+        from sopel_lichess import aio
+
+        channels = backend.submit(
+            aio.fetch_tv_channels(backend, priority=Priority.LOW))
+        puzzle = backend.submit(
+            aio.fetch_daily_puzzle(backend, priority=Priority.LOW))
+    else:
+        client = get_client(bot)
+        channels = futures.call(
+            api.fetch_tv_channels, client, priority=Priority.LOW)
+        puzzle = futures.call(
+            api.fetch_daily_puzzle, client, priority=Priority.LOW)
+
+    def wait(future: Future, what: str) -> Any:
+        try:
+            return future.result()
+        except RequestShed:
+            LOGGER.debug('Prefetch of %s shed by the rate limiter.', what)
+        except Exception:  # pylint: disable=broad-except
+            LOGGER.exception('Unable to prefetch %s.', what)
+        return None
+
+    channels_data = wait(channels, 'the TV channels')
+    if channels_data is not None:
+        game_ids = {
+            name: data['gameId']
+            for name, data in channels_data.items()
+            if isinstance(data, dict) and data.get('gameId')
+        }
+        games: Dict[Hashable, Optional[Game]] = {}
+        # with the asyncio backend, resolving the games returns a future
+        pending = wait(futures.call(
+            resolve_games, bot, sorted(set(game_ids.values())),
+            games.__setitem__, priority=Priority.LOW), 'the TV games')
+        if pending is not None:
+            wait(pending, 'the TV games')
+
+        tv: Dict[str, Game] = {}
+        for name, game_id in game_ids.items():
+            game = games.get(game_id)
+            if game is not None:
+                tv[name] = game
+
+        if tv:
+            snapshot.set_tv(tv)
+
+    puzzle_data = wait(puzzle, 'the daily puzzle')
+    if puzzle_data is not None:
+        snapshot.set_puzzle(Puzzle.from_data(puzzle_data))
+
+
+def lookup_tournament(
+    bot: SopelWrapper,
+    kind: str,
+    tournament_id: str,
+) -> Future:
+    """Look up a tournament's summary and top standings.
+
+    :param bot: the bot wrapper of the current trigger
+    :param kind: the kind of tournament (``tournament`` or ``swiss``)
+    :param tournament_id: the tournament's ID
+    :return: a future for the :class:`~.models.Tournament` (``None`` if
+             not found)
+
+    A finished tournament never changes, so it is kept in cache, while an
+    ongoing tournament is fetched again each time.
+    """
+    cache = bot.memory[TOURNAMENT_CACHE_KEY]
+    key = (kind, tournament_id)
+    data = cache.get(key)
+    if data is not None:
+        return futures.resolved(data)
+
+    nb = bot.settings.lichess.tournament_standings
+
+    def start() -> Future:
+        backend = get_backend(bot)
+        if backend is not None:
+            from sopel_lichess import aio
+
+            fetched = backend.submit(
+                aio.fetch_tournament(backend, kind, tournament_id, nb))
+        else:
+            fetched = futures.call(
+                api.fetch_tournament, get_client(bot), kind, tournament_id,
+                nb)
+
+        return futures.then(fetched, lambda data: (
+            None if data is None else Tournament.from_data(data, kind)))
+
+    def save(future: Future) -> None:
+        if future.exception() is not None:
+            return
+
+        data = future.result()
+        if data is not None and data.is_finished:
+            cache.set(key, data)
+
+    return bot.memory[FLIGHT_KEY].do(
+        (api.ENDPOINT_TOURNAMENT, kind, tournament_id),
+        lambda: futures.after(start(), save))
+
+
+def lookup_pgn_headers(bot: SopelWrapper, source: str, pgn_id: str) -> Future:
+    """Look up the headers of the first games of a PGN export.
+
+    :param bot: the bot wrapper of the current trigger
+    :param source: the source of the export (``study``, ``chapter``,
+                   ``broadcast``, or ``round``)
+    :param pgn_id: the ID of the study, chapter, broadcast, or round
+    :return: a future for the list of headers (``None`` if not found)
+
+    Studies and broadcasts are edited live, so they are not cached: only
+    concurrent lookups of the same export share a request.
+    """
+    nb = bot.settings.lichess.study_games
+
+    def start() -> Future:
+        backend = get_backend(bot)
+        if backend is not None:
+            from sopel_lichess import aio
+
+            return backend.submit(
+                aio.fetch_pgn_headers(backend, source, pgn_id, nb))
+
+        return futures.call(
+            api.fetch_pgn_headers, get_client(bot), source, pgn_id, nb)
+
+    return bot.memory[FLIGHT_KEY].do(
+        (api.ENDPOINT_STUDY, source, pgn_id), start)
+
+
+def get_profile_session(bot: Sopel) -> Optional[ProfileSession]:
+    """Get the running profiling session, if any."""
+    return bot.memory.get(PROFILE_KEY)
+
+
+URLS = urls.Dispatcher()
+"""Handlers of the Lichess links, by kind of link."""
+
+Say = Callable[..., None]
+"""Function saying a link's result, with an optional trailing part."""
+Lookup = Tuple[Future, Callable[[Any, Say], None]]
+"""Future of a link's lookup, and the callback saying its result."""
+
+
+def get_line_length(bot: SopelWrapper, recipient: str) -> int:
+    """Get the maximum length (in bytes) of a line's text to ``recipient``.
+
+    This is the IRC line length, minus the bot's hostmask, the ``PRIVMSG``
+    command, the recipient, and the plugin's output prefix. When the bot's
+    hostmask is not known yet, its longest possible length is used.
+    """
+    try:
+        hostmask_length = len(bot.hostmask)
+    except KeyError:
+        hostmask_length = len(bot.nick) + 3 + min(len(bot.user), 9) + 63
+
+    return (
+        512 - 1 - hostmask_length - 1 - len('PRIVMSG') - 1
+        - len(recipient.encode('utf-8')) - 2 - 2
+        - len(OUTPUT_PREFIX.encode('utf-8'))
+    )
+
+
+@profiled(get_profile_session)
+def lichess_links(bot: SopelWrapper, trigger: Trigger) -> None:
+    """Look up the links of a message, then say their results in order.
+
+    The same page is looked up once, and no more than
+    ``max_links_per_message`` links are looked up. Every lookup starts
+    before waiting for any of them, so they can share a batch.
+
+    The results are said together, in as few lines as possible: see
+    :class:`~.output.OutputCoalescer`.
+    """
+    links = URLS.extract(
+        trigger.urls, bot.settings.lichess.max_links_per_message)
+    if not links:
+        return
+
+    metrics = bot.memory[METRICS_KEY]
+
+    def send(text: str, trailing: str) -> None:
+        bot.say(text, trailing=trailing)
+
+    group = bot.memory[OUTPUT_KEY].open(
+        trigger.sender,
+        send,
+        expected=len(links),
+        max_length=get_line_length(bot, trigger.sender),
+    )
+
+    def add_result(
+        kind: str,
+        say_result: Callable[[Any, Say], None],
+        data: Any,
+    ) -> None:
+        said: List[Output] = []
+
+        def say(text: str, trailing: str = '') -> None:
+            said.append((text, trailing))
+            with metrics.time(HANDLER_SECONDS, handler=kind, phase='say'):
+                group.add((text, trailing))
+
+        say_result(data, say)
+        if not said:
+            group.add(None)
+
+    lookups = []
+    for link in links:
+        future, say_result = URLS.handlers[link.kind](bot, trigger, link)
+        lookups.append((future, timed_lookup(
+            bot,
+            link.kind,
+            functools.partial(add_result, link.kind, say_result))))
+
+    try:
+        for future, callback in lookups:
+            when_done(bot, future, callback)
+    finally:
+        if get_backend(bot) is None:
+            # every lookup is done: say what is left, if any lookup failed
+            group.flush()
+
+
+@URLS.register(
+    'player', urls.parse_player, prefix='@', path=urls.PLAYER_PATH_PATTERN)
+def lichess_player(bot: SopelWrapper, trigger: Trigger, link: Link) -> Lookup:
     """Handle Lichess player's URL."""
-    player_id = trigger.group('player_id')
+    metrics = bot.memory[METRICS_KEY]
 
-    with LOCK:
-        response = bot.memory[MEMORY_KEY].get(
-            'https://lichess.org/api/user/%s' % player_id,
-            headers={'Accept': 'application/json'})
+    def say_player(data: Optional[Player], say: Say) -> None:
+        if data is None:
+            return
 
-    if response.status_code == 200:
-        data = response.json()
-        result = parsers.format_player(data)
-        bot.say(result)
+        with metrics.time(HANDLER_SECONDS, handler='player', phase='parse'):
+            result = parsers.format_player(data)
+        say(result)
 
+    return lookup_player(bot, link.id), say_player
 
-@plugin.url(BASE_PATTERN + GAME_ID_PATTERN + TRAILING_PATTERN)
-@plugin.url(
-    BASE_PATTERN + GAME_ID_PATTERN + FOR_PLAYER_PATTERN + TRAILING_PATTERN)
-@plugin.output_prefix(OUTPUT_PREFIX)
-def lichess_game(bot: SopelWrapper, trigger: Trigger) -> None:
+
+@URLS.register('game', urls.parse_game, path=urls.GAME_PATH_PATTERN)
+def lichess_game(bot: SopelWrapper, trigger: Trigger, link: Link) -> Lookup:
     """Handle Lichess game's URL."""
-    match_data = trigger.groupdict()
-    game_id: str = match_data.get('game_id')
-    for_player: Optional[str] = match_data.get('for_player')
+    metrics = bot.memory[METRICS_KEY]
 
-    with LOCK:
-        response = bot.memory[MEMORY_KEY].get(
-            'https://lichess.org/game/export/%s' % game_id,
-            headers={'Accept': 'application/json'})
+    def say_game(data: Optional[Game], say: Say) -> None:
+        if data is None:
+            return
 
-    if response.status_code == 200:
-        data = response.json()
-        result = parsers.parse_game_data(data, for_player=for_player)
-        bot.say(' | '.join(result))
+        with metrics.time(HANDLER_SECONDS, handler='game', phase='parse'):
+            result = parsers.parse_game_data(data, for_player=link.detail)
+        say(parsers.SEPARATOR.join(result))
 
+        follower = get_follower(bot)
+        if (follower is not None
+                and not trigger.sender.is_nick()
+                and not parsers.is_game_over(data)
+                and not follower.follow(link.id, trigger.sender)):
+            if follower.followed(trigger.sender) >= follower.max_per_channel:
+                bot.reply(
+                    'Not following game %s: this channel already follows '
+                    '%d games (stop one with %slichess unfollow <game>).'
+                    % (link.id, follower.max_per_channel,
+                       bot.settings.core.help_prefix))
+            else:
+                bot.reply('Unable to follow game %s.' % link.id)
 
-@plugin.url(BASE_PATTERN + r'tv/(?P<channel_id>[^/\s]+)/?$')
-@plugin.output_prefix(OUTPUT_PREFIX)
-def lichess_tv_channel(bot: SopelWrapper, trigger: Trigger) -> None:
+    return lookup_game(bot, link.id), say_game
+
+
+@URLS.register(
+    'tv', urls.parse_tv_channel, prefix='tv', path=urls.TV_PATH_PATTERN)
+def lichess_tv_channel(
+    bot: SopelWrapper,
+    trigger: Trigger,
+    link: Link,
+) -> Lookup:
     """Handle Lichess TV channel's URL."""
-    channel_id = trigger.group('channel_id')
-
-    with LOCK:
-        response = bot.memory[MEMORY_KEY].get(
-            'https://lichess.org/api/tv/%s' % channel_id,
-            params={'nb': 1},
-            headers={'Accept': 'application/x-ndjson'})
-
-    if response.status_code == 200:
-        raw = [raw for raw in response.text.split('\n') if raw][0]
-        data = json.loads(raw)
-        result = parsers.parse_game_data(data)
-        game_url = 'https://lichess.org/%s' % data.get('id')
-        bot.say(' | '.join(result), trailing=' | %s' % game_url)
+    metrics = bot.memory[METRICS_KEY]
+
+    def say_tv_game(games: List[Game], say: Say) -> None:
+        if not games:
+            return
+
+        data = games[0]
+        with metrics.time(HANDLER_SECONDS, handler='tv', phase='parse'):
+            result = parsers.parse_game_data(data)
+        game_url = 'https://lichess.org/%s' % data.id
+        say(parsers.SEPARATOR.join(result),
+            trailing=parsers.SEPARATOR + game_url)
+
+    return lookup_tv_games(bot, link.id), say_tv_game
+
+
+@URLS.register(
+    'tournament',
+    urls.parse_tournament,
+    prefix='tournament',
+    path=urls.TOURNAMENT_PATH_PATTERN,
+)
+def lichess_tournament(
+    bot: SopelWrapper,
+    trigger: Trigger,
+    link: Link,
+) -> Lookup:
+    """Handle Lichess arena tournament's URL."""
+    return tournament_lookup(bot, link)
+
+
+@URLS.register(
+    'swiss',
+    urls.parse_tournament,
+    prefix='swiss',
+    path=urls.TOURNAMENT_PATH_PATTERN,
+)
+def lichess_swiss(bot: SopelWrapper, trigger: Trigger, link: Link) -> Lookup:
+    """Handle Lichess Swiss tournament's URL."""
+    return tournament_lookup(bot, link)
+
+
+def tournament_lookup(bot: SopelWrapper, link: Link) -> Lookup:
+    """Look up an arena or a Swiss tournament's link."""
+    metrics = bot.memory[METRICS_KEY]
+
+    def say_tournament(data: Optional[Tournament], say: Say) -> None:
+        if data is None:
+            return
+
+        with metrics.time(HANDLER_SECONDS, handler=link.kind, phase='parse'):
+            result = parsers.parse_tournament_data(data)
+        say(parsers.SEPARATOR.join(result))
+
+    return lookup_tournament(bot, link.kind, link.id), say_tournament
+
+
+PGN_SOURCES = {
+    ('study', None): 'study',
+    ('study', 'chapter'): 'chapter',
+    ('broadcast', None): 'broadcast',
+    ('broadcast', 'round'): 'round',
+    ('broadcast', 'game'): 'chapter',
+}
+"""Source of the PGN export of each kind of link, by kind and detail."""
+
+
+@URLS.register(
+    'study', urls.parse_study, prefix='study', path=urls.STUDY_PATH_PATTERN)
+def lichess_study(bot: SopelWrapper, trigger: Trigger, link: Link) -> Lookup:
+    """Handle Lichess study's URL."""
+    return pgn_lookup(bot, link)
+
+
+@URLS.register(
+    'broadcast',
+    urls.parse_broadcast,
+    prefix='broadcast',
+    path=urls.BROADCAST_PATH_PATTERN,
+)
+def lichess_broadcast(
+    bot: SopelWrapper,
+    trigger: Trigger,
+    link: Link,
+) -> Lookup:
+    """Handle Lichess broadcast's URL."""
+    return pgn_lookup(bot, link)
+
+
+def pgn_lookup(bot: SopelWrapper, link: Link) -> Lookup:
+    """Look up a study's or a broadcast's link, from its PGN headers."""
+    metrics = bot.memory[METRICS_KEY]
+    source = PGN_SOURCES[(link.kind, link.detail)]
+
+    def say_pgn(headers: Optional[List[Dict[str, str]]], say: Say) -> None:
+        if not headers:
+            return
+
+        with metrics.time(HANDLER_SECONDS, handler=link.kind, phase='parse'):
+            result = parsers.parse_pgn_headers(headers)
+        say(parsers.SEPARATOR.join(result))
+
+    return lookup_pgn_headers(bot, source, link.id), say_pgn
+
+
+LINK_PATTERN = URLS.url_pattern()
+"""Pattern of the Lichess URLs handled by the plugin, once every kind of link
+is registered."""
+LINK_REGEX = re.compile(LINK_PATTERN)
+
+
+@plugin.url(LINK_PATTERN)
+@plugin.output_prefix(OUTPUT_PREFIX)
+def lichess_url(bot: SopelWrapper, trigger: Trigger) -> None:
+    """Handle the Lichess URLs of a message.
+
+    Sopel triggers this for each Lichess URL of the message of a registered
+    kind of link, and only the first one handles the links of the whole
+    message: see :func:`lichess_links`. Other Lichess URLs are left to
+    Sopel's url plugin.
+
+    The URLs of a ``.lichess`` command are its arguments, not links: for
+    instance, ``.lichess unfollow <url>`` must not follow the game again.
+    """
+    if re.match(
+            r'(?:%s)lichess\b' % bot.settings.core.prefix,
+            trigger.plain,
+            re.IGNORECASE):
+        return
+
+    first_url = next(
+        (url for url in trigger.urls if LINK_REGEX.match(url)), None)
+    if first_url == trigger.group(0):
+        lichess_links(bot, trigger)
+
+
+def collect_gauges(bot: Sopel) -> Dict[str, Dict[Labels, float]]:
+    """Collect the gauges of the caches, batchers, rate limiter, and output.
+
+    :param bot: the bot instance
+    :return: the gauges' series, by gauge's name
+    """
+    gauges: Dict[str, Dict[Labels, float]] = defaultdict(dict)
+
+    def gauge(name: str, value: float, **labels: object) -> None:
+        gauges['lichess_' + name][make_labels(**labels)] = value
+
+    for name, key in (
+        ('game', GAME_CACHE_KEY),
+        ('player', PLAYER_CACHE_KEY),
+        ('tournament', TOURNAMENT_CACHE_KEY),
+        ('leaderboard', LEADERBOARD_CACHE_KEY),
+        ('puzzle', PUZZLE_CACHE_KEY),
+    ):
+        cache = bot.memory.get(key)
+        if cache is not None:
+            stats = cache.stats()
+            gauge('cache_entries', stats['size'], cache=name)
+            gauge('cache_max_entries', stats['maxsize'], cache=name)
+            gauge('cache_hits', stats['hits'], cache=name)
+            gauge('cache_misses', stats['misses'], cache=name)
+            gauge('cache_evictions', stats['evictions'], cache=name)
+
+    snapshot = bot.memory.get(SNAPSHOT_KEY)
+    if snapshot is not None:
+        stats = snapshot.stats()
+        gauge('cache_entries', stats['channels'], cache='snapshot')
+        gauge('cache_hits', stats['hits'], cache='snapshot')
+        gauge('cache_misses', stats['misses'], cache='snapshot')
+        gauge('snapshot_refreshes', stats['refreshes'])
+
+    store = bot.memory.get(GAME_STORE_KEY)
+    if store is not None:
+        stats = store.stats()
+        gauge('cache_entries', stats['count'], cache='store')
+        gauge('cache_hits', stats['hits'], cache='store')
+        gauge('cache_misses', stats['misses'], cache='store')
+        gauge('cache_evictions', stats['evictions'], cache='store')
+        gauge('store_bytes', stats['size'])
+        gauge('store_max_bytes', stats['max_size'])
+
+    batcher = bot.memory.get(GAME_BATCH_KEY)
+    if batcher is not None:
+        stats = batcher.stats()
+        gauge('batches', stats['batches'], batch='game')
+        gauge('batch_keys', stats['keys'], batch='game')
+        gauge('batch_pending', stats['pending'], batch='game')
+
+    flights = bot.memory.get(FLIGHT_KEY)
+    if flights is not None:
+        stats = flights.stats()
+        gauge('in_flight', stats['in_flight'])
+        gauge('collapsed_requests', stats['collapsed'])
+
+    rate_limiter = bot.memory.get(RATE_LIMITER_KEY)
+    if rate_limiter is not None:
+        stats = rate_limiter.stats()
+        gauge('rate_limit_backoffs', stats['backoffs'])
+        gauge('rate_limit_backoff_seconds', stats['backoff_remaining'])
+        for endpoint, count in stats['shed'].items():
+            gauge('rate_limit_shed', count, endpoint=endpoint)
+        for endpoint, count in stats['waits'].items():
+            gauge('rate_limit_waits', count, endpoint=endpoint)
+
+    follower = bot.memory.get(FOLLOW_KEY)
+    if follower is not None:
+        gauge('followed_games', follower.stats()['games'])
+
+    coalescer = bot.memory.get(OUTPUT_KEY)
+    if coalescer is not None:
+        stats = coalescer.stats()
+        gauge('output_results', stats['results'])
+        gauge('output_lines', stats['lines'])
+        gauge('output_dropped', stats['dropped'])
+
+    return dict(gauges)
+
+
+def collect_histograms(bot: Sopel) -> Dict[str, Dict[Labels, Histogram]]:
+    """Collect the histograms kept outside of the metrics, such as the
+    batches' sizes.
+
+    :param bot: the bot instance
+    :return: the histograms' series, by histogram's name
+    """
+    histograms: Dict[str, Dict[Labels, Histogram]] = defaultdict(dict)
+
+    batcher = bot.memory.get(GAME_BATCH_KEY)
+    if batcher is not None:
+        sizes = Histogram(BATCH_SIZE_BUCKETS)
+        for size, count in batcher.stats()['sizes'].items():
+            sizes.observe(size, count)
+        histograms[BATCH_SIZE][make_labels(batch='game')] = sizes
+
+    return histograms
+
+
+def format_batches(bot: Sopel) -> List[str]:
+    """Format the number of batches, and a summary of their sizes."""
+    batcher = bot.memory.get(GAME_BATCH_KEY)
+    if batcher is None:
+        return []
+
+    stats = batcher.stats()
+    if not stats['batches']:
+        return ['game batches 0']
+
+    return ['game batches %d (%.1f keys on average, %d at most)' % (
+        stats['batches'],
+        stats['keys'] / stats['batches'],
+        max(stats['sizes']),
+    )]
+
+
+def format_latencies(metrics: Metrics, name: str, key: str) -> str:
+    """Format the p50/p95/p99 latencies (in ms) of a histogram's series.
+
+    :param metrics: the plugin's metrics
+    :param name: the histogram's name
+    :param key: the label grouping the series (such as ``endpoint``)
+    """
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for labels, (count, quantiles) in sorted(metrics.quantiles(name).items()):
+        label_values = dict(labels)
+        groups[label_values.get(key, '?')].append('%s %s (%d)' % (
+            label_values.get('phase', '?'),
+            '/'.join('%.0f' % ((value or 0) * 1000) for value in quantiles),
+            count,
+        ))
+
+    return ', '.join(
+        '%s: %s' % (group, ' '.join(parts))
+        for group, parts in sorted(groups.items())) or 'none'
+
+
+def format_stats(bot: Sopel) -> List[str]:
+    """Format the plugin's metrics for the ``.lichess stats`` command."""
+    metrics = bot.memory[METRICS_KEY]
+
+    responses: Dict[str, List[str]] = defaultdict(list)
+    for labels, count in sorted(metrics.counters(RESPONSES_TOTAL).items()):
+        label_values = dict(labels)
+        responses[label_values['endpoint']].append(
+            '%s=%d' % (label_values['status'], count))
+
+    gauges = collect_gauges(bot)
+
+    def series(name: str) -> Dict[str, float]:
+        return {
+            ','.join(value for _, value in labels): value
+            for labels, value in gauges.get('lichess_' + name, {}).items()
+        }
+
+    entries = series('cache_entries')
+    hits = series('cache_hits')
+    misses = series('cache_misses')
+    caches = []
+    for name in sorted(entries):
+        lookups = hits.get(name, 0) + misses.get(name, 0)
+        caches.append('%s %d (%.0f%% hits)' % (
+            name,
+            entries[name],
+            100 * hits.get(name, 0) / lookups if lookups else 0,
+        ))
+
+    queues = ['%s pending %d' % item
+              for item in sorted(series('batch_pending').items())]
+    queues.extend(format_batches(bot))
+    queues.append('in flight %d (%d collapsed)' % (
+        series('in_flight').get('', 0),
+        series('collapsed_requests').get('', 0),
+    ))
+    queues.append('shed %d' % sum(series('rate_limit_shed').values()))
+    queues.append('backoffs %d' % series('rate_limit_backoffs').get('', 0))
+    queues.append('output %d result(s) in %d line(s) (%d dropped)' % (
+        series('output_results').get('', 0),
+        series('output_lines').get('', 0),
+        series('output_dropped').get('', 0),
+    ))
+
+    return [
+        'Responses: %s' % (', '.join(
+            '%s %s' % (endpoint, ' '.join(counts))
+            for endpoint, counts in sorted(responses.items())) or 'none'),
+        'Requests p50/p95/p99 ms: %s' % format_latencies(
+            metrics, REQUEST_SECONDS, 'endpoint'),
+        'Handlers p50/p95/p99 ms: %s' % format_latencies(
+            metrics, HANDLER_SECONDS, 'handler'),
+        'Caches: %s | Queues: %s' % (
+            ', '.join(caches) or 'none', ', '.join(queues)),
+    ]
+
+
+@plugin.command('puzzle')
+@plugin.output_prefix(OUTPUT_PREFIX)
+def lichess_puzzle(bot: SopelWrapper, trigger: Trigger) -> None:
+    """Show Lichess's daily puzzle."""
+    def say_puzzle(data: Optional[Puzzle]) -> None:
+        if data is None:
+            bot.reply('The daily puzzle is not available.')
+            return
+
+        result = parsers.parse_puzzle_data(data, title='Daily puzzle')
+        puzzle_url = 'https://lichess.org/training/%s' % data.id
+        bot.say(
+            parsers.SEPARATOR.join(result),
+            trailing=parsers.SEPARATOR + puzzle_url)
+
+    when_done(bot, lookup_daily_puzzle(bot), say_puzzle, handler='puzzle')
+
+
+@plugin.command('lichess')
+@plugin.output_prefix(OUTPUT_PREFIX)
+def lichess_command(bot: SopelWrapper, trigger: Trigger) -> None:
+    """Lichess plugin's commands.
+
+    ``.lichess top <perf> [<n>]``, ``.lichess rank <user> <perf>``, and
+    ``.lichess unfollow <game>``.
+    Owner only: ``.lichess stats`` and
+    ``.lichess profile [<triggers>] [<seconds>s]|stop``.
+    """
+    args = (trigger.group(2) or '').split()
+    subcommand = args[0].lower() if args else ''
+
+    if subcommand in ('stats', 'profile') and not trigger.owner:
+        bot.reply('Only the bot owner can use this command.')
+        return
+
+    if subcommand == 'stats':
+        for line in format_stats(bot):
+            bot.say(line, trigger.nick)
+        return
+
+    if subcommand == 'profile':
+        lichess_profile(bot, trigger, args[1:])
+        return
+
+    if subcommand == 'top' and 2 <= len(args) <= 3:
+        lichess_top(bot, args[1:])
+        return
+
+    if subcommand == 'rank' and len(args) == 3:
+        lichess_rank(bot, args[1], args[2])
+        return
+
+    if subcommand == 'unfollow' and len(args) == 2:
+        lichess_unfollow(bot, trigger, args[1])
+        return
+
+    bot.reply(
+        'Usage: %slichess top <perf> [<n>]|rank <user> <perf>|'
+        'unfollow <game>|stats|'
+        'profile [<triggers>] [<seconds>s]|profile stop'
+        % bot.settings.core.help_prefix)
+
+
+def get_perf(bot: SopelWrapper, name: str) -> Optional[str]:
+    """Get the perf type of a leaderboard by ``name`` (case insensitive).
+
+    The user is told the valid perf types if ``name`` is not one of them.
+    """
+    perf = LEADERBOARD_PERFS.get(name.lower())
+    if perf is None:
+        bot.reply('Unknown perf type: %s (try %s).' % (
+            name, ', '.join(api.LEADERBOARD_PERFS)))
+    return perf
+
+
+def lichess_top(bot: SopelWrapper, args: List[str]) -> None:
+    """Show the top players of a perf type."""
+    perf = get_perf(bot, args[0])
+    if perf is None:
+        return
+
+    nb = LEADERBOARD_SHOWN
+    if len(args) > 1:
+        try:
+            nb = int(args[1])
+        except ValueError:
+            nb = 0
+
+        if not 1 <= nb <= LEADERBOARD_MAX_SHOWN:
+            bot.reply('The number of players must be between 1 and %d.'
+                      % LEADERBOARD_MAX_SHOWN)
+            return
+
+    def say_top(data: Optional[Leaderboard]) -> None:
+        if data is None:
+            bot.reply('The %s leaderboard is not available.' % perf)
+            return
+
+        bot.say(parsers.SEPARATOR.join(
+            parsers.parse_leaderboard_data(data, nb)))
+
+    when_done(
+        bot, lookup_leaderboard(bot, perf), say_top, handler='leaderboard')
+
+
+def lichess_rank(bot: SopelWrapper, username: str, name: str) -> None:
+    """Show the rank of a player in the leaderboard of a perf type."""
+    perf = get_perf(bot, name)
+    if perf is None:
+        return
+
+    def say_rank(data: Optional[Leaderboard]) -> None:
+        if data is None:
+            bot.reply('The %s leaderboard is not available.' % perf)
+            return
+
+        leader = data.get(username)
+        if leader is None:
+            bot.reply('%s is not in the top %d %s players.' % (
+                username, len(data), perf))
+            return
+
+        bot.say(parsers.SEPARATOR.join(
+            parsers.parse_leader_data(leader, perf)))
+
+    when_done(
+        bot, lookup_leaderboard(bot, perf), say_rank, handler='leaderboard')
+
+
+def lichess_unfollow(
+    bot: SopelWrapper,
+    trigger: Trigger,
+    game: str,
+) -> None:
+    """Stop following a game, by ID or URL, for the current channel."""
+    if not bot.settings.lichess.follow_games:
+        bot.reply('Games are not followed.')
+        return
+
+    if trigger.sender.is_nick():
+        bot.reply('Games are only followed in channels.')
+        return
+
+    link = URLS.classify(game)
+    game_id = link.id if link is not None and link.kind == 'game' else game
+
+    # no follower yet: no game was followed
+    follower = bot.memory.get(FOLLOW_KEY)
+    if follower is None or not follower.unfollow(game_id, trigger.sender):
+        bot.reply('Game %s is not followed here.' % game_id)
+        return
+
+    bot.reply('No longer following game %s.' % game_id)
+
+
+def lichess_profile(
+    bot: SopelWrapper,
+    trigger: Trigger,
+    args: List[str],
+) -> None:
+    """Start or stop profiling the plugin's handlers.
+
+    The session stops after a number of triggers or a number of seconds
+    (whichever comes first), then the top functions by cumulative time
+    are written to ``profile_file`` in Sopel's homedir.
+    """
+    if args and args[0].lower() == 'stop':
+        session = bot.memory.get(PROFILE_KEY)
+        if session is None:
+            bot.reply('No profiling in progress.')
+            return
+        session.finish()
+        return
+
+    triggers, seconds = PROFILE_TRIGGERS, PROFILE_SECONDS
+    try:
+        for arg in args:
+            if arg.lower().endswith('s'):
+                seconds = int(arg[:-1])
+            else:
+                triggers = int(arg)
+    except ValueError:
+        bot.reply('Invalid profiling limits: %s' % ' '.join(args))
+        return
+
+    if triggers < 1 or seconds < 1:
+        bot.reply('Profiling limits must be positive.')
+        return
+
+    if PROFILE_KEY in bot.memory:
+        bot.reply('Profiling already in progress.')
+        return
+
+    nick = trigger.nick
+
+    def on_finish(session: ProfileSession) -> None:
+        if bot.memory.get(PROFILE_KEY) is session:
+            bot.memory.pop(PROFILE_KEY, None)
+        # the command's bot applies the output prefix
+        bot.say(
+            'Profiled %d trigger(s): %s'
+            % (session.profiled, session.filename),
+            nick)
+
+    bot.memory[PROFILE_KEY] = ProfileSession(
+        os.path.join(
+            bot.settings.core.homedir,
+            bot.settings.lichess.profile_file),
+        triggers=triggers,
+        seconds=seconds,
+        on_finish=on_finish,
+    )
+    bot.reply(
+        'Profiling the next %d trigger(s), for %d seconds at most.'
+        % (triggers, seconds))
+
+
+@plugin.interval(5)
+def lichess_profile_expire(bot: Sopel) -> None:
+    """Stop the profiling session once its time is up."""
+    session = bot.memory.get(PROFILE_KEY)
+    if session is not None and session.expired:
+        session.finish()
+
+
+@plugin.interval(METRICS_INTERVAL)
+def lichess_write_metrics(bot: Sopel) -> None:
+    """Write the metrics file, if enabled."""
+    filename = bot.settings.lichess.metrics_file
+    metrics = bot.memory.get(METRICS_KEY)
+    if not filename or metrics is None:
+        return
+
+    try:
+        write_file(
+            os.path.join(bot.settings.core.homedir, filename),
+            metrics.to_prometheus(
+                collect_gauges(bot), collect_histograms(bot)))
+    except OSError:
+        LOGGER.exception('Unable to write the metrics file.')
+
+
+@plugin.interval(SNAPSHOT_CHECK_INTERVAL)
+def lichess_prefetch(bot: Sopel) -> None:
+    """Refresh the snapshot of the TV channels and of the daily puzzle, if
+    due."""
+    snapshot = bot.memory.get(SNAPSHOT_KEY)
+    if snapshot is None or not snapshot.due():
+        return
+
+    refresh_snapshot(bot, snapshot)
@@ -0,0 +1,150 @@
+"""Opt-in profiling of the plugin's handlers."""
+from __future__ import generator_stop
+
+import functools
+import io
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:  # pragma: no cover
+    import pstats
+
+DEFAULT_TOP = 30
+"""Default number of functions written to the profile's file."""
+PROFILER_LOCK = threading.Lock()
+"""Lock held while a profiler is active: only one can be, since Python 3.12.
+"""
+
+
+class ProfileSession:
+    """Profile handlers for a number of triggers or for a time.
+
+    :param filename: file where the aggregated statistics are written
+    :param triggers: maximum number of profiled triggers
+    :param seconds: maximum duration (in seconds) of the session
+    :param top: number of functions written, by cumulative time
+    :param on_finish: optional function called once the session is over
+    :param clock: function returning the current time in seconds
+
+    Each trigger is profiled on its own, in its own thread, and the results
+    are aggregated. Only one profiler can be active at a time, so a trigger
+    handled while another one is profiled runs without profiling, and is
+    not counted. Once ``triggers`` triggers were profiled, or once
+    ``seconds`` seconds elapsed, the session writes the top functions by
+    cumulative time to ``filename``.
+    """
+    def __init__(
+        self,
+        filename: str,
+        *,
+        triggers: int,
+        seconds: float,
+        top: int = DEFAULT_TOP,
+        on_finish: Optional[Callable[['ProfileSession'], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.filename = filename
+        self.triggers = triggers
+        self.seconds = seconds
+        self.top = top
+        self.profiled = 0
+        self.finished = False
+        self._on_finish = on_finish
+        self._clock = clock
+        self._started_at = clock()
+        self._stats: Optional['pstats.Stats'] = None
+        self._lock = threading.Lock()
+
+    @property
+    def expired(self) -> bool:
+        """Tell if the session is over by time or by number of triggers."""
+        return (
+            self.profiled >= self.triggers
+            or self._clock() - self._started_at >= self.seconds
+        )
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Call ``func`` with ``args``, profiled if the session is running.
+
+        :return: the value returned by ``func``
+        """
+        if not PROFILER_LOCK.acquire(blocking=False):
+            # another trigger is being profiled
+            return func(*args)
+
+        import cProfile
+        import pstats
+
+        try:
+            with self._lock:
+                if self.finished or self.expired:
+                    profile = None
+                else:
+                    profile = cProfile.Profile()
+                    self.profiled += 1
+
+            if profile is not None:
+                try:
+                    return profile.runcall(func, *args)
+                finally:
+                    with self._lock:
+                        if self._stats is None:
+                            self._stats = pstats.Stats(profile)
+                        else:
+                            self._stats.add(profile)
+                    if self.expired:
+                        self.finish()
+        finally:
+            PROFILER_LOCK.release()
+
+        self.finish()
+        return func(*args)
+
+    def finish(self) -> None:
+        """Stop the session and write its statistics, if not done yet."""
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+            text = self.format()
+
+        with open(self.filename, 'w', encoding='utf-8') as fd:
+            fd.write(text)
+
+        if self._on_finish is not None:
+            self._on_finish(self)
+
+    def format(self) -> str:
+        """Format the aggregated statistics (top functions by cumulative
+        time)."""
+        header = 'Profiled %d trigger(s) in %.1f seconds\n\n' % (
+            self.profiled, self._clock() - self._started_at)
+        if self._stats is None:
+            return header + 'Nothing profiled.\n'
+
+        output = io.StringIO()
+        self._stats.stream = output  # type: ignore
+        self._stats.sort_stats('cumulative').print_stats(self.top)
+        return header + output.getvalue()
+
+
+def profiled(
+    get_session: Callable[[Any], Optional[ProfileSession]],
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorate a handler to profile it while a session is running.
+
+    :param get_session: function returning the running session (if any)
+                        from the handler's ``bot`` argument
+
+    Without a running session, the handler is called directly.
+    """
+    def decorator(handler: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(handler)
+        def wrapper(bot: Any, trigger: Any) -> Any:
+            session = get_session(bot)
+            if session is None:
+                return handler(bot, trigger)
+            return session.run(handler, bot, trigger)
+        return wrapper
+    return decorator
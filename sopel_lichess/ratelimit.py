@@ -0,0 +1,249 @@
+"""Rate limiting of requests to the Lichess API."""
+from __future__ import generator_stop
+
+import enum
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_BACKOFF = 60.0
+"""Default time (in seconds) to back off after a rate limited response.
+
+Lichess asks to wait a full minute after a ``429 Too Many Requests``.
+"""
+
+
+class Priority(enum.IntEnum):
+    """Priority of a request."""
+    LOW = 0
+    """Background request: shed unless a token is spare right now."""
+    NORMAL = 1
+    """User request: wait for a token, up to the limiter's ``max_wait``."""
+
+
+class RequestShed(Exception):
+    """Raised when a request is shed by the rate limiter."""
+    def __init__(self, endpoint: str, priority: Priority) -> None:
+        super().__init__(
+            'Request to %s endpoint shed (priority: %s)'
+            % (endpoint, priority.name))
+        self.endpoint = endpoint
+        self.priority = priority
+
+
+class TokenBucket:
+    """Token bucket refilled at a constant ``rate``.
+
+    :param rate: number of tokens added per second
+    :param burst: maximum number of tokens in the bucket
+    :param clock: function returning the current time in seconds
+
+    The bucket starts full. This class is not thread-safe by itself.
+    """
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated_at = clock()
+
+    @property
+    def tokens(self) -> float:
+        """Number of tokens currently in the bucket."""
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated_at)
+        self._tokens = min(
+            float(self.burst), self._tokens + elapsed * self.rate)
+        self._updated_at = now
+        return self._tokens
+
+    def take(self, reserve: float = 0) -> float:
+        """Try to take one token, keeping ``reserve`` tokens in the bucket.
+
+        :param reserve: number of tokens that must stay in the bucket
+        :return: ``0`` if a token was taken, or the time (in seconds) to
+                 wait before a token is available
+        """
+        tokens = self.tokens
+        if tokens - reserve >= 1:
+            self._tokens -= 1
+            return 0.0
+
+        return (1 + reserve - tokens) / self.rate
+
+
+class RateLimiter:
+    """Schedule requests according to rate limits per endpoint class.
+
+    :param rate: number of requests per second for each endpoint class
+    :param burst: maximum number of requests in a burst
+    :param max_wait: maximum time (in seconds) a normal request waits
+    :param clock: function returning the current time in seconds
+    :param sleep: function used to wait
+
+    Each endpoint class (``user``, ``game``, ``tv``, etc.) gets its own
+    token bucket. After a rate limited response, :meth:`backoff` stops
+    every request for the time asked by Lichess.
+
+    A :attr:`~Priority.NORMAL` request waits its turn, but is shed if it
+    would wait more than ``max_wait`` seconds; a :attr:`~Priority.LOW`
+    request never waits, and it can't use the second half of the bucket,
+    which is kept for normal requests. Shed requests raise
+    :exc:`RequestShed` and are counted per endpoint class.
+    """
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        *,
+        max_wait: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError('rate must be positive, got %r' % rate)
+        if burst < 1:
+            raise ValueError('burst must be at least 1, got %d' % burst)
+
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.backoff_until = 0.0
+        self.backoffs = 0
+        self.shed: 'Counter[str]' = Counter()
+        self.waits: 'Counter[str]' = Counter()
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _get_bucket(self, endpoint: str) -> TokenBucket:
+        # must be called with the lock acquired
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, clock=self._clock)
+            self._buckets[endpoint] = bucket
+        return bucket
+
+    def _try_acquire(
+        self,
+        endpoint: str,
+        priority: Priority,
+        deadline: float,
+        waited: bool,
+    ) -> float:
+        reserve = self.burst / 2 if priority < Priority.NORMAL else 0.0
+
+        with self._lock:
+            now = self._clock()
+            wait = self.backoff_until - now
+            if wait <= 0:
+                wait = self._get_bucket(endpoint).take(reserve)
+                if wait <= 0:
+                    return 0.0
+
+            if now + wait > deadline:
+                self.shed[endpoint] += 1
+                raise RequestShed(endpoint, priority)
+
+            if not waited:
+                self.waits[endpoint] += 1
+
+        return wait
+
+    def _get_deadline(self, priority: Priority) -> float:
+        if priority < Priority.NORMAL:
+            return self._clock()
+        return self._clock() + self.max_wait
+
+    def acquire(
+        self,
+        endpoint: str,
+        priority: Priority = Priority.NORMAL,
+    ) -> None:
+        """Wait until a request to ``endpoint`` can be sent.
+
+        :param endpoint: the endpoint class of the request
+        :param priority: the priority of the request
+        :raise RequestShed: when the request is shed
+        """
+        deadline = self._get_deadline(priority)
+        waited = False
+        while True:
+            wait = self._try_acquire(endpoint, priority, deadline, waited)
+            if wait <= 0:
+                return
+            waited = True
+            self._sleep(wait)
+
+    async def acquire_async(
+        self,
+        endpoint: str,
+        priority: Priority = Priority.NORMAL,
+    ) -> None:
+        """Wait without blocking until a request can be sent.
+
+        Same as :meth:`acquire`, but for coroutines.
+        """
+        import asyncio
+
+        deadline = self._get_deadline(priority)
+        waited = False
+        while True:
+            wait = self._try_acquire(endpoint, priority, deadline, waited)
+            if wait <= 0:
+                return
+            waited = True
+            await asyncio.sleep(wait)
+
+    def backoff(self, seconds: Optional[float] = None) -> None:
+        """Stop every request for ``seconds``.
+
+        :param seconds: time to back off; defaults to :data:`DEFAULT_BACKOFF`
+        """
+        if seconds is None:
+            seconds = DEFAULT_BACKOFF
+
+        with self._lock:
+            self.backoff_until = max(
+                self.backoff_until, self._clock() + seconds)
+            self.backoffs += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the limiter's statistics.
+
+        :return: a dict with the number of backoffs, the remaining backoff
+                 time, and the shed and waiting requests per endpoint class
+        """
+        with self._lock:
+            return {
+                'backoffs': self.backoffs,
+                'backoff_remaining': max(
+                    0.0, self.backoff_until - self._clock()),
+                'shed': dict(self.shed),
+                'waits': dict(self.waits),
+            }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse the value of a ``Retry-After`` header.
+
+    :param value: the header's value, if any
+    :return: the number of seconds to wait, or ``None`` if unknown
+
+    Only the delay-seconds form is supported.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
@@ -0,0 +1,69 @@
+"""De-duplication of identical in-flight lookups."""
+from __future__ import generator_stop
+
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Share one in-flight lookup between every concurrent caller.
+
+    The first caller for a key starts the lookup; every caller asking for
+    the same key before the lookup is done gets the same future, and is
+    counted as a collapsed request.
+    """
+    def __init__(self) -> None:
+        self.collapsed = 0
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def do(self, key: Hashable, start: Callable[[], Future]) -> Future:
+        """Get the in-flight lookup for ``key``, or start it.
+
+        :param key: the lookup's key, such as an endpoint class and an ID
+        :param start: function starting the lookup and returning its future
+        :return: the future of the in-flight lookup for this key
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.collapsed += 1
+                return flight
+
+            flight = Future()
+            self._flights[key] = flight
+
+        def land(future: Future) -> None:
+            with self._lock:
+                del self._flights[key]
+
+            error = future.exception()
+            if error is not None:
+                flight.set_exception(error)
+            else:
+                flight.set_result(future.result())
+
+        # the lookup is started without the lock, as it may run right away
+        try:
+            future = start()
+        except Exception as error:  # pylint: disable=broad-except
+            future = Future()
+            future.set_exception(error)
+
+        future.add_done_callback(land)
+        return flight
+
+    def stats(self) -> Dict[str, int]:
+        """Get the statistics of in-flight lookups.
+
+        :return: a dict with the number of lookups in flight and the number
+                 of collapsed requests
+        """
+        return {
+            'in_flight': len(self._flights),
+            'collapsed': self.collapsed,
+        }
@@ -0,0 +1,138 @@
+"""Snapshot of the TV channels and of the daily puzzle, prefetched.
+
+Each TV link used to make its own request to the channel's endpoint, and
+the daily puzzle would need one too. Instead, an interval job refreshes
+a :class:`Snapshot` of every TV channel's current game (with one request
+for all channels, and one for their games) and of the daily puzzle, so
+these are answered from memory::
+
+    snapshot = Snapshot(interval=60, max_age=180)
+    if snapshot.due():
+        snapshot.set_tv({'blitz': game})
+        snapshot.set_puzzle(puzzle)
+    snapshot.get_tv_game('blitz')
+
+An entry older than ``max_age`` (for instance, when the refresh keeps
+failing) is not returned, so the caller can fall back to a live request.
+"""
+from __future__ import generator_stop
+
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from sopel_lichess.models import Game, Puzzle
+
+CHANNEL_ALIASES = {'toprated': 'best'}
+"""Channel ID of the TV channels whose name doesn't match it, by name."""
+CHANNEL_REGEX = re.compile(r'[^a-z0-9]')
+
+
+def normalize_channel(name: str) -> str:
+    """Normalize a TV channel's name or ID.
+
+    The TV channels endpoint names its channels (such as ``King of the
+    Hill`` or ``Top Rated``), while their URLs use an ID (such as
+    ``kingOfTheHill`` or ``best``): both are normalized to the same key.
+    """
+    key = CHANNEL_REGEX.sub('', name.lower())
+    return CHANNEL_ALIASES.get(key, key)
+
+
+class Snapshot:
+    """Prefetched TV channels' games and daily puzzle.
+
+    :param interval: time (in seconds) between two refreshes
+    :param max_age: time (in seconds) after which an entry is too old to
+                    be returned
+    :param clock: monotonic clock, in seconds
+    """
+    def __init__(
+        self,
+        *,
+        interval: float,
+        max_age: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.interval = interval
+        self.max_age = max_age
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tv: Dict[str, Game] = {}
+        self._tv_at: Optional[float] = None
+        self._puzzle: Optional[Puzzle] = None
+        self._puzzle_at: Optional[float] = None
+        self._started_at: Optional[float] = None
+        self._refreshes = 0
+        self._hits = 0
+        self._misses = 0
+
+    def due(self) -> bool:
+        """Tell if a refresh is due, and if so, mark it as started."""
+        now = self._clock()
+        with self._lock:
+            if (self._started_at is not None
+                    and now - self._started_at < self.interval):
+                return False
+
+            self._started_at = now
+            self._refreshes += 1
+            return True
+
+    def set_tv(self, games: Dict[str, Game]) -> None:
+        """Replace the TV channels' games, by channel's name."""
+        tv = {normalize_channel(name): game for name, game in games.items()}
+        with self._lock:
+            self._tv = tv
+            self._tv_at = self._clock()
+
+    def set_puzzle(self, puzzle: Puzzle) -> None:
+        """Replace the daily puzzle."""
+        with self._lock:
+            self._puzzle = puzzle
+            self._puzzle_at = self._clock()
+
+    def get_tv_game(self, channel: str) -> Optional[Game]:
+        """Get the current game of a TV ``channel``.
+
+        :return: the game, or ``None`` if the channel is unknown, or if the
+                 snapshot is too old
+        """
+        with self._lock:
+            game = self._tv.get(normalize_channel(channel))
+            if game is None or not self._is_fresh(self._tv_at):
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            return game
+
+    def get_puzzle(self) -> Optional[Puzzle]:
+        """Get the daily puzzle.
+
+        :return: the puzzle, or ``None`` if not fetched yet, or if too old
+        """
+        with self._lock:
+            if self._puzzle is None or not self._is_fresh(self._puzzle_at):
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            return self._puzzle
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of channels, of refreshes, of hits, and of misses.
+        """
+        with self._lock:
+            return {
+                'channels': len(self._tv),
+                'refreshes': self._refreshes,
+                'hits': self._hits,
+                'misses': self._misses,
+            }
+
+    def _is_fresh(self, updated_at: Optional[float]) -> bool:
+        return (
+            updated_at is not None
+            and self._clock() - updated_at < self.max_age)
@@ -0,0 +1,285 @@
+"""Lichess URLs of a message, classified in a single pass.
+
+Instead of one regex per kind of URL, each kind registers a parser of the
+URL's path segments, by its first segment (such as ``@`` for a player) or
+without a prefix (such as a game, whose ID is the first segment)::
+
+    dispatcher = Dispatcher()
+
+    @dispatcher.register(
+        'player', parse_player, prefix='@', path=PLAYER_PATH_PATTERN)
+    def handle_player(bot, trigger, link):
+        ...
+
+Then :meth:`Dispatcher.extract` classifies the URLs of a message, with each
+URL split once, in order, without duplicates, and up to a maximum number of
+links. Each kind also gives the pattern of its path, so that
+:meth:`Dispatcher.url_pattern` only matches the URLs of the registered kinds,
+and leaves the other Lichess URLs to other plugins.
+"""
+from __future__ import generator_stop
+
+import re
+from typing import (Any, Callable, Dict, Iterable, List, NamedTuple, Optional,
+                    Sequence, Tuple)
+
+URL_PATTERN = r'(?i)^https?://(?:www\.)?lichess\.org/\S*'
+"""Pattern of any Lichess URL, of a registered kind or not."""
+URL_REGEX = re.compile(URL_PATTERN)
+TRAILING_CHARS = '.,;:!?)]}>\'"'
+"""Punctuation around a URL in a message, not part of the URL."""
+ID_PATTERN = r'[a-zA-Z0-9]{8}'
+"""Pattern of a game's, a tournament's, a study's or a broadcast's ID."""
+SEGMENT_PATTERN = r'[^/?#\s]+'
+"""Pattern of any path segment."""
+GAME_ID_REGEX = re.compile(r'^%s$' % ID_PATTERN)
+TOURNAMENT_ID_REGEX = re.compile(r'^%s$' % ID_PATTERN)
+STUDY_ID_REGEX = re.compile(r'^%s$' % ID_PATTERN)
+FOR_PLAYERS = ('white', 'black')
+"""Sides of a game URL with a selected player."""
+TOURNAMENT_PAGES = ('calendar', 'featured')
+"""Pages under ``tournament`` shaped like a tournament's ID."""
+BROADCAST_PAGES = ('by',)
+"""Pages under ``broadcast`` shaped like a broadcast's slug."""
+
+GAME_PATH_PATTERN = r'%s(?:/(?:%s))?' % (ID_PATTERN, '|'.join(FOR_PLAYERS))
+"""Pattern of a game's path: ``<game_id>[/white|/black]``."""
+PLAYER_PATH_PATTERN = r'%s(?:/[^?#\s]*)?' % SEGMENT_PATTERN
+"""Pattern of a player's path, after ``@``: ``<username>[/...]``."""
+TV_PATH_PATTERN = SEGMENT_PATTERN
+"""Pattern of a TV channel's path, after ``tv``: ``<channel_id>``."""
+TOURNAMENT_PATH_PATTERN = r'(?!%s)%s' % (
+    '|'.join(TOURNAMENT_PAGES), ID_PATTERN)
+"""Pattern of a tournament's path, after ``tournament`` or ``swiss``."""
+STUDY_PATH_PATTERN = r'%s(?:/%s)?' % (ID_PATTERN, ID_PATTERN)
+"""Pattern of a study's or a chapter's path, after ``study``."""
+BROADCAST_PATH_PATTERN = r'(?!(?:%s)/)%s(?:/%s)?/%s(?:/%s)?' % (
+    '|'.join(BROADCAST_PAGES), SEGMENT_PATTERN, SEGMENT_PATTERN, ID_PATTERN,
+    ID_PATTERN)
+"""Pattern of a broadcast's, a round's, or a round's game's path, after
+``broadcast``."""
+
+
+class Link(NamedTuple):
+    """Link to a Lichess page, such as a game or a player."""
+    kind: str
+    """Kind of the page (``game``, ``player``, ``tv``, etc.)."""
+    id: str
+    """ID of the game, player, channel, etc."""
+    detail: Optional[str] = None
+    """Optional detail, such as the selected player of a game."""
+
+
+Parse = Callable[[Sequence[str]], Optional[Tuple[str, Optional[str]]]]
+"""Parse the path segments of a URL into an ID and an optional detail."""
+
+
+def split_path(url: str) -> Optional[List[str]]:
+    """Split the path of a Lichess URL into segments.
+
+    :param url: a URL, possibly with trailing punctuation
+    :return: the path's segments, without the query string, the fragment,
+             or a trailing slash; ``None`` if not a Lichess URL
+    """
+    match = URL_REGEX.match(url.rstrip(TRAILING_CHARS))
+    if match is None:
+        return None
+
+    path = match.group(0).split('/', 3)[3]
+    path = path.partition('#')[0].partition('?')[0]
+    segments = path.split('/')
+    if len(segments) > 1 and not segments[-1]:
+        segments.pop()
+    return segments
+
+
+def parse_game(segments: Sequence[str]) -> Optional[Tuple[str, Optional[str]]]:
+    """Parse a game's URL: ``<game_id>[/white|/black]``."""
+    if not 1 <= len(segments) <= 2 or not GAME_ID_REGEX.match(segments[0]):
+        return None
+
+    if len(segments) == 1:
+        return segments[0], None
+
+    if segments[1] not in FOR_PLAYERS:
+        return None
+
+    return segments[0], segments[1]
+
+
+def parse_player(
+    segments: Sequence[str],
+) -> Optional[Tuple[str, Optional[str]]]:
+    """Parse a player's URL, after ``@``: ``<username>[/...]``."""
+    if not segments or not segments[0]:
+        return None
+    return segments[0].lower(), None
+
+
+def parse_tv_channel(
+    segments: Sequence[str],
+) -> Optional[Tuple[str, Optional[str]]]:
+    """Parse a TV channel's URL, after ``tv``: ``<channel_id>``."""
+    if len(segments) != 1 or not segments[0]:
+        return None
+    return segments[0], None
+
+
+def parse_tournament(
+    segments: Sequence[str],
+) -> Optional[Tuple[str, Optional[str]]]:
+    """Parse an arena's or a Swiss tournament's URL, after ``tournament``
+    or ``swiss``: ``<tournament_id>``."""
+    if len(segments) != 1 or not TOURNAMENT_ID_REGEX.match(segments[0]):
+        return None
+    if segments[0] in TOURNAMENT_PAGES:
+        return None
+    return segments[0], None
+
+
+def parse_study(
+    segments: Sequence[str],
+) -> Optional[Tuple[str, Optional[str]]]:
+    """Parse a study's URL, after ``study``: ``<study_id>[/<chapter_id>]``.
+
+    A chapter's ID is ``<study_id>/<chapter_id>``, with the ``chapter``
+    detail.
+    """
+    if not 1 <= len(segments) <= 2:
+        return None
+    if not all(STUDY_ID_REGEX.match(segment) for segment in segments):
+        return None
+
+    if len(segments) == 1:
+        return segments[0], None
+
+    return '/'.join(segments), 'chapter'
+
+
+def parse_broadcast(
+    segments: Sequence[str],
+) -> Optional[Tuple[str, Optional[str]]]:
+    """Parse a broadcast's URL, after ``broadcast``.
+
+    The URL is either a broadcast's (``<slug>/<broadcast_id>``), a round's
+    (``<slug>/<round_slug>/<round_id>``, with the ``round`` detail), or a
+    round's game (``<slug>/<round_slug>/<round_id>/<game_id>``, with the
+    ``game`` detail and ``<round_id>/<game_id>`` as ID).
+    """
+    if not 2 <= len(segments) <= 4 or not all(segments[:-1]):
+        return None
+    if segments[0] in BROADCAST_PAGES:
+        return None
+    if not STUDY_ID_REGEX.match(segments[-1]):
+        return None
+
+    if len(segments) == 2:
+        return segments[1], None
+
+    if len(segments) == 3:
+        return segments[2], 'round'
+
+    if not STUDY_ID_REGEX.match(segments[2]):
+        return None
+
+    return '/'.join(segments[2:]), 'game'
+
+
+class Dispatcher:
+    """Registry of the kinds of Lichess URL and of their handlers."""
+    def __init__(self) -> None:
+        self.handlers: Dict[str, Callable[..., Any]] = {}
+        """Handler of each kind of link."""
+        self._prefixed: Dict[str, Tuple[str, Parse]] = {}
+        self._unprefixed: List[Tuple[str, Parse]] = []
+        self._paths: List[str] = []
+
+    def register(
+        self,
+        kind: str,
+        parse: Parse,
+        *,
+        path: str,
+        prefix: Optional[str] = None,
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Decorate the handler of a kind of link.
+
+        :param kind: the kind of link
+        :param parse: function parsing the path segments of a URL (after
+                      the prefix, if any)
+        :param path: pattern of the path of this kind of URL (after the
+                     prefix, if any), matching the URLs ``parse`` accepts
+        :param prefix: first path segment of this kind of URL; without a
+                       prefix, URLs that match no prefix are parsed
+        :raise ValueError: when the kind or the prefix is already registered
+        """
+        if kind in self.handlers:
+            raise ValueError('Link kind already registered: %s' % kind)
+        if prefix is not None and prefix in self._prefixed:
+            raise ValueError('URL prefix already registered: %s' % prefix)
+
+        def decorator(handler: Callable[..., Any]) -> Callable[..., Any]:
+            self.handlers[kind] = handler
+            if prefix is None:
+                self._unprefixed.append((kind, parse))
+                self._paths.append('(?:%s)' % path)
+            else:
+                self._prefixed[prefix] = (kind, parse)
+                self._paths.append('%s/(?:%s)' % (re.escape(prefix), path))
+            return handler
+        return decorator
+
+    def url_pattern(self) -> str:
+        """Get the pattern of the Lichess URLs of the registered kinds.
+
+        A URL matches when its whole path matches the path's pattern of a
+        registered kind, with an optional trailing slash, query string,
+        fragment, and trailing punctuation. Other Lichess URLs (such as a
+        forum's topic, or the tournaments' calendar) don't match.
+        """
+        return (
+            r'^(?i:https?://(?:www\.)?lichess\.org/)(?:%s)/?(?:[?#]\S*)?'
+            r'[%s]*$' % ('|'.join(self._paths), re.escape(TRAILING_CHARS)))
+
+    def classify(self, url: str) -> Optional[Link]:
+        """Classify a URL into a link, if it is a known kind of Lichess URL."""
+        segments = split_path(url)
+        if segments is None:
+            return None
+
+        if segments[0] in self._prefixed:
+            kind, parse = self._prefixed[segments[0]]
+            result = parse(segments[1:])
+            return Link(kind, *result) if result is not None else None
+
+        for kind, parse in self._unprefixed:
+            result = parse(segments)
+            if result is not None:
+                return Link(kind, *result)
+
+        return None
+
+    def extract(
+        self,
+        urls: Iterable[str],
+        max_links: Optional[int] = None,
+    ) -> List[Link]:
+        """Get the links of a message's URLs.
+
+        :param urls: the URLs of the message, in order
+        :param max_links: maximum number of links (no limit by default)
+        :return: the links, in order, without the same page twice
+        """
+        links: List[Link] = []
+        seen = set()
+        for url in urls:
+            if max_links is not None and len(links) >= max_links:
+                break
+
+            link = self.classify(url)
+            if link is None or (link.kind, link.id) in seen:
+                continue
+
+            seen.add((link.kind, link.id))
+            links.append(link)
+        return links
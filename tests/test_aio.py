@@ -0,0 +1,296 @@
+"""Test ``sopel_lichess.aio``."""
+from __future__ import generator_stop
+
+import http.server
+import json
+import threading
+import time
+
+import pytest
+from sopel.tests import rawlist
+
+from sopel_lichess import aio, parsers, plugin
+from sopel_lichess.ratelimit import RateLimiter, RequestShed
+
+pytestmark = pytest.mark.skipif(
+    not aio.is_available(), reason='aiohttp is not installed')
+
+TMP_CONFIG = """
+[core]
+owner = testnick
+nick = TestBot
+enable = coretasks, lichess
+
+[lichess]
+api_token = TEST_TOKEN_VALUE
+backend = asyncio
+"""
+
+GAME = {
+    'id': 'abcdefgh',
+    'rated': True,
+    'speed': 'blitz',
+    'variant': 'standard',
+    'status': 'mate',
+    'winner': 'black',
+    'players': {
+        'white': {'rating': 1500, 'user': {'name': 'Alice'}},
+        'black': {'rating': 1600, 'user': {'name': 'Bob'}},
+    },
+}
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """Request handler answering from the server's routes."""
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Answer a GET request."""
+        self.answer()
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Answer a POST request."""
+        length = int(self.headers.get('Content-Length') or 0)
+        self.server.bodies.append(self.rfile.read(length).decode('utf-8'))
+        self.answer()
+
+    def answer(self):
+        """Answer with the route matching the request's path."""
+        self.server.requests.append((self.command, self.path, self.headers))
+        path = self.path.partition('?')[0]
+        status, headers, body = self.server.routes.get(
+            (self.command, self.path),
+            self.server.routes.get((self.command, path), (404, {}, b'')))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Don't log requests."""
+
+
+@pytest.fixture
+def stub():
+    """Local HTTP server standing in for the Lichess API."""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.routes = {}
+    server.requests = []
+    server.bodies = []
+    server.base_url = 'http://127.0.0.1:%d' % server.server_address[1]
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def backend(stub):
+    """Running asyncio backend."""
+    backend = aio.AsyncBackend('TOKEN', base_url=stub.base_url)
+    backend.start()
+    yield backend
+    backend.stop()
+
+
+def test_backend_start_stop(stub):
+    """Test the backend's lifecycle."""
+    backend = aio.AsyncBackend('TOKEN', base_url=stub.base_url)
+    assert not backend.running
+
+    with pytest.raises(RuntimeError):
+        backend.submit(aio.fetch_player(backend, 'georges'))
+
+    backend.start()
+    assert backend.running
+    backend.stop()
+    assert not backend.running
+    backend.stop()  # stopping twice is fine
+
+
+def test_detach(backend):
+    """Test callbacks of a detached future don't run on the event loop."""
+    async def answer():
+        return 42
+
+    threads = []
+    done = threading.Event()
+
+    def callback(future):
+        threads.append(threading.current_thread())
+        done.set()
+
+    future = backend.detach(backend.submit(answer()))
+    future.add_done_callback(callback)
+
+    assert future.result(timeout=5) == 42
+    assert done.wait(timeout=5)
+    assert threads[0] is not backend._thread
+
+
+def test_fetch_player(stub, backend):
+    """Test fetching a player."""
+    stub.routes['GET', '/api/user/georges'] = (
+        200, {'Content-Type': 'application/json'}, b'{"id": "georges"}')
+
+    data = backend.run(aio.fetch_player(backend, 'georges'))
+
+    assert data == {'id': 'georges'}
+    _, _, headers = stub.requests[-1]
+    assert headers['Authorization'] == 'Bearer TOKEN'
+    assert backend.run(aio.fetch_player(backend, 'unknown')) is None
+
+
+def test_fetch_games(stub, backend):
+    """Test streaming several games at once."""
+    stub.routes['POST', '/api/games/export/_ids'] = (
+        200, {}, b'{"id": "abcdefgh"}\n{"id": "12345678"}\n')
+    delivered = {}
+
+    backend.run(aio.fetch_games(
+        backend, ['abcdefgh', '12345678'], delivered.__setitem__))
+
+    assert delivered == {
+        'abcdefgh': {'id': 'abcdefgh'},
+        '12345678': {'id': '12345678'},
+    }
+
+
+def test_fetch_tv_games(stub, backend):
+    """Test fetching the games of a TV channel."""
+    stub.routes['GET', '/api/tv/blitz'] = (
+        200, {}, b'{"id": "a"}\n{"id": "b"}\n{"id": "c"}\n')
+
+    games = backend.run(aio.fetch_tv_games(backend, 'blitz', nb=2))
+
+    assert games == [{'id': 'a'}, {'id': 'b'}]
+    _, path, _ = stub.requests[-1]
+    assert 'nb=2' in path
+    assert 'moves=false' in path
+    assert backend.run(aio.fetch_tv_games(backend, 'notreal')) == []
+
+
+def test_fetch_tv_channels(stub, backend):
+    """Test fetching the current game of every TV channel."""
+    stub.routes['GET', '/api/tv/channels'] = (
+        200, {}, b'{"Blitz": {"gameId": "abcdefgh"}}')
+    stub.routes['GET', '/api/puzzle/daily'] = (
+        200, {}, b'{"puzzle": {"id": "K69di"}}')
+
+    assert backend.run(aio.fetch_tv_channels(backend)) == {
+        'Blitz': {'gameId': 'abcdefgh'}}
+    assert backend.run(aio.fetch_daily_puzzle(backend)) == {
+        'puzzle': {'id': 'K69di'}}
+
+
+def test_fetch_leaderboard(stub, backend):
+    """Test fetching the top players of a perf type."""
+    stub.routes['GET', '/api/player/top/200/blitz'] = (
+        200, {}, b'{"users": [{"id": "alice"}]}')
+
+    assert backend.run(aio.fetch_leaderboard(backend, 'blitz')) == [
+        {'id': 'alice'}]
+    assert backend.run(aio.fetch_leaderboard(backend, 'bullet')) is None
+
+
+def test_fetch_tournament(stub, backend):
+    """Test fetching a tournament with its top standings."""
+    stub.routes['GET', '/api/swiss/abcd1234'] = (
+        200, {}, b'{"id": "abcd1234", "status": "finished"}')
+    stub.routes['GET', '/api/swiss/abcd1234/results'] = (
+        200, {}, b'{"rank": 1}\n{"rank": 2}\n{"rank": 3}\n')
+
+    data = backend.run(aio.fetch_tournament(backend, 'swiss', 'abcd1234', 2))
+
+    assert data == {
+        'id': 'abcd1234',
+        'status': 'finished',
+        'standings': [{'rank': 1}, {'rank': 2}],
+    }
+    _, path, _ = stub.requests[-1]
+    assert 'nb=2' in path
+    assert backend.run(
+        aio.fetch_tournament(backend, 'tournament', 'abcd1234')) is None
+
+
+def test_fetch_pgn_headers(stub, backend):
+    """Test fetching the headers of a broadcast's first games."""
+    stub.routes['GET', '/api/broadcast/abcdefgh.pgn'] = (
+        200, {}, b'[Event "A"]\n\n*\n\n[Event "B"]\n\n*\n\n[Event "C"]\n')
+
+    headers = backend.run(
+        aio.fetch_pgn_headers(backend, 'broadcast', 'abcdefgh', 2))
+
+    assert headers == [{'Event': 'A'}, {'Event': 'B'}]
+    assert backend.run(
+        aio.fetch_pgn_headers(backend, 'study', 'ijklmnop')) is None
+
+
+def test_rate_limited(stub):
+    """Test the backend backs off after a 429."""
+    stub.routes['GET', '/api/user/georges'] = (
+        429, {'Retry-After': '30'}, b'')
+    limiter = RateLimiter(10, 10, max_wait=0)
+    backend = aio.AsyncBackend(
+        'TOKEN', base_url=stub.base_url, rate_limiter=limiter)
+    backend.start()
+
+    try:
+        assert backend.run(aio.fetch_player(backend, 'georges')) is None
+        with pytest.raises(RequestShed):
+            backend.run(aio.fetch_player(backend, 'georges'))
+    finally:
+        backend.stop()
+
+    assert len(stub.requests) == 1
+    assert limiter.stats()['backoffs'] == 1
+
+
+def wait_for_messages(irc, count, timeout=5):
+    """Wait until the bot sent ``count`` messages."""
+    deadline = time.monotonic() + timeout
+    while len(irc.bot.backend.message_sent) < count:
+        assert time.monotonic() < deadline, 'Timeout waiting for the bot'
+        time.sleep(0.01)
+
+
+def test_plugin_asyncio_backend(
+    stub,
+    configfactory,
+    botfactory,
+    ircfactory,
+    userfactory,
+):
+    """Test the plugin's handlers with the asyncio backend."""
+    settings = configfactory('test.cfg', TMP_CONFIG)
+    mockbot = botfactory.preloaded(settings, preloads=['lichess'])
+    irc = ircfactory(mockbot)
+    irc.bot.backend.clear_message_sent()
+    user = userfactory('Exirel')
+
+    backend = plugin.get_backend(irc.bot)
+    assert backend.running
+    backend.base_url = stub.base_url
+    stub.routes['GET', '/game/export/abcdefgh'] = (
+        200, {}, json.dumps(GAME).encode('utf-8'))
+    stub.routes['GET', '/api/tv/blitz'] = (
+        200, {}, (json.dumps(GAME) + '\n').encode('utf-8'))
+
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh/black')
+    wait_for_messages(irc, 1)
+    irc.say(user, '#channel', 'https://lichess.org/tv/blitz')
+    wait_for_messages(irc, 2)
+
+    game = ' | '.join(parsers.parse_game_data(GAME, for_player='black'))
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s' % game,
+        'PRIVMSG #channel :[lichess] %s | %s' % (
+            ' | '.join(parsers.parse_game_data(GAME)),
+            'https://lichess.org/abcdefgh',
+        ),
+    )
+
+    plugin.shutdown(irc.bot)
+    assert not backend.running
@@ -0,0 +1,292 @@
+"""Test ``sopel_lichess.api``."""
+from __future__ import generator_stop
+
+import json
+
+from sopel_lichess import api
+from sopel_lichess.client import LichessClient
+
+
+def test_fetch_games(requests_mock):
+    """Test fetching several games with the export by IDs endpoint."""
+    requests_mock.post(
+        'https://lichess.org/api/games/export/_ids',
+        text='\n'.join([
+            json.dumps({'id': 'abcdefgh'}),
+            '',
+            json.dumps({'id': '12345678'}),
+            '',
+        ]),
+        headers={'Content-Type': 'application/x-ndjson'},
+    )
+    delivered = {}
+
+    api.fetch_games(
+        LichessClient('TOKEN'),
+        ['abcdefgh', '12345678'],
+        delivered.__setitem__,
+    )
+
+    assert delivered == {
+        'abcdefgh': {'id': 'abcdefgh'},
+        '12345678': {'id': '12345678'},
+    }
+    request = requests_mock.last_request
+    assert request.text == 'abcdefgh,12345678'
+    assert request.headers['Accept'] == 'application/x-ndjson'
+    assert request.qs['opening'] == ['true']
+    assert request.qs['moves'] == ['false']
+
+
+def test_fetch_games_single(requests_mock):
+    """Test fetching a single game uses the game export endpoint."""
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh', json={'id': 'abcdefgh'})
+    delivered = {}
+
+    api.fetch_games(
+        LichessClient('TOKEN'), ['abcdefgh'], delivered.__setitem__)
+
+    assert delivered == {'abcdefgh': {'id': 'abcdefgh'}}
+    query = requests_mock.last_request.qs
+    assert query['opening'] == ['true']
+    assert query['moves'] == query['clocks'] == query['evals'] == ['false']
+
+
+def test_fetch_games_error(requests_mock):
+    """Test nothing is delivered on error."""
+    requests_mock.post(
+        'https://lichess.org/api/games/export/_ids', status_code=429)
+    delivered = {}
+
+    api.fetch_games(
+        LichessClient('TOKEN'),
+        ['abcdefgh', '12345678'],
+        delivered.__setitem__,
+    )
+
+    assert not delivered
+
+
+def test_fetch_tv_games(requests_mock):
+    """Test fetching the games of a TV channel."""
+    requests_mock.get(
+        'https://lichess.org/api/tv/blitz',
+        text='\n'.join([
+            json.dumps({'id': 'abcdefgh'}),
+            json.dumps({'id': '12345678'}),
+            json.dumps({'id': 'ABCDEFGH'}),
+        ]),
+        headers={'Content-Type': 'application/x-ndjson'},
+    )
+
+    games = api.fetch_tv_games(LichessClient('TOKEN'), 'blitz', nb=2)
+
+    assert games == [{'id': 'abcdefgh'}, {'id': '12345678'}]
+    query = requests_mock.last_request.qs
+    assert query['nb'] == ['2']
+    assert query['opening'] == ['true']
+    assert query['moves'] == ['false']
+    assert 'evals' not in query, 'Not supported by the TV endpoint'
+
+
+def test_fetch_tv_games_not_found(requests_mock):
+    """Test fetching the games of an unknown TV channel."""
+    requests_mock.get('https://lichess.org/api/tv/notreal', status_code=404)
+
+    assert api.fetch_tv_games(LichessClient('TOKEN'), 'notreal') == []
+
+
+def test_fetch_tv_channels(requests_mock):
+    """Test fetching the current game of every TV channel."""
+    requests_mock.get(
+        'https://lichess.org/api/tv/channels',
+        json={'Blitz': {'gameId': 'abcdefgh'}},
+    )
+
+    assert api.fetch_tv_channels(LichessClient('TOKEN')) == {
+        'Blitz': {'gameId': 'abcdefgh'}}
+
+    requests_mock.get(
+        'https://lichess.org/api/tv/channels', status_code=503)
+
+    assert api.fetch_tv_channels(LichessClient('TOKEN')) is None
+
+
+def test_fetch_daily_puzzle(requests_mock):
+    """Test fetching the daily puzzle."""
+    requests_mock.get(
+        'https://lichess.org/api/puzzle/daily',
+        json={'puzzle': {'id': 'K69di'}},
+    )
+
+    assert api.fetch_daily_puzzle(LichessClient('TOKEN')) == {
+        'puzzle': {'id': 'K69di'}}
+
+    requests_mock.get(
+        'https://lichess.org/api/puzzle/daily', status_code=503)
+
+    assert api.fetch_daily_puzzle(LichessClient('TOKEN')) is None
+
+
+def test_fetch_leaderboard(requests_mock):
+    """Test fetching the top players of a perf type."""
+    requests_mock.get(
+        'https://lichess.org/api/player/top/200/blitz',
+        json={'users': [{'id': 'alice'}, {'id': 'bob'}]},
+    )
+
+    assert api.fetch_leaderboard(LichessClient('TOKEN'), 'blitz') == [
+        {'id': 'alice'}, {'id': 'bob'}]
+
+    requests_mock.get(
+        'https://lichess.org/api/player/top/10/blitz', status_code=404)
+
+    assert api.fetch_leaderboard(
+        LichessClient('TOKEN'), 'blitz', nb=10) is None
+
+
+def test_fetch_tournament(requests_mock):
+    """Test fetching an arena with its top standings."""
+    requests_mock.get(
+        'https://lichess.org/api/tournament/abcd1234',
+        json={'id': 'abcd1234', 'fullName': 'Hourly Blitz Arena'},
+    )
+    requests_mock.get(
+        'https://lichess.org/api/tournament/abcd1234/results',
+        text='\n'.join(
+            json.dumps({'rank': rank, 'username': 'player%d' % rank})
+            for rank in range(1, 6)),
+        headers={'Content-Type': 'application/x-ndjson'},
+    )
+
+    data = api.fetch_tournament(
+        LichessClient('TOKEN'), 'tournament', 'abcd1234', nb=2)
+
+    assert data == {
+        'id': 'abcd1234',
+        'fullName': 'Hourly Blitz Arena',
+        'standings': [
+            {'rank': 1, 'username': 'player1'},
+            {'rank': 2, 'username': 'player2'},
+        ],
+    }
+    assert requests_mock.last_request.qs['nb'] == ['2']
+
+
+def test_fetch_tournament_swiss(requests_mock):
+    """Test fetching a Swiss tournament without its standings."""
+    requests_mock.get(
+        'https://lichess.org/api/swiss/abcd1234',
+        json={'id': 'abcd1234', 'name': 'Weekly Swiss'},
+    )
+
+    data = api.fetch_tournament(
+        LichessClient('TOKEN'), 'swiss', 'abcd1234', nb=0)
+
+    assert data == {'id': 'abcd1234', 'name': 'Weekly Swiss', 'standings': []}
+    assert requests_mock.call_count == 1
+
+
+def test_fetch_tournament_not_found(requests_mock):
+    """Test fetching an unknown tournament."""
+    requests_mock.get(
+        'https://lichess.org/api/tournament/abcd1234', status_code=404)
+
+    assert api.fetch_tournament(
+        LichessClient('TOKEN'), 'tournament', 'abcd1234') is None
+
+
+def test_fetch_tournament_results_error(requests_mock):
+    """Test fetching a tournament when its results are not available."""
+    requests_mock.get(
+        'https://lichess.org/api/swiss/abcd1234',
+        json={'id': 'abcd1234'},
+    )
+    requests_mock.get(
+        'https://lichess.org/api/swiss/abcd1234/results', status_code=500)
+
+    data = api.fetch_tournament(LichessClient('TOKEN'), 'swiss', 'abcd1234')
+
+    assert data == {'id': 'abcd1234', 'standings': []}
+
+
+def test_fetch_pgn_headers(requests_mock):
+    """Test fetching the headers of a study's first chapters."""
+    requests_mock.get(
+        'https://lichess.org/api/study/abcdefgh.pgn',
+        text='\n\n'.join(
+            '[Event "Study: Chapter %d"]\n[Site "?"]\n\n1. e4 *\n' % index
+            for index in range(1, 6)),
+    )
+
+    headers = api.fetch_pgn_headers(
+        LichessClient('TOKEN'), 'study', 'abcdefgh', nb=2)
+
+    assert headers == [
+        {'Event': 'Study: Chapter 1'},
+        {'Event': 'Study: Chapter 2'},
+    ]
+    assert requests_mock.last_request.qs['comments'] == ['false']
+
+
+def test_fetch_pgn_headers_round(requests_mock):
+    """Test fetching the headers of a broadcast round's games."""
+    requests_mock.get(
+        'https://lichess.org/api/broadcast/round/abcdefgh.pgn',
+        text='[White "Alice"]\n[Black "Bob"]\n\n1. e4 *\n',
+    )
+
+    headers = api.fetch_pgn_headers(
+        LichessClient('TOKEN'), 'round', 'abcdefgh')
+
+    assert headers == [{'White': 'Alice', 'Black': 'Bob'}]
+    assert 'comments' not in requests_mock.last_request.qs
+
+
+def test_fetch_pgn_headers_not_found(requests_mock):
+    """Test fetching the headers of an unknown study."""
+    requests_mock.get(
+        'https://lichess.org/api/study/abcdefgh/ijklmnop.pgn',
+        status_code=404)
+
+    assert api.fetch_pgn_headers(
+        LichessClient('TOKEN'), 'chapter', 'abcdefgh/ijklmnop') is None
+
+
+def test_stream_games(requests_mock):
+    """Test opening a stream of several games."""
+    requests_mock.post(
+        'https://lichess.org/api/stream/games/sopel',
+        text=json.dumps({'id': 'abcdefgh', 'statusName': 'started'}),
+        headers={'Content-Type': 'application/x-ndjson'},
+    )
+
+    response = api.stream_games(
+        LichessClient('TOKEN'), 'sopel', ['abcdefgh', '12345678'])
+
+    assert response is not None
+    assert response.json() == {'id': 'abcdefgh', 'statusName': 'started'}
+    assert requests_mock.last_request.text == 'abcdefgh,12345678'
+
+
+def test_stream_games_error(requests_mock):
+    """Test opening a stream of games on error."""
+    requests_mock.post(
+        'https://lichess.org/api/stream/games/sopel', status_code=400)
+
+    assert api.stream_games(LichessClient('TOKEN'), 'sopel', ['x']) is None
+
+
+def test_add_games_to_stream(requests_mock):
+    """Test adding games to an open stream."""
+    requests_mock.post(
+        'https://lichess.org/api/stream/games/sopel/add', text='')
+    client = LichessClient('TOKEN')
+
+    assert api.add_games_to_stream(client, 'sopel', ['abcdefgh', '12345678'])
+    assert requests_mock.last_request.text == 'abcdefgh,12345678'
+
+    requests_mock.post(
+        'https://lichess.org/api/stream/games/sopel/add', status_code=404)
+    assert not api.add_games_to_stream(client, 'sopel', ['abcdefgh'])
@@ -0,0 +1,146 @@
+"""Test ``sopel_lichess.batch``."""
+from __future__ import generator_stop
+
+from concurrent.futures import Future
+
+import pytest
+
+from sopel_lichess.batch import Batcher
+
+
+class FakeResolver:
+    """Resolver recording its batches."""
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, keys, deliver):
+        self.batches.append(keys)
+        for key in keys:
+            if key != 'missing':
+                deliver(key, key.upper())
+
+
+def test_batcher_invalid_max_size():
+    """Test batcher requires at least one key per batch."""
+    with pytest.raises(ValueError):
+        Batcher(FakeResolver(), window=1, max_size=0)
+
+
+def test_batcher_no_window():
+    """Test keys are resolved right away without a window."""
+    resolver = FakeResolver()
+    batcher = Batcher(resolver, window=0, max_size=10)
+
+    assert batcher.submit('a').result(timeout=1) == 'A'
+    assert batcher.submit('b').result(timeout=1) == 'B'
+    assert resolver.batches == [['a'], ['b']]
+
+
+def test_batcher_window():
+    """Test keys are resolved together once the window elapsed."""
+    resolver = FakeResolver()
+    batcher = Batcher(resolver, window=0.05, max_size=10)
+
+    future_a = batcher.submit('a')
+    future_b = batcher.submit('b')
+    assert batcher.submit('a') is future_a, 'Same key, same future'
+    assert not future_a.done()
+
+    assert future_a.result(timeout=1) == 'A'
+    assert future_b.result(timeout=1) == 'B'
+    assert resolver.batches == [['a', 'b']]
+
+
+def test_batcher_max_size():
+    """Test a full batch is resolved right away."""
+    resolver = FakeResolver()
+    batcher = Batcher(resolver, window=60, max_size=2)
+
+    future_a = batcher.submit('a')
+    future_b = batcher.submit('b')
+    assert future_a.done()
+    assert future_b.done()
+
+    future_c = batcher.submit('c')
+    assert not future_c.done()
+    batcher.close()
+    assert future_c.result(timeout=1) == 'C'
+    assert resolver.batches == [['a', 'b'], ['c']]
+
+
+def test_batcher_missing_key():
+    """Test keys not delivered by the resolver get ``None``."""
+    batcher = Batcher(FakeResolver(), window=60, max_size=2)
+
+    future = batcher.submit('missing')
+    batcher.submit('a')
+    assert future.result(timeout=1) is None
+
+
+def test_batcher_error():
+    """Test resolver's errors are set on undelivered futures."""
+    def resolver(keys, deliver):
+        deliver('a', 'A')
+        raise RuntimeError('Lichess is down')
+
+    batcher = Batcher(resolver, window=60, max_size=2)
+    future_a = batcher.submit('a')
+    future_b = batcher.submit('b')
+
+    assert future_a.result(timeout=1) == 'A'
+    with pytest.raises(RuntimeError):
+        future_b.result(timeout=1)
+
+
+def test_batcher_stats():
+    """Test batcher keeps an histogram of batch sizes."""
+    batcher = Batcher(FakeResolver(), window=60, max_size=2)
+    assert batcher.stats() == {
+        'batches': 0,
+        'keys': 0,
+        'sizes': {},
+        'pending': 0,
+    }
+
+    batcher.submit('a')
+    batcher.submit('b')
+    batcher.submit('c')
+    batcher.submit('d')
+    batcher.submit('e')
+    assert batcher.stats()['pending'] == 1
+    batcher.flush()
+
+    assert batcher.stats() == {
+        'batches': 3,
+        'keys': 5,
+        'sizes': {1: 1, 2: 2},
+        'pending': 0,
+    }
+
+
+def test_batcher_resolver_future():
+    """Test a batch resolved by a future is complete once it's done."""
+    outcomes = []
+
+    def resolver(keys, deliver):
+        outcome = Future()
+        outcomes.append((outcome, deliver))
+        return outcome
+
+    batcher = Batcher(resolver, window=60, max_size=2)
+    future_a = batcher.submit('a')
+    future_b = batcher.submit('b')
+    future_c = batcher.submit('c')
+    batcher.flush()
+
+    (outcome_ab, deliver_ab), (outcome_c, _) = outcomes
+    deliver_ab('a', 'A')
+    assert future_a.result(timeout=1) == 'A'
+    assert not future_b.done()
+
+    outcome_ab.set_result(None)
+    assert future_b.result(timeout=1) is None
+
+    outcome_c.set_exception(RuntimeError('Lichess is down'))
+    with pytest.raises(RuntimeError):
+        future_c.result(timeout=1)
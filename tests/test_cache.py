@@ -0,0 +1,180 @@
+"""Test ``sopel_lichess.cache``."""
+from __future__ import generator_stop
+
+from concurrent.futures import Future
+
+import pytest
+
+from sopel_lichess.cache import LRUCache, RefreshingCache
+from sopel_lichess.futures import resolved
+
+
+class FakeClock:
+    """Controllable clock for cache tests."""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_cache():
+    """Test basic get/set and hit/miss counters."""
+    cache = LRUCache(2)
+
+    assert cache.get('a') is None
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    assert len(cache) == 1
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['size'] == 1
+    assert stats['maxsize'] == 2
+
+
+def test_lru_cache_eviction():
+    """Test least recently used entries are evicted first."""
+    cache = LRUCache(2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # b is now the least recently used
+
+    cache.set('c', 3)
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.evictions == 1
+
+
+def test_lru_cache_ttl():
+    """Test entries with a TTL expire."""
+    clock = FakeClock()
+    cache = LRUCache(10, clock=clock)
+    cache.set('forever', 1)
+    cache.set('short', 2, ttl=30)
+
+    clock.now += 29
+    assert cache.get('short') == 2
+
+    clock.now += 1
+    assert cache.get('short') is None
+    assert cache.get('forever') == 1
+    assert len(cache) == 1
+
+
+def test_lru_cache_no_store():
+    """Test nothing is stored when disabled or with a null TTL."""
+    cache = LRUCache(0)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+
+    cache = LRUCache(10)
+    cache.set('a', 1, ttl=0)
+    assert cache.get('a') is None
+
+
+def test_lru_cache_pop_clear():
+    """Test entries can be removed."""
+    cache = LRUCache(10)
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    assert cache.pop('a') == 1
+    assert cache.pop('a') is None
+    assert cache.get('b') == 2
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_refreshing_cache():
+    """Test stale entries are returned and refreshed in background."""
+    clock = FakeClock()
+    spawned = []
+    cache = RefreshingCache(
+        10,
+        refresh_after=60,
+        max_age=600,
+        clock=clock,
+        spawn=spawned.append,
+    )
+    values = iter([1, 2, 3])
+
+    def loader():
+        return resolved(next(values))
+
+    assert cache.get('a', loader).result() == 1, 'Missing entry is loaded'
+    assert cache.get('a', loader).result() == 1, 'Fresh entry is cached'
+    assert not spawned
+
+    clock.now += 60
+    assert cache.get('a', loader).result() == 1, 'Stale entry is returned'
+    assert cache.get('a', loader).result() == 1, 'Stale entry is returned'
+    assert len(spawned) == 1, 'Only one refresh at a time'
+
+    spawned.pop()()
+    assert cache.get('a', loader).result() == 2, 'Entry must be refreshed'
+    assert cache.stats()['refreshes'] == 1
+
+    clock.now += 600
+    assert cache.get('a', loader).result() == 3, 'Too old entry is loaded'
+    assert not spawned
+
+
+def test_refreshing_cache_pending():
+    """Test a missing entry is stored once its future is done."""
+    cache = RefreshingCache(10, refresh_after=60, max_age=600)
+    pending = Future()
+
+    future = cache.get('a', lambda: pending)
+    assert not future.done()
+    assert len(cache) == 0
+
+    pending.set_result(1)
+    assert future.result() == 1
+    assert cache.get('a', lambda: resolved(2)).result() == 1
+
+
+def test_refreshing_cache_no_value():
+    """Test missing values and errors are not cached."""
+    cache = RefreshingCache(10, refresh_after=60, max_age=600)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return resolved(None)
+
+    assert cache.get('a', loader).result() is None
+    assert cache.get('a', loader).result() is None
+    assert len(calls) == 2
+    assert len(cache) == 0
+
+    failed = Future()
+    failed.set_exception(RuntimeError('Lichess is down'))
+    with pytest.raises(RuntimeError):
+        cache.get('a', lambda: failed).result()
+    assert len(cache) == 0
+
+
+def test_refreshing_cache_refresh_error():
+    """Test a failing refresh keeps the stale entry."""
+    clock = FakeClock()
+    cache = RefreshingCache(
+        10,
+        refresh_after=60,
+        max_age=600,
+        clock=clock,
+        spawn=lambda target: target(),
+    )
+    cache.set('a', 1)
+
+    def loader():
+        raise RuntimeError('Lichess is down')
+
+    clock.now += 60
+    assert cache.get('a', loader).result() == 1
+    assert cache.get('a', loader).result() == 1, 'Stale entry must be kept'
+    assert cache.stats()['refreshes'] == 0
@@ -0,0 +1,96 @@
+"""Test ``sopel_lichess.client``."""
+from __future__ import generator_stop
+
+import pytest
+
+from sopel_lichess.client import DEFAULT_TIMEOUT, LichessClient
+from sopel_lichess.ratelimit import RateLimiter, RequestShed
+
+
+def test_client_invalid_max_connections():
+    """Test client requires at least one connection."""
+    with pytest.raises(ValueError):
+        LichessClient('TOKEN', max_connections=0)
+
+
+def test_client_get(requests_mock):
+    """Test client sends authenticated requests with a timeout."""
+    requests_mock.get('https://lichess.org/api/user/georges', json={})
+    client = LichessClient('TOKEN')
+
+    response = client.get(
+        '/api/user/georges',
+        headers={'Accept': 'application/json'})
+
+    assert response.status_code == 200
+    request = requests_mock.last_request
+    assert request.headers['Authorization'] == 'Bearer TOKEN'
+    assert request.headers['Accept'] == 'application/json'
+    assert request.timeout == DEFAULT_TIMEOUT
+
+
+def test_client_get_timeout(requests_mock):
+    """Test client's timeout can be overridden per request."""
+    requests_mock.get('https://lichess.org/api/user/georges', json={})
+    client = LichessClient('TOKEN', timeout=3.0)
+
+    client.get('/api/user/georges')
+    assert requests_mock.last_request.timeout == 3.0
+
+    client.get('/api/user/georges', timeout=1.5)
+    assert requests_mock.last_request.timeout == 1.5
+
+
+def test_client_get_slot():
+    """Test client has one concurrency slot per host."""
+    client = LichessClient('TOKEN', max_connections=2)
+
+    slot = client.get_slot('https://lichess.org/api/user/georges')
+    assert slot is client.get_slot('https://lichess.org/game/export/abcd')
+    assert slot is not client.get_slot('https://example.com/')
+
+    assert slot.acquire(blocking=False)
+    assert slot.acquire(blocking=False)
+    assert not slot.acquire(blocking=False), 'Only 2 slots available.'
+
+
+def test_client_rate_limiter(requests_mock):
+    """Test client acquires a token and backs off on 429."""
+    requests_mock.get(
+        'https://lichess.org/api/user/georges',
+        status_code=429,
+        headers={'Retry-After': '30'},
+    )
+    limiter = RateLimiter(1, 1, max_wait=0)
+    client = LichessClient('TOKEN', rate_limiter=limiter)
+
+    response = client.get(
+        '/api/user/georges', endpoint='user')
+    assert response.status_code == 429
+    assert limiter.stats()['backoffs'] == 1
+    assert 29 < limiter.stats()['backoff_remaining'] <= 30
+
+    with pytest.raises(RequestShed):
+        client.get('/api/user/georges', endpoint='user')
+
+    assert requests_mock.call_count == 1
+
+
+def test_client_metrics(requests_mock):
+    """Test client counts responses by endpoint and status."""
+    requests_mock.get('https://lichess.org/api/user/georges', json={})
+    requests_mock.get('https://lichess.org/api/user/nobody', status_code=404)
+    client = LichessClient('TOKEN')
+
+    client.get('/api/user/georges', endpoint='user')
+    client.get('/api/user/nobody', endpoint='user')
+
+    assert client.metrics.counters('lichess_responses_total') == {
+        (('endpoint', 'user'), ('status', '200')): 1,
+        (('endpoint', 'user'), ('status', '404')): 1,
+    }
+    latencies = client.metrics.quantiles('lichess_request_seconds')
+    assert sorted(
+        (dict(labels)['phase'], count)
+        for labels, (count, _) in latencies.items()
+    ) == [('http', 2), ('wait', 2)]
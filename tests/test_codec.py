@@ -0,0 +1,62 @@
+"""Test ``sopel_lichess.codec``."""
+from __future__ import generator_stop
+
+import pytest
+
+from sopel_lichess import codec
+
+DOCUMENT = (
+    b'{"id": "abcdefgh", '
+    b'"players": {"white": {"user": {"name": "\xc3\xa9"}}}}')
+DECODED = {'id': 'abcdefgh', 'players': {'white': {'user': {'name': '\xe9'}}}}
+
+
+@pytest.fixture(autouse=True)
+def clear_codecs():
+    codec.get_codec.cache_clear()
+    yield
+    codec.get_codec.cache_clear()
+
+
+@pytest.mark.parametrize('name', ('json',) + codec.FAST_LIBRARIES)
+def test_codec(name):
+    """Test every installed library decodes bytes and encodes compactly."""
+    if not codec.is_available(name):
+        pytest.skip('%s is not installed' % name)
+
+    json_codec = codec.get_codec(name)
+
+    assert json_codec.name == name
+    assert json_codec.loads(DOCUMENT) == DECODED
+    assert json_codec.loads(bytearray(DOCUMENT)) == DECODED
+    assert json_codec.loads(DOCUMENT.decode('utf-8')) == DECODED
+    assert json_codec.dumps({'a': [1, 2], 'b': '\xe9'}) == (
+        '{"a":[1,2],"b":"\xe9"}'.encode('utf-8'))
+
+    with pytest.raises(ValueError):
+        json_codec.loads(b'{"id": ')
+
+
+def test_default_codec():
+    """Test the default codec is the first available fast library."""
+    expected = next(
+        (name for name in codec.FAST_LIBRARIES if codec.is_available(name)),
+        'json')
+
+    assert codec.get_codec().name == expected
+    assert codec.loads(DOCUMENT) == DECODED
+    assert codec.loads(codec.dumps(DECODED)) == DECODED
+
+
+def test_default_codec_fallback(monkeypatch):
+    """Test the stdlib is used without a fast library."""
+    monkeypatch.setattr(codec, 'is_available', lambda name: name == 'json')
+
+    assert codec.get_codec().name == 'json'
+    assert codec.loads(DOCUMENT) == DECODED
+
+
+def test_unsupported_codec():
+    """Test an unsupported library is an error."""
+    with pytest.raises(ValueError):
+        codec.get_codec('pickle')
@@ -0,0 +1,176 @@
+"""Test ``sopel_lichess.diskcache``."""
+from __future__ import generator_stop
+
+import sqlite3
+import threading
+
+from sopel_lichess.diskcache import DiskCache
+
+GAME = {
+    'id': 'abcdefgh',
+    'status': 'mate',
+    'players': {'white': {'user': {'name': 'Alice'}}},
+}
+
+
+class FakeClock:
+    """Clock ticking one second at each call."""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+def test_disk_cache(tmp_path):
+    """Test storing and getting a game."""
+    cache = DiskCache(str(tmp_path / 'games.db'), max_size=1024 * 1024)
+
+    assert cache.get('abcdefgh') is None
+    cache.set('abcdefgh', GAME)
+    assert cache.get('abcdefgh') == GAME
+
+    stats = cache.stats()
+    assert stats['count'] == 1
+    assert stats['size'] > 0
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    cache.close()
+
+
+def test_disk_cache_shared(tmp_path):
+    """Test two instances share the same database file."""
+    filename = str(tmp_path / 'games.db')
+    first = DiskCache(filename, max_size=1024 * 1024)
+    second = DiskCache(filename, max_size=1024 * 1024)
+
+    first.set('abcdefgh', GAME)
+    assert second.get('abcdefgh') == GAME
+
+    first.close()
+    second.close()
+
+    reopened = DiskCache(filename, max_size=1024 * 1024)
+    assert reopened.get('abcdefgh') == GAME, 'Games persist across restarts'
+    reopened.close()
+
+
+def test_disk_cache_threads(tmp_path):
+    """Test the cache can be used from several threads."""
+    cache = DiskCache(str(tmp_path / 'games.db'), max_size=1024 * 1024)
+    errors = []
+
+    def store(index):
+        try:
+            game_id = 'game%04d' % index
+            cache.set(game_id, dict(GAME, id=game_id))
+            assert cache.get(game_id)['id'] == game_id
+        except Exception as error:  # pylint: disable=broad-except
+            errors.append(error)
+
+    threads = [
+        threading.Thread(target=store, args=(index,))
+        for index in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert cache.stats()['count'] == 10
+    cache.close()
+
+
+def test_disk_cache_short_lived_threads(tmp_path):
+    """Test threads share one connection, and don't leave any behind."""
+    cache = DiskCache(str(tmp_path / 'games.db'), max_size=1024 * 1024)
+    connection = cache._connection
+
+    for index in range(20):
+        thread = threading.Thread(target=cache.get, args=('game%d' % index,))
+        thread.start()
+        thread.join()
+
+    assert cache._connection is connection
+    cache.close()
+    assert cache._connection is None
+
+
+def test_disk_cache_get_read_only(tmp_path):
+    """Test getting a game doesn't write to the database."""
+    cache = DiskCache(str(tmp_path / 'games.db'), max_size=1024 * 1024)
+    cache.set('abcdefgh', GAME)
+    changes = cache._connection.total_changes
+
+    assert cache.get('abcdefgh') == GAME
+    assert cache.get('12345678') is None
+    assert cache._connection.total_changes == changes
+    cache.close()
+
+
+def test_disk_cache_totals(tmp_path):
+    """Test the number and size of the games are kept up to date."""
+    cache = DiskCache(str(tmp_path / 'games.db'), max_size=1024 * 1024)
+    cache.set('abcdefgh', GAME)
+    size = cache.stats()['size']
+
+    cache.set('abcdefgh', GAME)
+    cache.set('12345678', GAME)
+
+    stats = cache.stats()
+    assert stats['count'] == 2, 'A replaced game is counted once'
+    assert stats['size'] == size * 2
+    cache.close()
+
+
+def test_disk_cache_totals_existing(tmp_path):
+    """Test the totals of a database created without them are computed."""
+    filename = str(tmp_path / 'games.db')
+    connection = sqlite3.connect(filename)
+    with connection:
+        connection.execute(
+            'CREATE TABLE games (id TEXT PRIMARY KEY, data BLOB NOT NULL, '
+            'size INTEGER NOT NULL, accessed_at REAL NOT NULL)')
+        connection.execute(
+            "INSERT INTO games VALUES ('abcdefgh', x'00', 10, 0)")
+    connection.close()
+
+    cache = DiskCache(filename, max_size=1024 * 1024)
+    assert cache.stats()['count'] == 1
+    assert cache.stats()['size'] == 10
+    cache.close()
+
+
+def test_disk_cache_eviction(tmp_path):
+    """Test least recently used games are evicted when too big."""
+    filename = str(tmp_path / 'games.db')
+    size = DiskCache(filename, max_size=1024)
+    size.set('probe', GAME)
+    game_size = size.stats()['size']
+    size.close()
+
+    cache = DiskCache(
+        str(tmp_path / 'evict.db'),
+        max_size=game_size * 2,
+        clock=FakeClock(),
+    )
+    cache.set('probe001', GAME)
+    cache.set('probe002', GAME)
+    assert cache.get('probe001') == GAME  # probe002 is now the oldest
+
+    cache.set('probe003', GAME)
+    assert cache.get('probe002') is None
+    assert cache.get('probe001') == GAME
+    assert cache.get('probe003') == GAME
+    assert cache.stats()['evictions'] == 1
+    cache.close()
+
+
+def test_disk_cache_disabled(tmp_path):
+    """Test nothing is stored without a size."""
+    cache = DiskCache(str(tmp_path / 'games.db'), max_size=0)
+    cache.set('abcdefgh', GAME)
+    assert cache.get('abcdefgh') is None
+    cache.close()
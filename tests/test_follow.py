@@ -0,0 +1,173 @@
+"""Test ``sopel_lichess.follow``."""
+from __future__ import generator_stop
+
+import json
+
+import pytest
+
+from sopel_lichess.client import LichessClient
+from sopel_lichess.follow import GameFollower
+
+STREAM_URL = 'https://lichess.org/api/stream/games/sopel'
+
+
+def ndjson_body(*games):
+    return '\n'.join(json.dumps(game) for game in games) + '\n'
+
+
+@pytest.fixture
+def announced():
+    return []
+
+
+@pytest.fixture
+def spawned():
+    return []
+
+
+@pytest.fixture
+def follower(announced, spawned):
+    return GameFollower(
+        LichessClient('TOKEN'),
+        on_over=lambda game_id, channels: announced.append(
+            (game_id, sorted(channels))),
+        max_per_channel=2,
+        stream_id='sopel',
+        spawn=spawned.append,
+        sleep=lambda seconds: None,
+    )
+
+
+def test_follow(follower, announced, spawned, requests_mock):
+    """Test followed games are announced once they are over."""
+    requests_mock.post(STREAM_URL, text=ndjson_body(
+        {'id': 'abcdefgh', 'status': 20, 'statusName': 'started'},
+        {'id': '12345678', 'status': 20, 'statusName': 'started'},
+        {'id': 'abcdefgh', 'status': 31, 'statusName': 'resign'},
+        {'id': '12345678', 'status': 30, 'statusName': 'mate'},
+    ))
+
+    assert follower.follow('abcdefgh', '#channel')
+    assert follower.follow('abcdefgh', '#other')
+    assert follower.follow('12345678', '#channel')
+    assert len(spawned) == 1, 'Only one reader must be started'
+    assert len(follower) == 2
+    assert follower.stats() == {
+        'games': 2,
+        'channels': 2,
+        'reconnections': 0,
+    }
+
+    spawned[0]()
+
+    assert announced == [
+        ('abcdefgh', ['#channel', '#other']),
+        ('12345678', ['#channel']),
+    ]
+    assert requests_mock.call_count == 1
+    assert requests_mock.last_request.text == 'abcdefgh,12345678'
+    assert len(follower) == 0
+    assert follower.followed('#channel') == 0
+
+    # the reader stopped, so a new one is started
+    assert follower.follow('ABCDEFGH', '#channel')
+    assert len(spawned) == 2
+
+
+def test_follow_max_per_channel(follower, spawned):
+    """Test a channel can't follow too many games."""
+    assert follower.follow('abcdefgh', '#channel')
+    assert follower.follow('abcdefgh', '#channel'), 'Already followed'
+    assert follower.follow('12345678', '#channel')
+    assert not follower.follow('ABCDEFGH', '#channel')
+    assert follower.follow('ABCDEFGH', '#other')
+    assert follower.followed('#channel') == 2
+
+    assert follower.unfollow('abcdefgh', '#channel')
+    assert not follower.unfollow('abcdefgh', '#channel'), 'Not followed'
+    assert 'abcdefgh' not in follower
+    assert follower.follow('ABCDEFGH', '#channel')
+
+
+def test_unfollow_reopen(spawned, requests_mock):
+    """Test the stream is reopened without an unfollowed game."""
+    announced = []
+
+    def on_over(game_id, channels):
+        announced.append(game_id)
+        follower.unfollow('12345678', '#channel')
+
+    follower = GameFollower(
+        LichessClient('TOKEN'),
+        on_over=on_over,
+        max_per_channel=3,
+        stream_id='sopel',
+        spawn=spawned.append,
+        sleep=lambda seconds: None,
+    )
+    stream = requests_mock.post(STREAM_URL, [
+        {'text': ndjson_body({'id': 'abcdefgh', 'statusName': 'mate'})},
+        {'text': ndjson_body({'id': 'ABCDEFGH', 'statusName': 'draw'})},
+    ])
+
+    follower.follow('abcdefgh', '#channel')
+    follower.follow('12345678', '#channel')
+    follower.follow('ABCDEFGH', '#channel')
+    spawned[0]()
+
+    assert announced == ['abcdefgh', 'ABCDEFGH']
+    assert stream.call_count == 2
+    assert stream.request_history[1].text == 'ABCDEFGH'
+    assert follower.reconnections == 0, 'Not a dropped stream'
+
+
+def test_follow_added_while_opening(
+        follower, announced, spawned, requests_mock):
+    """Test a game followed while the stream opens is added to it."""
+    def stream(request, context):
+        # followed between the snapshot of games and the open stream
+        follower.follow('12345678', '#channel')
+        return ndjson_body(
+            {'id': 'abcdefgh', 'statusName': 'mate'},
+            {'id': '12345678', 'statusName': 'draw'},
+        )
+
+    requests_mock.post(STREAM_URL, text=stream)
+    add = requests_mock.post(STREAM_URL + '/add', text='')
+
+    follower.follow('abcdefgh', '#channel')
+    spawned[0]()
+
+    assert add.call_count == 1
+    assert add.last_request.text == '12345678'
+    assert announced == [
+        ('abcdefgh', ['#channel']),
+        ('12345678', ['#channel']),
+    ]
+
+
+def test_follow_reconnect(follower, announced, spawned, requests_mock):
+    """Test the stream is reopened when it drops."""
+    requests_mock.post(STREAM_URL, [
+        {'status_code': 500},
+        {'text': ndjson_body({'id': 'abcdefgh', 'statusName': 'started'})},
+        {'text': ndjson_body({'id': 'abcdefgh', 'statusName': 'outoftime'})},
+    ])
+
+    follower.follow('abcdefgh', '#channel')
+    spawned[0]()
+
+    assert announced == [('abcdefgh', ['#channel'])]
+    assert follower.reconnections == 2
+
+
+def test_close(follower, spawned):
+    """Test a closed follower doesn't follow games anymore."""
+    follower.follow('abcdefgh', '#channel')
+    follower.close()
+
+    assert len(follower) == 0
+    assert not follower.follow('12345678', '#channel')
+
+    # the reader stops right away
+    spawned[0]()
@@ -0,0 +1,68 @@
+"""Test ``sopel_lichess.futures``."""
+from __future__ import generator_stop
+
+from concurrent.futures import Future
+
+import pytest
+
+from sopel_lichess import futures
+
+
+def test_resolved():
+    """Test getting a resolved future."""
+    future = futures.resolved(42)
+    assert future.done()
+    assert future.result() == 42
+
+
+def test_call():
+    """Test calling a function into a future."""
+    assert futures.call(int, '42').result() == 42
+
+    future = futures.call(int, 'forty-two')
+    assert isinstance(future.exception(), ValueError)
+
+
+def test_after():
+    """Test chaining a future after a callback."""
+    calls = []
+    pending = Future()
+
+    chained = futures.after(pending, calls.append)
+    assert not chained.done()
+
+    pending.set_result(42)
+    assert calls == [pending]
+    assert chained.result() == 42
+
+
+def test_after_error():
+    """Test chaining a failed future."""
+    pending = Future()
+    chained = futures.after(pending, lambda future: None)
+
+    pending.set_exception(RuntimeError('Lichess is down'))
+    with pytest.raises(RuntimeError):
+        chained.result()
+
+
+def test_then():
+    """Test transforming the result of a future."""
+    pending = Future()
+    chained = futures.then(pending, len)
+    assert not chained.done()
+
+    pending.set_result([1, 2, 3])
+    assert chained.result() == 3
+
+
+def test_then_error():
+    """Test the error of a future, or of the function, is relayed."""
+    pending = Future()
+    chained = futures.then(pending, len)
+    pending.set_exception(RuntimeError('Lichess is down'))
+    with pytest.raises(RuntimeError):
+        chained.result()
+
+    chained = futures.then(futures.resolved(42), len)
+    assert isinstance(chained.exception(), TypeError)
@@ -0,0 +1,89 @@
+"""Test the import time of ``sopel_lichess``."""
+from __future__ import generator_stop
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+IMPORT_TIME_BUDGET_ENV = 'SOPEL_LICHESS_IMPORT_TIME_BUDGET'
+"""Environment variable with the maximum time (in seconds) to import the
+plugin, once Sopel is loaded.
+
+Import time depends on the machine and on its load, so it is only checked
+when this variable is set, such as ``0.2`` on a developer's machine.
+"""
+
+HEAVY_MODULES = (
+    'aiohttp', 'asyncio', 'cProfile', 'orjson', 'pkg_resources', 'pstats',
+    'requests', 'sqlite3', 'ujson')
+"""Modules that must not be imported until the plugin is used."""
+
+SCRIPT = """
+import json
+import sys
+import time
+
+import sopel.bot
+import sopel.config
+import sopel.plugin
+import sopel.tools
+import sopel.trigger
+
+# Sopel itself may use pkg_resources: only the plugin's imports are checked
+before = set(sys.modules)
+start = time.perf_counter()
+import sopel_lichess.plugin
+elapsed = time.perf_counter() - start
+
+print(json.dumps({
+    'elapsed': elapsed,
+    'modules': sorted(set(sys.modules) - before),
+}))
+"""
+
+
+def run_script(script):
+    output = subprocess.run(
+        [sys.executable, '-c', script],
+        check=True,
+        stdout=subprocess.PIPE,
+    ).stdout
+    return json.loads(output)
+
+
+def test_import_plugin():
+    """Test the plugin doesn't import heavy modules."""
+    result = run_script(SCRIPT)
+    imported = set(result['modules'])
+
+    for module in HEAVY_MODULES:
+        assert module not in imported, (
+            '%s must be imported on first use only' % module)
+
+
+@pytest.mark.skipif(
+    not os.environ.get(IMPORT_TIME_BUDGET_ENV),
+    reason='%s is not set' % IMPORT_TIME_BUDGET_ENV)
+def test_import_plugin_time():
+    """Test the plugin is fast to import."""
+    budget = float(os.environ[IMPORT_TIME_BUDGET_ENV])
+    result = run_script(SCRIPT)
+
+    assert result['elapsed'] < budget
+
+
+def test_import_version():
+    """Test the version is read without pkg_resources."""
+    result = run_script(
+        'import json, sys\n'
+        'import sopel_lichess\n'
+        'print(json.dumps({\n'
+        '    "version": sopel_lichess.__version__,\n'
+        '    "modules": sorted(sys.modules),\n'
+        '}))\n')
+
+    assert result['version']
+    assert 'pkg_resources' not in result['modules']
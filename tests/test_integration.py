@@ -1,6 +1,8 @@
 """Integration tests for the lichess Sopel plugin."""
 from __future__ import generator_stop
 
+import functools
+import json
 import os
 from unittest import mock
 
@@ -8,8 +10,12 @@ import pytest
 from sopel import formatting
 from sopel.tests import rawlist
 
+from sopel_lichess import parsers, plugin
+from sopel_lichess.follow import GameFollower
+from sopel_lichess.models import Game, Puzzle, Tournament
 from sopel_lichess.parsers import BLACK, WHITE, WINNER, parse_game_type
 from sopel_lichess.plugin import configure
+from sopel_lichess.ratelimit import Priority
 
 TMP_CONFIG = """
 [core]
@@ -80,6 +86,17 @@ def irc(tmpconfig, botfactory, ircfactory):
     return server
 
 
+@pytest.fixture
+def prefetched_irc(configfactory, botfactory, ircfactory):
+    """IRC Server fixture, with the prefetch of the snapshot enabled."""
+    settings = configfactory(
+        'prefetch.cfg', TMP_CONFIG + 'prefetch_interval = 60\n')
+    mockbot = botfactory.preloaded(settings, preloads=['lichess'])
+    server = ircfactory(mockbot)
+    server.bot.backend.clear_message_sent()
+    return server
+
+
 @pytest.fixture
 def user(userfactory):
     """User fixture."""
@@ -117,6 +134,25 @@ def test_player_url(irc, user, requests_mock):
     )
 
 
+def test_player_url_cached(irc, user, requests_mock):
+    """Test a player is fetched only once while fresh."""
+    requests_mock.get(
+        'https://lichess.org/api/user/georges',
+        json={'username': 'Georges'},
+    )
+
+    irc.say(user, '#channel', 'https://lichess.org/@/georges')
+    irc.say(user, '#other', 'https://lichess.org/@/Georges')
+
+    assert requests_mock.call_count == 1
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s' % parsers.format_player(
+            {'username': 'Georges'}),
+        'PRIVMSG #other :[lichess] %s' % parsers.format_player(
+            {'username': 'Georges'}),
+    )
+
+
 def test_player_url_404(irc, user, requests_mock):
     """Test handling of a non-existing player URL."""
     requests_mock.get(
@@ -172,7 +208,17 @@ def test_game_url(irc, user, requests_mock):
         last_message,
     )[-1]
 
-    # with an anchor
+    # with an anchor, within the output cooldown
+    irc.say(
+        user,
+        '#channel',
+        'Check this game https://lichess.org/abcdefgh#1 I won!',
+    )
+    assert len(irc.bot.backend.message_sent) == 1, (
+        'The same result must not be said again within the cooldown')
+
+    # with an anchor, once the cooldown is over
+    irc.bot.memory[plugin.OUTPUT_KEY].cooldown = 0
     irc.say(
         user,
         '#channel',
@@ -184,12 +230,316 @@ def test_game_url(irc, user, requests_mock):
     )
 
 
+def test_game_url_cached(irc, user, requests_mock):
+    """Test a finished game is fetched only once."""
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh',
+        json=MOCK_JSON_GAME,
+    )
+
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+    irc.say(user, '#other', 'https://lichess.org/abcdefgh/white')
+
+    assert requests_mock.call_count == 1
+    assert len(irc.bot.backend.message_sent) == 2
+
+
+def test_game_url_stored(irc, user, requests_mock):
+    """Test a finished game is stored on disk and reused."""
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh',
+        json=MOCK_JSON_GAME,
+    )
+
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+    assert requests_mock.call_count == 1
+
+    store = irc.bot.memory[plugin.GAME_STORE_KEY]
+    assert store.get('abcdefgh') == Game.from_data(MOCK_JSON_GAME).to_data()
+    assert 'moves' not in store.get('abcdefgh'), 'Only the needed fields'
+
+    # as if the bot was restarted
+    irc.bot.memory[plugin.GAME_CACHE_KEY].clear()
+    irc.bot.memory[plugin.OUTPUT_KEY].cooldown = 0
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+
+    assert requests_mock.call_count == 1
+    assert len(irc.bot.backend.message_sent) == 2
+    assert irc.bot.backend.message_sent[0] == irc.bot.backend.message_sent[1]
+
+
+def test_game_url_ongoing(irc, user, requests_mock):
+    """Test an ongoing game is cached with a TTL."""
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh',
+        json=dict(MOCK_JSON_GAME, status='started', winner=None),
+    )
+
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+    assert requests_mock.call_count == 1, 'Ongoing game must be cached'
+    assert irc.bot.memory[plugin.GAME_STORE_KEY].get('abcdefgh') is None, (
+        'Ongoing game must not be stored on disk')
+
+    # without a TTL, ongoing games aren't cached
+    irc.bot.memory[plugin.GAME_CACHE_KEY].clear()
+    irc.bot.settings.lichess.game_cache_ttl = 0
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+    assert requests_mock.call_count == 3
+
+
+def test_game_url_followed(irc, user, requests_mock):
+    """Test an ongoing game is followed until it is over."""
+    ongoing = dict(MOCK_JSON_GAME, status='started', winner=None)
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh',
+        [{'json': ongoing}, {'json': MOCK_JSON_GAME}],
+    )
+    requests_mock.post(
+        'https://lichess.org/api/stream/games/sopel',
+        text='\n'.join([
+            json.dumps({'id': 'abcdefgh', 'status': 20,
+                        'statusName': 'started'}),
+            json.dumps({'id': 'abcdefgh', 'status': 31,
+                        'statusName': 'resign'}),
+        ]),
+        headers={'Content-Type': 'application/x-ndjson'},
+    )
+    irc.bot.memory[plugin.GAME_BATCH_KEY].window = 0
+    irc.bot.settings.lichess.follow_games = True
+    irc.bot.memory[plugin.FOLLOW_KEY] = GameFollower(
+        plugin.get_client(irc.bot),
+        on_over=functools.partial(plugin.announce_game_over, irc.bot),
+        max_per_channel=1,
+        stream_id='sopel',
+        spawn=lambda target: target(),
+    )
+
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s' % ' | '.join(
+            parsers.parse_game_data(ongoing)),
+        'PRIVMSG #channel :[lichess] %s | https://lichess.org/abcdefgh' % (
+            ' | '.join(parsers.parse_game_data(MOCK_JSON_GAME))),
+    )
+    assert irc.bot.memory[plugin.GAME_STORE_KEY].get('abcdefgh') == (
+        Game.from_data(MOCK_JSON_GAME).to_data())
+
+
+def test_follower_own_client(irc):
+    """Test the follower's stream doesn't use the lookups' connections."""
+    irc.bot.settings.lichess.follow_games = True
+    irc.bot.settings.lichess.max_connections = 1
+
+    follower = plugin.get_follower(irc.bot)
+
+    assert follower.client is not plugin.get_client(irc.bot)
+    assert follower.client.max_connections == 2
+
+
+def test_game_url_followed_private(irc, user, requests_mock):
+    """Test an ongoing game is not followed in private."""
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh',
+        json=dict(MOCK_JSON_GAME, status='started', winner=None),
+    )
+    irc.bot.settings.lichess.follow_games = True
+    follower = irc.bot.memory[plugin.FOLLOW_KEY] = GameFollower(
+        plugin.get_client(irc.bot),
+        on_over=functools.partial(plugin.announce_game_over, irc.bot),
+        max_per_channel=1,
+        spawn=lambda target: None,
+    )
+
+    irc.pm(user, 'https://lichess.org/abcdefgh')
+
+    assert len(irc.bot.backend.message_sent) == 1
+    assert len(follower) == 0
+
+
+def test_game_url_follow_max_and_unfollow(irc, user, requests_mock):
+    """Test a channel is told when it follows too many games."""
+    for game_id in ('abcdefgh', '12345678'):
+        requests_mock.get(
+            'https://lichess.org/game/export/%s' % game_id,
+            json=dict(
+                MOCK_JSON_GAME, id=game_id, rated=game_id == 'abcdefgh',
+                status='started', winner=None),
+        )
+    irc.bot.memory[plugin.GAME_BATCH_KEY].window = 0
+    irc.bot.settings.lichess.follow_games = True
+    follower = irc.bot.memory[plugin.FOLLOW_KEY] = GameFollower(
+        plugin.get_client(irc.bot),
+        on_over=functools.partial(plugin.announce_game_over, irc.bot),
+        max_per_channel=1,
+        spawn=lambda target: None,
+    )
+
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+    irc.say(user, '#channel', 'https://lichess.org/12345678')
+
+    assert 'abcdefgh' in follower
+    assert '12345678' not in follower
+    lines = [
+        message.decode('utf-8')
+        for message in irc.bot.backend.message_sent
+    ]
+    assert len(lines) == 3
+    assert (
+        'PRIVMSG #channel :Exirel: Not following game 12345678: '
+        'this channel already follows 1 games '
+        '(stop one with .lichess unfollow <game>).\r\n'
+    ) in lines
+
+    irc.bot.backend.message_sent = []
+    irc.say(user, '#channel', '.lichess unfollow 12345678')
+    irc.say(user, '#channel', '.lichess unfollow https://lichess.org/abcdefgh')
+    irc.pm(user, '.lichess unfollow abcdefgh')
+
+    assert len(follower) == 0
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :Exirel: Game 12345678 is not followed here.',
+        'PRIVMSG #channel :Exirel: No longer following game abcdefgh.',
+        'PRIVMSG Exirel :Exirel: Games are only followed in channels.',
+    )
+
+
+def test_unfollow_command_disabled(irc, user):
+    """Test the unfollow command when games are not followed."""
+    irc.say(user, '#channel', '.lichess unfollow abcdefgh')
+
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :Exirel: Games are not followed.',
+    )
+
+
+def test_game_urls_batch(irc, user, requests_mock):
+    """Test several games are exported at once."""
+    requests_mock.post(
+        'https://lichess.org/api/games/export/_ids',
+        text='\n'.join([
+            json.dumps(dict(MOCK_JSON_GAME, id='abcdefgh')),
+            json.dumps(dict(MOCK_JSON_GAME, id='12345678', rated=False)),
+        ]),
+        headers={'Content-Type': 'application/x-ndjson'},
+    )
+    batcher = irc.bot.memory[plugin.GAME_BATCH_KEY]
+    batcher.window = 60
+    batcher.max_size = 2
+
+    irc.say(
+        user,
+        '#channel',
+        'Check https://lichess.org/abcdefgh and '
+        'https://lichess.org/12345678/black',
+    )
+
+    assert requests_mock.call_count == 1
+    assert batcher.stats()['sizes'] == {2: 1}
+    expected = [
+        ' | '.join(parsers.parse_game_data(MOCK_JSON_GAME)),
+        ' | '.join(parsers.parse_game_data(
+            dict(MOCK_JSON_GAME, rated=False), for_player='black')),
+    ]
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s' % ' | '.join(expected),
+    )
+
+
+def test_game_urls_duplicated(irc, user, requests_mock):
+    """Test the same game linked twice in a message is handled once."""
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh',
+        json=MOCK_JSON_GAME,
+    )
+
+    irc.say(
+        user,
+        '#channel',
+        'Check https://lichess.org/abcdefgh (or '
+        'https://lichess.org/abcdefgh/black) and https://lichess.org/abcdefgh',
+    )
+
+    assert requests_mock.call_count == 1
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s' % ' | '.join(
+            parsers.parse_game_data(MOCK_JSON_GAME)),
+    )
+
+
+def test_url_callbacks(irc):
+    """Test other Lichess URLs are left to Sopel's url plugin."""
+    rules = irc.bot.rules
+
+    assert rules.check_url_callback(irc.bot, 'https://lichess.org/abcdefgh')
+    assert rules.check_url_callback(irc.bot, 'https://lichess.org/@/bob')
+    assert not rules.check_url_callback(
+        irc.bot, 'https://lichess.org/forum/general-chess-discussion')
+    assert not rules.check_url_callback(irc.bot, 'https://lichess.org/blog')
+    assert not rules.check_url_callback(
+        irc.bot, 'https://lichess.org/training/daily')
+    assert not rules.check_url_callback(
+        irc.bot, 'https://lichess.org/tournament/calendar')
+
+
+def test_urls_max_links(irc, user, requests_mock):
+    """Test no more than ``max_links_per_message`` links are handled."""
+    irc.bot.settings.lichess.max_links_per_message = 2
+    requests_mock.get(
+        'https://lichess.org/api/user/alice',
+        json={'id': 'alice', 'username': 'Alice'},
+    )
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh',
+        json=MOCK_JSON_GAME,
+    )
+
+    irc.say(
+        user,
+        '#channel',
+        'Spam https://lichess.org/@/alice https://lichess.org/abcdefgh '
+        'https://lichess.org/@/bob https://lichess.org/12345678',
+    )
+
+    assert requests_mock.call_count == 2
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s | %s' % (
+            parsers.format_player({'username': 'Alice'}),
+            ' | '.join(parsers.parse_game_data(MOCK_JSON_GAME))),
+    )
+
+
+def test_game_lookups_collapsed(irc, requests_mock):
+    """Test concurrent lookups of the same game share one request."""
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh',
+        json=MOCK_JSON_GAME,
+    )
+    batcher = irc.bot.memory[plugin.GAME_BATCH_KEY]
+    batcher.window = 60
+
+    first = plugin.lookup_game(irc.bot, 'abcdefgh')
+    second = plugin.lookup_game(irc.bot, 'abcdefgh')
+    assert first is second
+
+    batcher.flush()
+    assert first.result() == Game.from_data(MOCK_JSON_GAME)
+    assert requests_mock.call_count == 1
+    assert irc.bot.memory[plugin.FLIGHT_KEY].stats() == {
+        'in_flight': 0,
+        'collapsed': 1,
+    }
+
+
 def test_game_url_with_color(irc, user, requests_mock):
     """Test handling of a game URL with /white or /black at the end."""
     requests_mock.get(
         'https://lichess.org/game/export/abcdefgh',
         json=MOCK_JSON_GAME,
     )
+    irc.bot.memory[plugin.OUTPUT_KEY].cooldown = 0
 
     # from white's perspective
     irc.say(
@@ -350,6 +700,455 @@ def test_tv_channel_url_404(irc, user, requests_mock):
     assert not irc.bot.backend.message_sent
 
 
+MOCK_JSON_PUZZLE = {
+    'game': {
+        'id': '13YoaUPC',
+        'perf': {'key': 'bullet', 'name': 'Bullet'},
+        'rated': True,
+    },
+    'puzzle': {
+        'id': 'K69di',
+        'rating': 1989,
+        'plays': 12345,
+        'solution': ['e7e8q'],
+        'themes': ['advancedPawn', 'endgame'],
+    },
+}
+
+
+def test_tv_channel_url_prefetched(prefetched_irc, user, requests_mock):
+    """Test TV channels are answered from the prefetched snapshot."""
+    irc = prefetched_irc
+    requests_mock.get(
+        'https://lichess.org/api/tv/channels',
+        json={
+            'Bullet': {'gameId': '13YoaUPC', 'rating': 2790},
+            'Top Rated': {'gameId': '13YoaUPC', 'rating': 2790},
+        },
+    )
+    requests_mock.get(
+        'https://lichess.org/game/export/13YoaUPC', json=MOCK_JSON_GAME)
+    requests_mock.get(
+        'https://lichess.org/api/puzzle/daily', json=MOCK_JSON_PUZZLE)
+    requests_mock.get('https://lichess.org/api/tv/blitz', text='')
+
+    client = plugin.get_client(irc.bot)
+    with mock.patch.object(
+            client, 'request', wraps=client.request) as request:
+        plugin.lichess_prefetch(irc.bot)
+
+    assert requests_mock.call_count == 3
+    assert {
+        kwargs['priority'] for _, kwargs in request.call_args_list
+    } == {Priority.LOW}, 'Every prefetch request has a low priority'
+
+    irc.bot.memory[plugin.OUTPUT_KEY].cooldown = 0
+    irc.say(user, '#channel', 'https://lichess.org/tv/bullet')
+    irc.say(user, '#channel', 'https://lichess.org/tv/best')
+    assert requests_mock.call_count == 3, 'Answered from the snapshot'
+
+    expected = ' | '.join(
+        parsers.parse_game_data(Game.from_data(MOCK_JSON_GAME))
+        + ['https://lichess.org/13YoaUPC'])
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s' % expected,
+        'PRIVMSG #channel :[lichess] %s' % expected,
+    )
+
+    # an unknown channel is requested
+    irc.say(user, '#channel', 'https://lichess.org/tv/blitz')
+    assert requests_mock.call_count == 4
+    assert requests_mock.last_request.path == '/api/tv/blitz'
+
+    # the next refresh is not due yet
+    plugin.lichess_prefetch(irc.bot)
+    assert requests_mock.call_count == 4
+
+
+def test_puzzle_command(irc, user, requests_mock):
+    """Test the daily puzzle, cached for a while without a snapshot."""
+    requests_mock.get(
+        'https://lichess.org/api/puzzle/daily', json=MOCK_JSON_PUZZLE)
+
+    irc.say(user, '#channel', '.puzzle')
+    irc.say(user, '#channel', '.puzzle')
+
+    expected = ' | '.join(
+        parsers.parse_puzzle_data(
+            Puzzle.from_data(MOCK_JSON_PUZZLE), title='Daily puzzle')
+        + ['https://lichess.org/training/K69di'])
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s' % expected,
+        'PRIVMSG #channel :[lichess] %s' % expected,
+    )
+    assert requests_mock.call_count == 1, 'The puzzle must be cached'
+    assert plugin.SNAPSHOT_KEY not in irc.bot.memory
+
+    # once expired, the puzzle is requested again
+    irc.bot.memory[plugin.PUZZLE_CACHE_KEY].clear()
+    irc.say(user, '#channel', '.puzzle')
+    assert requests_mock.call_count == 2
+
+
+def test_puzzle_command_prefetched(prefetched_irc, user, requests_mock):
+    """Test the daily puzzle, fetched once, then from the snapshot."""
+    irc = prefetched_irc
+    requests_mock.get(
+        'https://lichess.org/api/puzzle/daily', json=MOCK_JSON_PUZZLE)
+
+    irc.say(user, '#channel', '.puzzle')
+    irc.say(user, '#channel', '.puzzle')
+
+    expected = ' | '.join(
+        parsers.parse_puzzle_data(
+            Puzzle.from_data(MOCK_JSON_PUZZLE), title='Daily puzzle')
+        + ['https://lichess.org/training/K69di'])
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s' % expected,
+        'PRIVMSG #channel :[lichess] %s' % expected,
+    )
+    assert requests_mock.call_count == 1
+
+
+def test_puzzle_command_unavailable(irc, user, requests_mock):
+    """Test the daily puzzle when it can't be fetched."""
+    requests_mock.get(
+        'https://lichess.org/api/puzzle/daily', status_code=503)
+
+    irc.say(user, '#channel', '.puzzle')
+
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :Exirel: The daily puzzle is not available.',
+    )
+
+
+def test_tournament_url(irc, user, requests_mock):
+    """Test handling of an arena URL, with its top standings."""
+    arena = {
+        'id': 'abcd1234',
+        'fullName': 'Hourly Blitz Arena',
+        'clock': {'limit': 180, 'increment': 0},
+        'variant': 'standard',
+        'rated': True,
+        'nbPlayers': 312,
+        'isFinished': True,
+    }
+    results = [
+        {'rank': rank, 'score': 60 - rank, 'rating': 2500,
+         'username': 'player%d' % rank}
+        for rank in range(1, 11)
+    ]
+    requests_mock.get(
+        'https://lichess.org/api/tournament/abcd1234', json=arena)
+    requests_mock.get(
+        'https://lichess.org/api/tournament/abcd1234/results',
+        text='\n'.join(json.dumps(result) for result in results),
+        headers={'Content-Type': 'application/x-ndjson'},
+    )
+
+    irc.say(user, '#channel', 'https://lichess.org/tournament/abcd1234')
+
+    expected = parsers.parse_tournament_data(
+        Tournament.from_data(dict(arena, standings=results[:3])))
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s' % ' | '.join(expected),
+    )
+    assert requests_mock.last_request.qs['nb'] == ['3']
+
+    # a finished tournament is cached
+    irc.bot.memory[plugin.OUTPUT_KEY].cooldown = 0
+    irc.say(user, '#channel', 'https://lichess.org/tournament/abcd1234')
+    assert requests_mock.call_count == 2
+    assert len(irc.bot.backend.message_sent) == 2
+
+
+def test_swiss_url_ongoing(irc, user, requests_mock):
+    """Test handling of an ongoing Swiss tournament URL."""
+    irc.bot.settings.lichess.tournament_standings = 0
+    swiss = {
+        'id': 'abcd1234',
+        'name': 'Weekly Swiss',
+        'clock': {'limit': 600, 'increment': 5},
+        'variant': 'standard',
+        'round': 3,
+        'nbRounds': 7,
+        'nbPlayers': 88,
+        'status': 'started',
+    }
+    requests_mock.get('https://lichess.org/api/swiss/abcd1234', json=swiss)
+
+    irc.say(user, '#channel', 'https://lichess.org/swiss/abcd1234')
+
+    expected = parsers.parse_tournament_data(
+        Tournament.from_data(swiss, kind='swiss'))
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s' % ' | '.join(expected),
+    )
+
+    # an ongoing tournament is not cached
+    irc.say(user, '#other', 'https://lichess.org/swiss/abcd1234')
+    assert requests_mock.call_count == 2
+
+
+def test_tournament_url_404(irc, user, requests_mock):
+    """Test handling of a non-existing tournament URL."""
+    requests_mock.get(
+        'https://lichess.org/api/tournament/abcd1234', status_code=404)
+
+    irc.say(user, '#channel', 'https://lichess.org/tournament/abcd1234')
+
+    assert not irc.bot.backend.message_sent
+
+
+def test_study_url(irc, user, requests_mock):
+    """Test handling of a study URL, with its first chapters."""
+    requests_mock.get(
+        'https://lichess.org/api/study/abcdefgh.pgn',
+        text='\n\n'.join(
+            '[Event "Openings: Chapter %d"]\n[Result "*"]\n\n1. e4 *\n'
+            % index
+            for index in range(1, 11)),
+    )
+
+    irc.say(user, '#channel', 'https://lichess.org/study/abcdefgh')
+
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s | Chapter 1, Chapter 2, Chapter 3'
+        % formatting.bold('Openings'),
+    )
+
+
+def test_broadcast_game_url(irc, user, requests_mock):
+    """Test handling of a broadcast game's URL."""
+    requests_mock.get(
+        'https://lichess.org/api/study/abcdefgh/ijklmnop.pgn',
+        text=(
+            '[Event "Tata Steel"]\n[White "Alice"]\n[Black "Bob"]\n'
+            '[Result "1-0"]\n[ECO "C65"]\n\n1. e4 e5 1-0\n'
+        ),
+    )
+
+    irc.say(
+        user,
+        '#channel',
+        'https://lichess.org/broadcast/tata-steel/round-1/abcdefgh/ijklmnop',
+    )
+
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s | Alice vs Bob 1-0 (C65)'
+        % formatting.bold('Tata Steel'),
+    )
+
+
+def test_broadcast_url_404(irc, user, requests_mock):
+    """Test handling of a non-existing broadcast URL."""
+    requests_mock.get(
+        'https://lichess.org/api/broadcast/abcdefgh.pgn', status_code=404)
+
+    irc.say(user, '#channel', 'https://lichess.org/broadcast/tata/abcdefgh')
+
+    assert not irc.bot.backend.message_sent
+
+
+def test_rate_limited(irc, user, requests_mock):
+    """Test lookups are dropped while backing off from a 429."""
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh',
+        status_code=429,
+    )
+    plugin.get_client(irc.bot).rate_limiter.max_wait = 0
+
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+    irc.say(user, '#channel', 'https://lichess.org/@/georges')
+    irc.say(user, '#channel', 'https://lichess.org/tv/blitz')
+
+    assert requests_mock.call_count == 1
+    assert not irc.bot.backend.message_sent
+    limiter = plugin.get_client(irc.bot).rate_limiter
+    assert limiter.stats()['shed'] == {
+        'game': 1,
+        'user': 1,
+        'tv': 1,
+    }
+
+
+def test_stats_command(irc, user, userfactory, requests_mock):
+    """Test the owner can see the plugin's metrics."""
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh',
+        json=MOCK_JSON_GAME,
+    )
+    requests_mock.get(
+        'https://lichess.org/game/export/12345678',
+        status_code=404,
+    )
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+    irc.say(user, '#channel', 'https://lichess.org/12345678')
+    irc.bot.backend.clear_message_sent()
+
+    irc.say(user, '#channel', '.lichess stats')
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :Exirel: Only the bot owner can use this command.')
+    irc.bot.backend.clear_message_sent()
+
+    irc.say(userfactory('testnick'), '#channel', '.lichess stats')
+    lines = [
+        message.decode('utf-8')
+        for message in irc.bot.backend.message_sent
+    ]
+    assert len(lines) == 4
+    assert all(line.startswith('PRIVMSG testnick :[lichess] ')
+               for line in lines)
+    assert 'Responses: game 200=1 404=1' in lines[0]
+    assert 'game: http ' in lines[1]
+    assert 'game: lookup ' in lines[2]
+    assert 'game 1 (33% hits)' in lines[3]
+    assert 'game batches 2 (1.0 keys on average, 1 at most)' in lines[3]
+
+
+def test_leaderboard_commands(irc, user, requests_mock):
+    """Test the top and rank commands share one cached leaderboard."""
+    users = [
+        {
+            'id': 'player%d' % rank,
+            'username': 'Player%d' % rank,
+            'perfs': {'blitz': {'rating': 3100 - rank, 'progress': 0}},
+        }
+        for rank in range(1, 201)
+    ]
+    requests_mock.get(
+        'https://lichess.org/api/player/top/200/blitz',
+        json={'users': users},
+    )
+
+    irc.say(user, '#channel', '.lichess top blitz')
+    irc.say(user, '#channel', '.lichess top Blitz 2')
+    irc.say(user, '#channel', '.lichess rank PLAYER42 blitz')
+    irc.say(user, '#channel', '.lichess rank georges blitz')
+
+    assert requests_mock.call_count == 1
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :[lichess] %s | %s' % (
+            formatting.bold('Top 5 blitz'),
+            ', '.join(
+                '#%d Player%d (%d) +0' % (rank, rank, 3100 - rank)
+                for rank in range(1, 6)),
+        ),
+        'PRIVMSG #channel :[lichess] %s | '
+        '#1 Player1 (3099) +0, #2 Player2 (3098) +0'
+        % formatting.bold('Top 2 blitz'),
+        'PRIVMSG #channel :[lichess] %s | #42 Player42 (3058) +0'
+        % formatting.bold('blitz leaderboard'),
+        'PRIVMSG #channel :Exirel: georges is not in the top 200 blitz '
+        'players.',
+    )
+
+
+def test_leaderboard_commands_invalid(irc, user, requests_mock):
+    """Test the top and rank commands with invalid arguments."""
+    requests_mock.get(
+        'https://lichess.org/api/player/top/200/bullet', status_code=503)
+
+    irc.say(user, '#channel', '.lichess top nope')
+    irc.say(user, '#channel', '.lichess top blitz 11')
+    irc.say(user, '#channel', '.lichess rank georges')
+    irc.say(user, '#channel', '.lichess rank georges bullet')
+
+    lines = [
+        message.decode('utf-8')
+        for message in irc.bot.backend.message_sent
+    ]
+    assert len(lines) == 4
+    assert lines[0].startswith(
+        'PRIVMSG #channel :Exirel: Unknown perf type: nope (try ')
+    assert lines[1] == (
+        'PRIVMSG #channel :Exirel: '
+        'The number of players must be between 1 and 10.\r\n')
+    assert lines[2].startswith('PRIVMSG #channel :Exirel: Usage: ')
+    assert lines[3] == (
+        'PRIVMSG #channel :Exirel: '
+        'The bullet leaderboard is not available.\r\n')
+
+
+def test_profile_command(irc, user, userfactory, requests_mock):
+    """Test the owner can profile the plugin's handlers."""
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh',
+        json=MOCK_JSON_GAME,
+    )
+    owner = userfactory('testnick')
+    filename = os.path.join(
+        irc.bot.settings.core.homedir, 'lichess-profile.txt')
+
+    irc.say(user, '#channel', '.lichess profile 2')
+    assert plugin.PROFILE_KEY not in irc.bot.memory
+
+    irc.say(owner, '#channel', '.lichess profile 2 60s')
+    assert irc.bot.memory[plugin.PROFILE_KEY].seconds == 60
+    irc.say(owner, '#channel', '.lichess profile 2')
+    irc.bot.backend.clear_message_sent()
+
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh/white')
+
+    assert plugin.PROFILE_KEY not in irc.bot.memory
+    assert irc.bot.backend.message_sent[-1] == rawlist(
+        'PRIVMSG testnick :[lichess] Profiled 2 trigger(s): %s' % filename,
+    )[0]
+
+    with open(filename, encoding='utf-8') as fd:
+        text = fd.read()
+    assert 'lichess_game' in text
+
+
+def test_profile_command_stop(irc, userfactory):
+    """Test the owner can stop profiling."""
+    owner = userfactory('testnick')
+
+    irc.say(owner, '#channel', '.lichess profile stop')
+    irc.say(owner, '#channel', '.lichess profile 10s')
+    irc.say(owner, '#channel', '.lichess profile stop')
+    irc.say(owner, '#channel', '.lichess profile ten')
+
+    assert irc.bot.backend.message_sent == rawlist(
+        'PRIVMSG #channel :testnick: No profiling in progress.',
+        'PRIVMSG #channel :testnick: '
+        'Profiling the next 100 trigger(s), for 10 seconds at most.',
+        'PRIVMSG testnick :[lichess] Profiled 0 trigger(s): %s' % (
+            os.path.join(
+                irc.bot.settings.core.homedir, 'lichess-profile.txt')),
+        'PRIVMSG #channel :testnick: Invalid profiling limits: ten',
+    )
+
+
+def test_metrics_file(irc, user, requests_mock):
+    """Test the metrics file is written in the Prometheus text format."""
+    requests_mock.get(
+        'https://lichess.org/game/export/abcdefgh',
+        json=MOCK_JSON_GAME,
+    )
+    irc.say(user, '#channel', 'https://lichess.org/abcdefgh')
+
+    plugin.lichess_write_metrics(irc.bot)
+    filename = os.path.join(irc.bot.settings.core.homedir, 'metrics.prom')
+    assert not os.path.exists(filename), 'Disabled by default'
+
+    irc.bot.settings.lichess.metrics_file = 'metrics.prom'
+    plugin.lichess_write_metrics(irc.bot)
+
+    with open(filename, encoding='utf-8') as fd:
+        text = fd.read()
+
+    assert 'lichess_responses_total{endpoint="game",status="200"} 1' in text
+    assert 'lichess_handler_seconds_count{handler="game",phase="say"} 1' in (
+        text)
+    assert 'lichess_cache_entries{cache="game"} 1' in text
+    assert 'lichess_batch_size_bucket{batch="game",le="1"} 1' in text
+    assert 'lichess_batch_size_count{batch="game"} 1' in text
+
+
 def test_other_urls(irc, user):
     """Test handling of other URLs."""
     irc.say(
@@ -0,0 +1,121 @@
+"""Test ``sopel_lichess.metrics``."""
+from __future__ import generator_stop
+
+import os
+import stat
+
+import pytest
+
+from sopel_lichess.metrics import (Histogram, Metrics, format_sample,
+                                   make_labels, write_file)
+
+
+def test_histogram():
+    """Test counting values in buckets."""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(2.65)
+    assert histogram.cumulative() == [
+        (0.1, 2),
+        (1.0, 3),
+        (float('inf'), 4),
+    ]
+
+
+def test_histogram_observe_count():
+    """Test counting the same value several times at once."""
+    histogram = Histogram((1, 5))
+    histogram.observe(1, 3)
+    histogram.observe(4, 2)
+
+    assert histogram.count == 5
+    assert histogram.sum == 11
+    assert histogram.cumulative() == [(1, 3), (5, 5), (float('inf'), 5)]
+
+
+def test_histogram_quantile():
+    """Test estimating quantiles from buckets."""
+    histogram = Histogram((0.1, 1.0))
+    assert histogram.quantile(0.5) is None
+
+    for _ in range(8):
+        histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5.0)
+
+    assert histogram.quantile(0.5) == pytest.approx(0.0625)
+    assert histogram.quantile(0.9) == pytest.approx(1.0)
+    assert histogram.quantile(0.99) == 1.0, 'Capped to the last bound'
+
+
+def test_metrics_time():
+    """Test timing a block of code."""
+    ticks = iter([10.0, 10.25])
+    metrics = Metrics(clock=lambda: next(ticks))
+
+    with metrics.time('latency', phase='http'):
+        pass
+
+    [(count, [p50])] = metrics.quantiles('latency', (0.5,)).values()
+    assert count == 1
+    assert 0.1 < p50 <= 0.25
+
+
+def test_metrics_to_prometheus():
+    """Test formatting metrics in the Prometheus text format."""
+    metrics = Metrics(buckets=(0.5,))
+    metrics.increment('responses_total', endpoint='game', status=200)
+    metrics.increment('responses_total', endpoint='game', status=200)
+    metrics.increment('responses_total', endpoint='game', status=404)
+    metrics.observe('latency', 0.25, phase='http')
+
+    sizes = Histogram((1, 5))
+    sizes.observe(3, 2)
+
+    text = metrics.to_prometheus({
+        'entries': {make_labels(cache='game'): 12},
+    }, {
+        'batch_size': {make_labels(batch='game'): sizes},
+    })
+
+    assert text == '\n'.join([
+        '# TYPE responses_total counter',
+        'responses_total{endpoint="game",status="200"} 2',
+        'responses_total{endpoint="game",status="404"} 1',
+        '# TYPE batch_size histogram',
+        'batch_size_bucket{batch="game",le="1"} 0',
+        'batch_size_bucket{batch="game",le="5"} 2',
+        'batch_size_bucket{batch="game",le="+Inf"} 2',
+        'batch_size_sum{batch="game"} 6',
+        'batch_size_count{batch="game"} 2',
+        '# TYPE latency histogram',
+        'latency_bucket{phase="http",le="0.5"} 1',
+        'latency_bucket{phase="http",le="+Inf"} 1',
+        'latency_sum{phase="http"} 0.25',
+        'latency_count{phase="http"} 1',
+        '# TYPE entries gauge',
+        'entries{cache="game"} 12',
+    ]) + '\n'
+
+
+def test_format_sample():
+    """Test formatting one sample."""
+    assert format_sample('up', (), 1) == 'up 1'
+    assert format_sample('up', (('name', 'a"b\\c'),), 0.5) == (
+        'up{name="a\\"b\\\\c"} 0.5')
+
+
+def test_write_file(tmpdir):
+    """Test writing a file atomically."""
+    filename = os.path.join(tmpdir.strpath, 'metrics.prom')
+
+    write_file(filename, 'up 1\n')
+    write_file(filename, 'up 2\n')
+
+    with open(filename, encoding='utf-8') as fd:
+        assert fd.read() == 'up 2\n'
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o644
+    assert os.listdir(tmpdir.strpath) == ['metrics.prom']
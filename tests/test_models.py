@@ -0,0 +1,278 @@
+"""Test ``sopel_lichess.models``."""
+from __future__ import generator_stop
+
+import json
+import os
+
+import pytest
+
+from sopel_lichess.models import (Game, GamePlayer, Leader, Leaderboard,
+                                  Opening, Player, Puzzle, Standing,
+                                  Tournament)
+
+GAME = {
+    'id': 'abcdefgh',
+    'rated': True,
+    'variant': 'standard',
+    'speed': 'blitz',
+    'perf': 'blitz',
+    'createdAt': 1600000000000,
+    'status': 'resign',
+    'winner': 'black',
+    'players': {
+        'white': {
+            'user': {'name': 'Alice', 'title': 'IM', 'id': 'alice'},
+            'rating': 2400,
+            'ratingDiff': -7,
+        },
+        'black': {
+            'user': {'name': 'Bob', 'id': 'bob'},
+            'rating': 2450,
+            'ratingDiff': 6,
+            'provisional': True,
+        },
+    },
+    'opening': {'eco': 'B10', 'name': 'Caro-Kann Defense', 'ply': 4},
+    'moves': 'e4 c6 d4 d5',
+    'clock': {'initial': 180, 'increment': 2, 'totalTime': 260},
+}
+ARENA = {
+    'id': 'abcd1234',
+    'createdBy': 'lichess',
+    'system': 'arena',
+    'minutes': 57,
+    'clock': {'limit': 180, 'increment': 0},
+    'rated': True,
+    'fullName': 'Hourly Blitz Arena',
+    'nbPlayers': 312,
+    'variant': 'standard',
+    'startsAt': 1600000000000,
+    'isFinished': True,
+    'perf': {'key': 'blitz', 'name': 'Blitz'},
+    'standings': [
+        {'rank': 1, 'score': 52, 'rating': 2650, 'username': 'Alice',
+         'title': 'GM', 'performance': 2701},
+        {'rank': 2, 'score': 48, 'rating': 2480, 'username': 'Bob'},
+    ],
+}
+
+SWISS = {
+    'id': 'abcd1234',
+    'createdBy': 'lichess',
+    'name': 'Weekly Swiss',
+    'clock': {'limit': 30, 'increment': 0},
+    'variant': 'standard',
+    'round': 3,
+    'nbRounds': 7,
+    'nbPlayers': 88,
+    'status': 'started',
+    'rated': True,
+    'standings': [
+        {'rank': 1, 'points': 2.5, 'tieBreak': 4.75, 'rating': 1900,
+         'username': 'Carol'},
+    ],
+}
+
+
+@pytest.fixture
+def player_data():
+    filename = os.path.join(os.path.dirname(__file__), 'player.json')
+    with open(filename, encoding='utf-8') as fd:
+        return json.load(fd)
+
+
+def test_game_from_data():
+    """Test building a game from its export's payload."""
+    game = Game.from_data(GAME)
+
+    assert game.id == 'abcdefgh'
+    assert game.rated is True
+    assert game.speed == 'blitz'
+    assert game.variant == 'standard'
+    assert game.status == 'resign'
+    assert game.winner == 'black'
+    assert game.white == GamePlayer('Alice', 'IM', 2400, -7)
+    assert game.black == GamePlayer('Bob', None, 2450, 6)
+    assert game.opening == Opening('B10', 'Caro-Kann Defense')
+
+
+def test_game_from_data_no_info():
+    """Test building a game from an empty payload."""
+    game = Game.from_data({})
+
+    assert game == Game()
+    assert game.white == game.black == GamePlayer()
+    assert game.opening is None
+
+
+def test_game_from_stream_event():
+    """Test a games stream's event uses its status name."""
+    game = Game.from_data({'id': 'abcdefgh', 'status': 31,
+                           'statusName': 'resign'})
+    assert game.status == 'resign'
+
+
+def test_game_to_data():
+    """Test a game's payload only keeps what the model keeps."""
+    data = Game.from_data(GAME).to_data()
+
+    assert data == {
+        'id': 'abcdefgh',
+        'rated': True,
+        'speed': 'blitz',
+        'variant': 'standard',
+        'status': 'resign',
+        'winner': 'black',
+        'players': {
+            'white': {
+                'user': {'name': 'Alice', 'title': 'IM'},
+                'rating': 2400,
+                'ratingDiff': -7,
+            },
+            'black': {
+                'user': {'name': 'Bob'},
+                'rating': 2450,
+                'ratingDiff': 6,
+            },
+        },
+        'opening': {'eco': 'B10', 'name': 'Caro-Kann Defense'},
+    }
+    assert Game.from_data(data) == Game.from_data(GAME)
+
+
+def test_strings_interned():
+    """Test repeated strings are shared between games."""
+    # build distinct string objects, as if decoded from two payloads
+    first = Game.from_data(json.loads(json.dumps(GAME)))
+    second = Game.from_data(json.loads(json.dumps(GAME)))
+
+    assert first.speed is second.speed
+    assert first.variant is second.variant
+    assert first.status is second.status
+    assert first.white.title is second.white.title
+    assert first.opening.eco is second.opening.eco
+    assert first.opening.name is second.opening.name
+
+
+def test_slots():
+    """Test models don't have a ``__dict__``."""
+    game = Game.from_data(GAME)
+
+    for obj in (game, game.white, game.opening, Player()):
+        assert not hasattr(obj, '__dict__')
+
+    with pytest.raises(AttributeError):
+        game.moves = 'e4 c6'
+
+
+def test_player_from_data(player_data):
+    """Test building a player from its account's payload."""
+    player = Player.from_data(player_data)
+
+    assert player.id == player_data['id']
+    assert player.username == player_data['username']
+    assert player.games == player_data['count']['all']
+    assert player.rated_games == player_data['count']['rated']
+    assert player.wins == player_data['count']['win']
+    assert player.following == player_data['nbFollowing']
+    assert player.followers == player_data['nbFollowers']
+
+
+def test_player_from_data_no_info():
+    """Test building a player from an empty payload."""
+    assert Player.from_data({}) == Player()
+
+
+def test_repr():
+    """Test the representation of a model."""
+    assert repr(Opening('B10', 'Caro-Kann Defense')) == (
+        "Opening(eco='B10', name='Caro-Kann Defense')")
+
+
+def test_tournament_from_data():
+    """Test building an arena from its payload and results."""
+    tournament = Tournament.from_data(ARENA)
+
+    assert tournament == Tournament(
+        'abcd1234',
+        name='Hourly Blitz Arena',
+        clock_limit=180,
+        clock_increment=0,
+        variant='standard',
+        rated=True,
+        players=312,
+        status='finished',
+        standings=[
+            Standing(1, 'Alice', title='GM', rating=2650, score=52),
+            Standing(2, 'Bob', rating=2480, score=48),
+        ],
+    )
+    assert tournament.is_finished
+
+
+def test_tournament_from_data_arena_status():
+    """Test the status of an arena."""
+    assert Tournament.from_data({'isStarted': True}).status == 'started'
+    assert Tournament.from_data({}).status == 'created'
+    assert Tournament.from_data({'status': 30}).status == 'created'
+
+
+def test_tournament_from_data_swiss():
+    """Test building a Swiss tournament from its payload and results."""
+    tournament = Tournament.from_data(SWISS, kind='swiss')
+
+    assert tournament.kind == 'swiss'
+    assert tournament.name == 'Weekly Swiss'
+    assert tournament.status == 'started'
+    assert not tournament.is_finished
+    assert (tournament.round, tournament.rounds) == (3, 7)
+    assert tournament.standings == [
+        Standing(1, 'Carol', rating=1900, score=2.5)]
+
+
+def test_puzzle_from_data():
+    """Test building a puzzle from its payload, without its solution."""
+    puzzle = Puzzle.from_data({
+        'game': {'id': 'abcdefgh', 'perf': {'key': 'blitz'}, 'pgn': 'e4'},
+        'puzzle': {
+            'id': 'K69di',
+            'rating': 1989,
+            'plays': 12345,
+            'solution': ['e7e8q'],
+            'themes': ['endgame', 'short'],
+        },
+    })
+
+    assert puzzle == Puzzle(
+        'K69di',
+        rating=1989,
+        plays=12345,
+        themes=('endgame', 'short'),
+        game_id='abcdefgh',
+        perf='blitz',
+    )
+    assert Puzzle.from_data({}) == Puzzle()
+
+
+def test_leaderboard_from_data():
+    """Test building a leaderboard, indexed by rank and by username."""
+    leaderboard = Leaderboard.from_data([
+        {
+            'id': 'alice',
+            'username': 'Alice',
+            'title': 'GM',
+            'perfs': {'blitz': {'rating': 3000, 'progress': 12}},
+        },
+        {
+            'username': 'Bob',
+            'perfs': {'blitz': {'rating': 2900, 'progress': -5}},
+        },
+    ], 'blitz')
+
+    assert len(leaderboard) == 2
+    assert leaderboard.top(1) == [
+        Leader(1, 'alice', 'Alice', title='GM', rating=3000, progress=12)]
+    assert leaderboard.top(0) == []
+    assert leaderboard.get('BOB') == Leader(
+        2, 'bob', 'Bob', rating=2900, progress=-5)
+    assert leaderboard.get('carol') is None
@@ -0,0 +1,68 @@
+"""Test ``sopel_lichess.ndjson``."""
+from __future__ import generator_stop
+
+from unittest import mock
+
+from sopel_lichess import ndjson
+
+
+def test_iter_lines():
+    """Test lines are split across chunks."""
+    chunks = [b'{"a": 1}\n{"b"', b': 2}\n\n', b'{"c": 3}\r\n', b'{"d": 4}']
+    assert list(ndjson.iter_lines(chunks)) == [
+        b'{"a": 1}',
+        b'{"b": 2}',
+        b'{"c": 3}',
+        b'{"d": 4}',
+    ]
+
+
+def test_iter_lines_lazy():
+    """Test a complete line is yielded before the next chunk is read."""
+    def chunks():
+        yield b'{"a": 1}\n'
+        raise AssertionError('Next chunk must not be read')
+
+    lines = ndjson.iter_lines(chunks())
+    assert next(lines) == b'{"a": 1}'
+
+
+def test_iter_lines_empty():
+    """Test empty streams yield nothing."""
+    assert not list(ndjson.iter_lines([]))
+    assert not list(ndjson.iter_lines([b'', b'\n', b'  \n']))
+
+
+def test_iter_objects():
+    """Test lines are decoded as JSON objects."""
+    chunks = [b'{"a": 1}\n', b'{"b": "\xc3\xa9"}\n']
+    assert list(ndjson.iter_objects(chunks)) == [{'a': 1}, {'b': 'é'}]
+
+
+def test_read_objects():
+    """Test reading objects from a response."""
+    response = mock.Mock()
+    response.iter_content.return_value = iter([b'{"a": 1}\n{"b": 2}\n'])
+
+    assert list(ndjson.read_objects(response)) == [{'a': 1}, {'b': 2}]
+    response.iter_content.assert_called_once_with(chunk_size=None)
+    response.close.assert_called_once_with()
+
+
+def test_read_objects_limit():
+    """Test the response is closed once the limit is reached."""
+    def chunks():
+        yield b'{"a": 1}\n{"b": 2}\n'
+        raise AssertionError('Next chunk must not be read')
+
+    response = mock.Mock()
+    response.iter_content.return_value = chunks()
+
+    objects = ndjson.read_objects(response, limit=2)
+    assert list(objects) == [{'a': 1}, {'b': 2}]
+    response.close.assert_called_once_with()
+
+    response = mock.Mock()
+    assert not list(ndjson.read_objects(response, limit=0))
+    response.close.assert_called_once_with()
+    assert not response.iter_content.called
@@ -0,0 +1,154 @@
+"""Test ``sopel_lichess.output``."""
+from __future__ import generator_stop
+
+import threading
+
+from sopel_lichess.output import OutputCoalescer, pack_lines
+
+
+class FakeClock:
+    """Clock moved forward by the tests."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_pack_lines():
+    """Test results are packed into as few lines as possible."""
+    outputs = [('a' * 10, ''), ('b' * 10, ''), ('c' * 10, ' | url')]
+
+    assert pack_lines(outputs, 100) == [
+        ('a' * 10 + ' | ' + 'b' * 10 + ' | ' + 'c' * 10 + ' | url', ''),
+    ]
+    assert pack_lines(outputs, 23) == [
+        ('a' * 10 + ' | ' + 'b' * 10, ''),
+        ('c' * 10 + ' | url', ''),
+    ]
+    assert pack_lines(outputs, 10) == [
+        ('a' * 10, ''),
+        ('b' * 10, ''),
+        ('c' * 10, ' | url'),
+    ], 'A result too long is left alone with its trailing part'
+    assert pack_lines([], 100) == []
+
+
+def test_pack_lines_bytes():
+    """Test the length of a line is counted in bytes."""
+    outputs = [('\N{TROPHY}', ''), ('\N{TROPHY}', '')]
+
+    assert pack_lines(outputs, 11) == [('\N{TROPHY} | \N{TROPHY}', '')]
+    assert pack_lines(outputs, 10) == [
+        ('\N{TROPHY}', ''), ('\N{TROPHY}', '')]
+
+
+def test_group():
+    """Test a group says its results once they are all added."""
+    said = []
+    coalescer = OutputCoalescer(window=60, cooldown=0)
+    group = coalescer.open(
+        '#channel',
+        lambda text, trailing: said.append((text, trailing)),
+        expected=3,
+        max_length=100,
+    )
+
+    group.add(('first', ''))
+    group.add(None)
+    assert not said
+
+    group.add(('second', ' | url'))
+    assert said == [('first | second | url', '')]
+    assert coalescer.stats() == {'results': 2, 'lines': 1, 'dropped': 0}
+
+
+def test_group_window():
+    """Test a group says its results once its window elapses."""
+    said = threading.Event()
+    lines = []
+
+    def send(text, trailing):
+        lines.append(text)
+        said.set()
+
+    coalescer = OutputCoalescer(window=0.01, cooldown=0)
+    group = coalescer.open('#channel', send, expected=2, max_length=100)
+    group.add(('first', ''))
+
+    assert said.wait(5)
+    assert lines == ['first']
+
+    group.add(('second', ''))
+    assert lines == ['first', 'second']
+
+
+def test_group_no_window():
+    """Test results are said right away without a window."""
+    lines = []
+    coalescer = OutputCoalescer(window=0, cooldown=0)
+    group = coalescer.open(
+        '#channel',
+        lambda text, trailing: lines.append(text),
+        expected=2,
+        max_length=100,
+    )
+
+    group.add(('first', ''))
+    assert lines == ['first']
+    group.add(('second', ''))
+    assert lines == ['first', 'second']
+
+
+def test_group_flush():
+    """Test flushing a group says what was added so far."""
+    lines = []
+    coalescer = OutputCoalescer(window=60, cooldown=0)
+    group = coalescer.open(
+        '#channel',
+        lambda text, trailing: lines.append(text),
+        expected=3,
+        max_length=100,
+    )
+
+    group.flush()
+    assert not lines
+
+    group.add(('first', ''))
+    group.add(('first', ''))
+    group.flush()
+    assert lines == ['first'], 'The same result is said once'
+
+
+def test_cooldown():
+    """Test the same result is dropped within the cooldown."""
+    clock = FakeClock()
+    coalescer = OutputCoalescer(window=0, cooldown=30, clock=clock)
+
+    assert coalescer.check('#channel', ('result', ''))
+    assert not coalescer.check('#Channel', ('result', ''))
+    assert coalescer.check('#other', ('result', ''))
+    assert coalescer.check('#channel', ('other', ''))
+
+    clock.now = 30
+    assert coalescer.check('#channel', ('result', ''))
+    assert coalescer.stats()['dropped'] == 1
+
+
+def test_cooldown_disabled():
+    """Test nothing is dropped without a cooldown."""
+    coalescer = OutputCoalescer(window=0, cooldown=0)
+
+    assert coalescer.check('#channel', ('result', ''))
+    assert coalescer.check('#channel', ('result', ''))
+
+
+def test_cooldown_max_recent():
+    """Test the number of recent results is bounded."""
+    coalescer = OutputCoalescer(window=0, cooldown=30, max_recent=2)
+
+    assert coalescer.check('#channel', ('first', ''))
+    assert coalescer.check('#channel', ('second', ''))
+    assert coalescer.check('#channel', ('third', ''))
+    assert coalescer.check('#channel', ('first', '')), 'Forgotten'
+    assert not coalescer.check('#channel', ('third', ''))
@@ -1,11 +1,20 @@
 """Test ``sopel_lichess.parsers``."""
 from __future__ import generator_stop
 
+import pytest
 from sopel import formatting
 
-from sopel_lichess.parsers import (BLACK, WHITE, WINNER, format_game_player,
-                                   format_player, parse_game_data,
-                                   parse_game_type)
+from sopel_lichess import parsers
+from sopel_lichess.models import (Game, Leader, Leaderboard, Player, Puzzle,
+                                  Standing, Tournament)
+from sopel_lichess.parsers import (BLACK, WHITE, WINNER, format_clock,
+                                   format_game_player, format_leader,
+                                   format_pgn_game, format_player,
+                                   format_standing, is_game_over,
+                                   parse_game_data, parse_game_type,
+                                   parse_leader_data, parse_leaderboard_data,
+                                   parse_pgn_headers, parse_puzzle_data,
+                                   parse_tournament_data)
 
 MOCK_PLAYER_IM = {
     'rating': 2790,
@@ -103,6 +112,19 @@ MOCK_PLAYER_ACCOUNT = {
 }
 
 
+def test_is_game_over():
+    """Test telling if a game is over from its status."""
+    assert is_game_over(MOCK_JSON_GAME)
+    assert is_game_over({'status': 'draw'})
+    assert not is_game_over({'status': 'started'})
+    assert not is_game_over({'status': 'created'})
+    assert not is_game_over({})
+
+    # games stream
+    assert is_game_over({'status': 31, 'statusName': 'resign'})
+    assert not is_game_over({'status': 20, 'statusName': 'started'})
+
+
 def test_parse_game_type():
     """Test parsing of game type."""
     data = {
@@ -314,3 +336,249 @@ def test_format_player_no_info():
         '%s 0' % WINNER,
         'Following 0/0',
     ])
+
+
+def test_models():
+    """Test formatters accept models as well as dicts."""
+    game = Game.from_data(MOCK_JSON_GAME)
+    player = Player.from_data(MOCK_PLAYER_ACCOUNT)
+
+    assert parse_game_data(game) == parse_game_data(MOCK_JSON_GAME)
+    assert parse_game_data(game, for_player='black') == parse_game_data(
+        MOCK_JSON_GAME, for_player='black')
+    assert parse_game_type(game) == parse_game_type(MOCK_JSON_GAME)
+    assert format_game_player(game.white) == format_game_player(MOCK_PLAYER)
+    assert format_player(player) == format_player(MOCK_PLAYER_ACCOUNT)
+    assert is_game_over(game)
+    assert not is_game_over(Game(status='started'))
+    assert not is_game_over(Game())
+
+
+def test_needs_export():
+    """Test formatters declare the export flags they need."""
+    assert parsers.GAME_FORMATTERS_NEEDS['parse_game_data'] == {'opening'}
+
+    params = parsers.get_export_params()
+    assert set(params) == set(parsers.EXPORT_FLAGS)
+    assert params['opening'] == 'true'
+    assert params['moves'] == 'false'
+    assert params['pgnInJson'] == 'false'
+
+    assert parsers.get_export_params(('moves', 'opening')) == {
+        'moves': 'false',
+        'opening': 'true',
+    }
+
+
+def test_needs_export_more(monkeypatch):
+    """Test a formatter needing more flags changes the export params."""
+    monkeypatch.setattr(parsers, 'GAME_FORMATTERS_NEEDS', {})
+
+    @parsers.needs_export('moves', 'clocks')
+    def format_game_moves(data):
+        return data['moves']
+
+    assert format_game_moves({'moves': 'e4'}) == 'e4'
+    params = parsers.get_export_params()
+    assert params['moves'] == params['clocks'] == 'true'
+    assert params['opening'] == 'false'
+
+
+def test_needs_export_unknown():
+    """Test an unknown export flag is an error."""
+    with pytest.raises(ValueError):
+        parsers.needs_export('moves', 'unknown')
+
+
+def test_format_clock():
+    """Test formatting a time control."""
+    assert format_clock(180, 2) == '3+2'
+    assert format_clock(90, 0) == '1.5+0'
+    assert format_clock(30, 0) == '\N{VULGAR FRACTION ONE HALF}+0'
+    assert format_clock(15, None) == '\N{VULGAR FRACTION ONE QUARTER}+0'
+    assert format_clock(None, None) == '?'
+
+
+def test_format_standing():
+    """Test formatting a tournament's standing."""
+    result = format_standing({
+        'rank': 1,
+        'username': 'Alice',
+        'title': 'GM',
+        'rating': 2650,
+        'score': 52,
+    })
+    assert result == '#1 %s %s Alice (2650) 52' % (
+        WINNER, formatting.bold('GM'))
+
+    result = format_standing(Standing(3, 'Carol', rating=1900, score=2.5))
+    assert result == '#3 Carol (1900) 2.5'
+    assert format_standing({}) == '#0 unknown (???) 0'
+
+
+def test_parse_tournament_data():
+    """Test formatting an arena with its standings."""
+    tournament = Tournament(
+        'abcd1234',
+        name='Hourly Blitz Arena',
+        clock_limit=180,
+        clock_increment=0,
+        variant='standard',
+        rated=True,
+        players=312,
+        status='finished',
+        standings=[
+            Standing(1, 'Alice', rating=2650, score=52),
+            Standing(2, 'Bob', rating=2480, score=48),
+        ],
+    )
+
+    assert parse_tournament_data(tournament) == [
+        formatting.bold('Hourly Blitz Arena'),
+        'rated 3+0 (standard)',
+        'finished, 312 players',
+        '#1 %s Alice (2650) 52, #2 Bob (2480) 48' % WINNER,
+    ]
+
+
+def test_parse_tournament_data_swiss():
+    """Test formatting a Swiss tournament, by round."""
+    tournament = Tournament(
+        'abcd1234',
+        kind='swiss',
+        name='Weekly Swiss',
+        clock_limit=600,
+        clock_increment=5,
+        players=88,
+        status='started',
+        round=3,
+        rounds=7,
+    )
+
+    assert parse_tournament_data(tournament) == [
+        formatting.bold('Weekly Swiss'),
+        'unrated 10+5 (standard)',
+        'round 3/7, 88 players',
+    ]
+
+    tournament.status = 'finished'
+    assert parse_tournament_data(tournament)[2] == (
+        'finished after 7 rounds, 88 players')
+
+
+def test_parse_tournament_data_no_info():
+    """Test formatting a tournament without any data."""
+    assert parse_tournament_data(Tournament()) == [
+        formatting.bold('Unknown tournament'),
+        'unrated ? (standard)',
+        'created, 0 players',
+    ]
+
+
+def test_format_pgn_game():
+    """Test formatting a game's PGN header."""
+    assert format_pgn_game({
+        'White': 'Alice', 'Black': 'Bob', 'Result': '1-0', 'ECO': 'B90',
+    }) == 'Alice vs Bob 1-0 (B90)'
+    assert format_pgn_game({
+        'White': 'Alice', 'Black': '?', 'Result': '*', 'ECO': '?',
+    }) == 'Alice vs ?'
+    assert format_pgn_game({'Event': 'Chapter 1', 'Result': '*'}) == (
+        'Chapter 1')
+    assert format_pgn_game(
+        {'Event': 'Study: Chapter 1', 'Result': '1/2-1/2'},
+        'Chapter 1',
+    ) == 'Chapter 1 1/2-1/2'
+    assert format_pgn_game({}) == '?'
+
+
+def test_parse_pgn_headers():
+    """Test formatting a study's chapters under the study's name."""
+    headers = [
+        {'Event': 'Openings: Sicilian', 'ECO': 'B90'},
+        {'Event': 'Openings: French', 'White': 'Alice', 'Black': 'Bob'},
+    ]
+
+    assert parse_pgn_headers(headers) == [
+        formatting.bold('Openings'),
+        'Sicilian (B90), Alice vs Bob',
+    ]
+    assert parse_pgn_headers(headers[:1]) == [
+        formatting.bold('Openings'),
+        'Sicilian (B90)',
+    ]
+    assert parse_pgn_headers([{'Event': 'Openings: Sicilian'}, {}]) == [
+        formatting.bold('Openings: Sicilian'),
+        'Openings: Sicilian, ?',
+    ]
+    assert parse_pgn_headers([]) == []
+
+
+def test_parse_pgn_headers_broadcast():
+    """Test formatting a broadcast's games under the event's name."""
+    headers = [
+        {'Event': 'Tata Steel', 'White': 'Alice', 'Black': 'Bob',
+         'Result': '0-1'},
+        {'Event': 'Tata Steel', 'White': 'Carol', 'Black': 'Dave',
+         'Result': '*'},
+    ]
+
+    assert parse_pgn_headers(headers) == [
+        formatting.bold('Tata Steel'),
+        'Alice vs Bob 0-1, Carol vs Dave',
+    ]
+    assert parse_pgn_headers([{}]) == [
+        formatting.bold('Unknown event'), '?']
+
+
+def test_parse_puzzle_data():
+    """Test formatting a puzzle."""
+    puzzle = Puzzle(
+        'K69di',
+        rating=1989,
+        plays=12345,
+        themes=('endgame', 'short'),
+        game_id='abcdefgh',
+        perf='blitz',
+    )
+
+    assert parse_puzzle_data(puzzle, title='Daily puzzle') == [
+        formatting.bold('Daily puzzle'),
+        'rating 1989, 12345 plays',
+        'from a blitz game',
+        'endgame, short',
+    ]
+    assert parse_puzzle_data(Puzzle('K69di')) == [
+        formatting.bold('Puzzle'),
+        '0 plays',
+    ]
+
+
+def test_format_leader():
+    """Test formatting a leader like a game's player, with its rank."""
+    leader = Leader(1, 'alice', 'Alice', title='GM', rating=3000, progress=12)
+
+    assert format_leader(leader) == '#1 %s Alice (3000) %s' % (
+        formatting.bold('GM'),
+        formatting.color('+12', formatting.colors.GREEN),
+    )
+    assert format_leader(Leader(2, 'bob', 'Bob')) == '#2 Bob (???) +0'
+
+
+def test_parse_leaderboard_data():
+    """Test formatting the top players of a leaderboard."""
+    leaderboard = Leaderboard('blitz', [
+        Leader(rank, 'p%d' % rank, 'P%d' % rank, rating=3000 - rank)
+        for rank in range(1, 4)
+    ])
+
+    assert parse_leaderboard_data(leaderboard, 2) == [
+        formatting.bold('Top 2 blitz'),
+        '#1 P1 (2999) +0, #2 P2 (2998) +0',
+    ]
+    assert parse_leaderboard_data(leaderboard, 10)[0] == formatting.bold(
+        'Top 3 blitz')
+    assert parse_leaderboard_data(Leaderboard('blitz'), 5) == [
+        formatting.bold('Top 0 blitz'), 'nobody']
+    assert parse_leader_data(leaderboard.leaders[1], 'blitz') == [
+        formatting.bold('blitz leaderboard'), '#2 P2 (2998) +0']
@@ -0,0 +1,139 @@
+"""Test ``sopel_lichess.pgn``."""
+from __future__ import generator_stop
+
+from unittest import mock
+
+from sopel_lichess import pgn
+
+STUDY_PGN = b'''[Event "Openings: Sicilian"]
+[Site "https://lichess.org/study/abcdefgh/chapter1"]
+[White "Carlsen, Magnus"]
+[Black "Nakamura, \\"Hikaru\\""]
+[Result "1-0"]
+[ECO "B90"]
+
+1. e4 c5 2. Nf3 { A long comment. } 1-0
+
+
+[Event "Openings: French"]
+[Result "*"]
+
+1. e4 e6 *
+'''
+
+
+def test_parse_tag():
+    """Test parsing a tag pair's line."""
+    assert pgn.parse_tag(b'[White "Carlsen, Magnus"]') == (
+        'White', 'Carlsen, Magnus')
+    assert pgn.parse_tag(b'[Black "A \\"B\\" \\\\ C"]') == (
+        'Black', 'A "B" \\ C')
+    assert pgn.parse_tag(b'[Event "\xc3\xa9t\xc3\xa9"]') == ('Event', 'été')
+    assert pgn.parse_tag(b'[Event]') is None
+    assert pgn.parse_tag(b'1. e4 e5') is None
+
+
+def test_iter_headers():
+    """Test reading the headers of each game."""
+    assert list(pgn.iter_headers([STUDY_PGN])) == [
+        {
+            'Event': 'Openings: Sicilian',
+            'White': 'Carlsen, Magnus',
+            'Black': 'Nakamura, "Hikaru"',
+            'Result': '1-0',
+            'ECO': 'B90',
+        },
+        {'Event': 'Openings: French', 'Result': '*'},
+    ]
+
+
+def test_iter_headers_chunks():
+    """Test lines are split across chunks of any size."""
+    expected = list(pgn.iter_headers([STUDY_PGN]))
+    for size in (1, 2, 3, 7, 64):
+        chunks = [
+            STUDY_PGN[start:start + size]
+            for start in range(0, len(STUDY_PGN), size)
+        ]
+        assert list(pgn.iter_headers(chunks)) == expected, size
+
+
+def test_iter_headers_tags():
+    """Test only the requested tags are kept."""
+    assert list(pgn.iter_headers([STUDY_PGN], tags=('Result',))) == [
+        {'Result': '1-0'}, {'Result': '*'}]
+
+
+def test_iter_headers_crlf():
+    """Test Windows line endings and a document without movetext."""
+    chunks = [b'[Event "A"]\r\n[Result "1/2-1/2"]\r', b'\n']
+    assert list(pgn.iter_headers(chunks)) == [
+        {'Event': 'A', 'Result': '1/2-1/2'}]
+
+
+def test_iter_headers_empty():
+    """Test empty documents have no header."""
+    assert not list(pgn.iter_headers([]))
+    assert not list(pgn.iter_headers([b'', b'\n\n', b'  \n']))
+
+
+def test_parser_movetext_not_buffered():
+    """Test the movetext is skipped without being buffered."""
+    parser = pgn.HeaderParser()
+    assert parser.feed(b'[Event "A"]\n\n1. e4 ') == [{'Event': 'A'}]
+    for _ in range(1000):
+        assert parser.feed(b'e5 2. Nf3 Nc6 { comment } ' * 10) == []
+        assert not parser._line
+
+    assert parser.feed(b'*\n\n[Event "B"]\n') == []
+    assert parser.flush() == [{'Event': 'B'}]
+
+
+def test_parser_long_tag():
+    """Test a tag pair longer than the maximum is skipped."""
+    parser = pgn.HeaderParser()
+    value = b'a' * pgn.MAX_TAG_LENGTH
+    parser.feed(b'[Event "A"]\n[White "' + value)
+    assert len(parser._line) <= pgn.MAX_TAG_LENGTH
+
+    assert parser.feed(value + b'"]\n[Black "B"]\n\n') == [
+        {'Event': 'A', 'Black': 'B'}]
+
+
+def test_parser_headers_by_chunk():
+    """Test a header is returned by the chunk completing it."""
+    parser = pgn.HeaderParser()
+    assert parser.feed(b'[Event "A"]\n[Result "*"]\n') == []
+    assert parser.feed(b'\n') == [{'Event': 'A', 'Result': '*'}]
+    assert parser.feed(b'*\n\n') == []
+    assert parser.flush() == []
+
+
+def test_read_headers():
+    """Test reading the headers of a response."""
+    response = mock.Mock()
+    response.iter_content.return_value = iter([STUDY_PGN])
+
+    assert [header['Event'] for header in pgn.read_headers(response)] == [
+        'Openings: Sicilian', 'Openings: French']
+    response.iter_content.assert_called_once_with(chunk_size=None)
+    response.close.assert_called_once_with()
+
+
+def test_read_headers_limit():
+    """Test the response is closed once the limit is reached."""
+    def chunks():
+        yield b'[Event "A"]\n\n1. e4 *\n\n[Event "B"]\n\n'
+        raise AssertionError('Next chunk must not be read')
+
+    response = mock.Mock()
+    response.iter_content.return_value = chunks()
+
+    headers = pgn.read_headers(response, limit=2)
+    assert list(headers) == [{'Event': 'A'}, {'Event': 'B'}]
+    response.close.assert_called_once_with()
+
+    response = mock.Mock()
+    assert not list(pgn.read_headers(response, limit=0))
+    response.close.assert_called_once_with()
+    assert not response.iter_content.called
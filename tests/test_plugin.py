@@ -1,9 +1,12 @@
 """Test ``sopel_lichess.plugin``."""
 from __future__ import generator_stop
 
+import os
+
 import pytest
 
 from sopel_lichess import plugin
+from sopel_lichess.client import LichessClient
 
 BASE_CONFIG = """
 [core]
@@ -32,8 +35,68 @@ def test_setup(mockbot):
     plugin.setup(mockbot)
     assert hasattr(mockbot.settings, 'lichess')
     assert mockbot.settings.lichess.api_token == 'TEST_TOKEN_VALUE'
-    assert plugin.MEMORY_KEY in mockbot.memory
-    assert mockbot.memory[plugin.MEMORY_KEY] is not None
+    assert plugin.MEMORY_KEY not in mockbot.memory, (
+        'The client must be created on first use.')
+
+    client = plugin.get_client(mockbot)
+    assert isinstance(client, LichessClient)
+    assert client.max_connections == 4
+    assert client.timeout == 10.0
+    assert mockbot.memory[plugin.MEMORY_KEY] is client
+    assert plugin.get_client(mockbot) is client
+    assert plugin.get_backend(mockbot) is None
+
+
+def test_setup_client_settings(configfactory, botfactory):
+    """Test plugin's setup hook with custom client's settings."""
+    test_settings = configfactory('test.cfg', TMP_CONFIG + """
+max_connections = 8
+timeout = 2.5
+""")
+    test_bot = botfactory(test_settings)
+
+    plugin.setup(test_bot)
+    client = plugin.get_client(test_bot)
+    assert client.max_connections == 8
+    assert client.timeout == 2.5
+
+
+def test_setup_game_store(mockbot, configfactory, botfactory):
+    """Test plugin's setup hook creates the game store in homedir."""
+    plugin.setup(mockbot)
+    store = mockbot.memory[plugin.GAME_STORE_KEY]
+    assert store.filename == os.path.join(
+        mockbot.settings.core.homedir, 'lichess-games.db')
+    assert store.max_size == 64 * 1024 * 1024
+    plugin.shutdown(mockbot)
+    assert plugin.GAME_STORE_KEY not in mockbot.memory
+
+    test_settings = configfactory('test.cfg', TMP_CONFIG + """
+game_store_size = 0
+""")
+    test_bot = botfactory(test_settings)
+    plugin.setup(test_bot)
+    assert plugin.GAME_STORE_KEY not in test_bot.memory
+
+
+def test_setup_follow_games(mockbot, configfactory, botfactory):
+    """Test plugin's setup hook with followed games."""
+    plugin.setup(mockbot)
+    assert plugin.get_follower(mockbot) is None
+
+    test_settings = configfactory('test.cfg', TMP_CONFIG + """
+follow_games = yes
+follow_max_per_channel = 3
+""")
+    test_bot = botfactory(test_settings)
+
+    plugin.setup(test_bot)
+    follower = plugin.get_follower(test_bot)
+    assert follower.max_per_channel == 3
+
+    plugin.shutdown(test_bot)
+    assert plugin.FOLLOW_KEY not in test_bot.memory
+    assert not follower.follow('abcdefgh', '#channel'), 'Must be closed'
 
 
 def test_setup_no_token(configfactory, botfactory):
@@ -0,0 +1,117 @@
+"""Test ``sopel_lichess.profiling``."""
+from __future__ import generator_stop
+
+import os
+import threading
+
+from sopel_lichess.profiling import ProfileSession, profiled
+
+
+def fibonacci(n):
+    return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+
+def test_session_triggers(tmpdir):
+    """Test a session stops after a number of triggers."""
+    filename = os.path.join(tmpdir.strpath, 'profile.txt')
+    finished = []
+    session = ProfileSession(
+        filename, triggers=2, seconds=60, on_finish=finished.append)
+
+    assert session.run(fibonacci, 10) == 55
+    assert not session.finished
+    assert session.run(fibonacci, 5) == 5
+    assert session.finished
+    assert finished == [session]
+
+    # once finished, calls are not profiled anymore
+    assert session.run(fibonacci, 3) == 2
+    assert session.profiled == 2
+    assert finished == [session]
+
+    with open(filename, encoding='utf-8') as fd:
+        text = fd.read()
+
+    assert text.startswith('Profiled 2 trigger(s)')
+    assert 'fibonacci' in text
+    assert 'cumulative' in text
+
+
+def test_session_seconds(tmpdir):
+    """Test a session stops after a time."""
+    filename = os.path.join(tmpdir.strpath, 'profile.txt')
+    now = [0.0]
+    session = ProfileSession(
+        filename, triggers=100, seconds=10, clock=lambda: now[0])
+
+    session.run(fibonacci, 5)
+    assert not session.expired
+
+    now[0] = 10.0
+    assert session.expired
+    session.run(fibonacci, 5)
+
+    assert session.finished
+    assert session.profiled == 1
+    assert os.path.exists(filename)
+
+
+def test_session_concurrent(tmpdir):
+    """Test a trigger handled while another is profiled isn't profiled."""
+    filename = os.path.join(tmpdir.strpath, 'profile.txt')
+    session = ProfileSession(filename, triggers=10, seconds=60)
+    started = threading.Event()
+    release = threading.Event()
+
+    def wait():
+        started.set()
+        release.wait(5)
+        return 'done'
+
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(session.run(wait)))
+    thread.start()
+    assert started.wait(5)
+
+    # must not raise, even when only one profiler can be active
+    assert session.run(fibonacci, 10) == 55
+    assert session.profiled == 1
+
+    release.set()
+    thread.join(5)
+    assert results == ['done']
+
+    assert session.run(fibonacci, 5) == 5
+    assert session.profiled == 2
+
+
+def test_session_nothing_profiled(tmpdir):
+    """Test finishing a session without any trigger."""
+    filename = os.path.join(tmpdir.strpath, 'profile.txt')
+    session = ProfileSession(filename, triggers=1, seconds=10)
+
+    session.finish()
+    session.finish()
+
+    with open(filename, encoding='utf-8') as fd:
+        assert 'Nothing profiled.' in fd.read()
+
+
+def test_profiled(tmpdir):
+    """Test a handler is profiled only while a session is running."""
+    sessions = {}
+
+    @profiled(sessions.get)
+    def handler(bot, trigger):
+        """Handle a trigger."""
+        return fibonacci(trigger)
+
+    assert handler.__name__ == 'handler'
+    assert handler.__doc__ == 'Handle a trigger.'
+    assert handler('bot', 5) == 5
+
+    session = sessions['bot'] = ProfileSession(
+        os.path.join(tmpdir.strpath, 'profile.txt'), triggers=1, seconds=10)
+    assert handler('bot', 5) == 5
+    assert session.finished
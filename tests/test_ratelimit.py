@@ -0,0 +1,135 @@
+"""Test ``sopel_lichess.ratelimit``."""
+from __future__ import generator_stop
+
+import pytest
+
+from sopel_lichess.ratelimit import (DEFAULT_BACKOFF, Priority, RateLimiter,
+                                     RequestShed, TokenBucket,
+                                     parse_retry_after)
+
+
+class FakeClock:
+    """Controllable clock, also used as a fake sleep."""
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket():
+    """Test tokens are taken and refilled."""
+    clock = FakeClock()
+    bucket = TokenBucket(2, 3, clock=clock)
+
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    assert bucket.take() == 0.5, 'Bucket is empty'
+
+    clock.now += 0.5
+    assert bucket.take() == 0
+
+    clock.now += 60
+    assert bucket.tokens == 3, 'Bucket is never more than full'
+
+
+def test_token_bucket_reserve():
+    """Test tokens can be kept in reserve."""
+    clock = FakeClock()
+    bucket = TokenBucket(1, 4, clock=clock)
+
+    assert bucket.take(reserve=2) == 0
+    assert bucket.take(reserve=2) == 0
+    assert bucket.take(reserve=2) == 1
+    assert bucket.take() == 0
+
+
+def test_rate_limiter_invalid():
+    """Test rate limiter's arguments are validated."""
+    with pytest.raises(ValueError):
+        RateLimiter(0, 10, max_wait=1)
+
+    with pytest.raises(ValueError):
+        RateLimiter(1, 0, max_wait=1)
+
+
+def test_rate_limiter_wait():
+    """Test normal requests wait for a token."""
+    clock = FakeClock()
+    limiter = RateLimiter(
+        2, 1, max_wait=5, clock=clock, sleep=clock.sleep)
+
+    limiter.acquire('user')
+    limiter.acquire('game')
+    assert not clock.sleeps, 'Each endpoint class has its own bucket'
+
+    limiter.acquire('user')
+    assert clock.sleeps == [0.5]
+    assert limiter.stats()['waits'] == {'user': 1}
+
+
+def test_rate_limiter_shed_normal():
+    """Test normal requests are shed when they would wait too long."""
+    clock = FakeClock()
+    limiter = RateLimiter(
+        0.1, 1, max_wait=5, clock=clock, sleep=clock.sleep)
+
+    limiter.acquire('user')
+    with pytest.raises(RequestShed) as error:
+        limiter.acquire('user')
+
+    assert error.value.endpoint == 'user'
+    assert error.value.priority == Priority.NORMAL
+    assert limiter.stats()['shed'] == {'user': 1}
+    assert not clock.sleeps
+
+
+def test_rate_limiter_shed_low():
+    """Test low priority requests never wait nor drain the bucket."""
+    clock = FakeClock()
+    limiter = RateLimiter(
+        1, 4, max_wait=5, clock=clock, sleep=clock.sleep)
+
+    limiter.acquire('tv', Priority.LOW)
+    limiter.acquire('tv', Priority.LOW)
+    with pytest.raises(RequestShed):
+        limiter.acquire('tv', Priority.LOW)
+
+    limiter.acquire('tv')
+    limiter.acquire('tv')
+    assert not clock.sleeps
+    assert limiter.stats()['shed'] == {'tv': 1}
+
+
+def test_rate_limiter_backoff():
+    """Test every request backs off after a rate limited response."""
+    clock = FakeClock()
+    limiter = RateLimiter(
+        10, 10, max_wait=5, clock=clock, sleep=clock.sleep)
+
+    limiter.backoff(3)
+    limiter.acquire('user')
+    assert clock.sleeps == [3]
+
+    limiter.backoff()
+    assert limiter.stats()['backoff_remaining'] == DEFAULT_BACKOFF
+    with pytest.raises(RequestShed):
+        limiter.acquire('game')
+
+    assert limiter.stats()['backoffs'] == 2
+
+
+def test_parse_retry_after():
+    """Test parsing of the Retry-After header."""
+    assert parse_retry_after('60') == 60
+    assert parse_retry_after('1.5') == 1.5
+    assert parse_retry_after('-1') == 0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') is None
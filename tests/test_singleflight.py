@@ -0,0 +1,87 @@
+"""Test ``sopel_lichess.singleflight``."""
+from __future__ import generator_stop
+
+from concurrent.futures import Future
+
+import pytest
+
+from sopel_lichess.singleflight import SingleFlight
+
+
+def test_do_collapse():
+    """Test concurrent lookups of the same key share one lookup."""
+    flights = SingleFlight()
+    started = []
+
+    def start():
+        future = Future()
+        started.append(future)
+        return future
+
+    first = flights.do(('game', 'abcdefgh'), start)
+    second = flights.do(('game', 'abcdefgh'), start)
+    other = flights.do(('user', 'abcdefgh'), start)
+
+    assert first is second
+    assert other is not first
+    assert len(started) == 2
+    assert len(flights) == 2
+    assert flights.stats() == {'in_flight': 2, 'collapsed': 1}
+
+    started[0].set_result({'id': 'abcdefgh'})
+    assert first.result() == {'id': 'abcdefgh'}
+    assert len(flights) == 1
+
+    # once landed, a new lookup is started
+    third = flights.do(('game', 'abcdefgh'), start)
+    assert third is not first
+    assert len(started) == 3
+
+
+def test_do_error():
+    """Test a failed lookup fails every caller, then is forgotten."""
+    flights = SingleFlight()
+    pending = Future()
+
+    first = flights.do('key', lambda: pending)
+    second = flights.do('key', lambda: pending)
+
+    pending.set_exception(RuntimeError('Lichess is down'))
+
+    for future in (first, second):
+        with pytest.raises(RuntimeError):
+            future.result()
+
+    assert len(flights) == 0
+    assert flights.collapsed == 1
+
+
+def test_do_start_error():
+    """Test a lookup that can't start fails and is forgotten."""
+    flights = SingleFlight()
+
+    def start():
+        raise RuntimeError('Lichess is down')
+
+    future = flights.do('key', start)
+    assert isinstance(future.exception(), RuntimeError)
+    assert len(flights) == 0
+
+
+def test_do_start_resolved():
+    """Test a lookup resolved while it starts, with the same key."""
+    flights = SingleFlight()
+    nested = []
+
+    def start():
+        # the lock must not be held while the lookup starts
+        nested.append(flights.do('key', lambda: Future()))
+        future = Future()
+        future.set_result(42)
+        return future
+
+    future = flights.do('key', start)
+    assert future.result() == 42
+    assert nested == [future]
+    assert flights.collapsed == 1
+    assert len(flights) == 0
@@ -0,0 +1,79 @@
+"""Test ``sopel_lichess.snapshot``."""
+from __future__ import generator_stop
+
+from sopel_lichess.models import Game, Puzzle
+from sopel_lichess.snapshot import Snapshot, normalize_channel
+
+
+class FakeClock:
+    """Clock moved forward by the tests."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_channel():
+    """Test a channel's name and its ID are normalized the same way."""
+    assert normalize_channel('King of the Hill') == normalize_channel(
+        'kingOfTheHill')
+    assert normalize_channel('Three-check') == normalize_channel('threeCheck')
+    assert normalize_channel('Top Rated') == normalize_channel('best')
+    assert normalize_channel('Blitz') == 'blitz'
+
+
+def test_due():
+    """Test a refresh is due once per interval."""
+    clock = FakeClock()
+    snapshot = Snapshot(interval=60, max_age=180, clock=clock)
+
+    assert snapshot.due()
+    assert not snapshot.due(), 'Already started'
+
+    clock.now = 59
+    assert not snapshot.due()
+
+    clock.now = 60
+    assert snapshot.due()
+    assert snapshot.stats()['refreshes'] == 2
+
+
+def test_tv_game():
+    """Test getting a TV channel's game, until it is too old."""
+    clock = FakeClock()
+    snapshot = Snapshot(interval=60, max_age=180, clock=clock)
+    game = Game('abcdefgh')
+
+    assert snapshot.get_tv_game('blitz') is None
+
+    snapshot.set_tv({'Blitz': game, 'Top Rated': game})
+    assert snapshot.get_tv_game('blitz') is game
+    assert snapshot.get_tv_game('best') is game
+    assert snapshot.get_tv_game('bullet') is None
+
+    clock.now = 180
+    assert snapshot.get_tv_game('blitz') is None, 'Too old'
+
+    assert snapshot.stats() == {
+        'channels': 2,
+        'refreshes': 0,
+        'hits': 2,
+        'misses': 3,
+    }
+
+
+def test_puzzle():
+    """Test getting the daily puzzle, until it is too old."""
+    clock = FakeClock()
+    snapshot = Snapshot(interval=60, max_age=180, clock=clock)
+    puzzle = Puzzle('K69di')
+
+    assert snapshot.get_puzzle() is None
+
+    snapshot.set_puzzle(puzzle)
+    clock.now = 179
+    assert snapshot.get_puzzle() is puzzle
+
+    clock.now = 180
+    assert snapshot.get_puzzle() is None
@@ -0,0 +1,208 @@
+"""Test ``sopel_lichess.urls``."""
+from __future__ import generator_stop
+
+import re
+
+import pytest
+
+from sopel_lichess.urls import (BROADCAST_PATH_PATTERN, GAME_PATH_PATTERN,
+                                PLAYER_PATH_PATTERN, STUDY_PATH_PATTERN,
+                                TOURNAMENT_PATH_PATTERN, TV_PATH_PATTERN,
+                                Dispatcher, Link, parse_broadcast, parse_game,
+                                parse_player, parse_study, parse_tournament,
+                                parse_tv_channel, split_path)
+
+
+@pytest.fixture
+def dispatcher():
+    """Dispatcher fixture, with the plugin's kinds of link."""
+    dispatcher = Dispatcher()
+    dispatcher.register(
+        'player', parse_player, prefix='@', path=PLAYER_PATH_PATTERN)(print)
+    dispatcher.register('game', parse_game, path=GAME_PATH_PATTERN)(print)
+    dispatcher.register(
+        'tv', parse_tv_channel, prefix='tv', path=TV_PATH_PATTERN)(print)
+    dispatcher.register(
+        'tournament',
+        parse_tournament,
+        prefix='tournament',
+        path=TOURNAMENT_PATH_PATTERN,
+    )(print)
+    dispatcher.register(
+        'swiss', parse_tournament, prefix='swiss',
+        path=TOURNAMENT_PATH_PATTERN)(print)
+    dispatcher.register(
+        'study', parse_study, prefix='study', path=STUDY_PATH_PATTERN)(print)
+    dispatcher.register(
+        'broadcast', parse_broadcast, prefix='broadcast',
+        path=BROADCAST_PATH_PATTERN)(print)
+    return dispatcher
+
+
+def test_split_path():
+    """Test splitting the path of a Lichess URL."""
+    assert split_path('https://lichess.org/abcdefgh') == ['abcdefgh']
+    assert split_path('https://lichess.org/abcdefgh/') == ['abcdefgh']
+    assert split_path('http://www.lichess.org/@/bob/all') == [
+        '@', 'bob', 'all']
+    assert split_path('https://lichess.org/abcdefgh/black#12') == [
+        'abcdefgh', 'black']
+    assert split_path('https://lichess.org/tv/blitz?x=1') == ['tv', 'blitz']
+    assert split_path('https://lichess.org/abcdefgh).') == ['abcdefgh']
+    assert split_path('https://lichess.org/') == ['']
+    assert split_path('https://example.com/abcdefgh') is None
+    assert split_path('https://lichess.org.example.com/abcdefgh') is None
+
+
+@pytest.mark.parametrize('url, expected', (
+    ('https://lichess.org/abcdefgh', Link('game', 'abcdefgh')),
+    ('https://lichess.org/abcdefgh/', Link('game', 'abcdefgh')),
+    ('https://lichess.org/abcdefgh#1', Link('game', 'abcdefgh')),
+    ('https://lichess.org/abcdefgh/white',
+     Link('game', 'abcdefgh', 'white')),
+    ('https://lichess.org/abcdefgh/black#1',
+     Link('game', 'abcdefgh', 'black')),
+    ('https://lichess.org/@/Bob', Link('player', 'bob')),
+    ('https://lichess.org/@/Bob/all)', Link('player', 'bob')),
+    ('https://lichess.org/tv/blitz', Link('tv', 'blitz')),
+    ('https://lichess.org/tv/blitz/', Link('tv', 'blitz')),
+    ('https://lichess.org/tournament/abcd1234',
+     Link('tournament', 'abcd1234')),
+    ('https://lichess.org/swiss/abcd1234/', Link('swiss', 'abcd1234')),
+    ('https://lichess.org/study/abcdefgh', Link('study', 'abcdefgh')),
+    ('https://lichess.org/study/abcdefgh/ijklmnop#3',
+     Link('study', 'abcdefgh/ijklmnop', 'chapter')),
+    ('https://lichess.org/broadcast/tata-steel/abcdefgh',
+     Link('broadcast', 'abcdefgh')),
+    ('https://lichess.org/broadcast/tata-steel/round-1/abcdefgh',
+     Link('broadcast', 'abcdefgh', 'round')),
+    ('https://lichess.org/broadcast/tata-steel/round-1/abcdefgh/ijklmnop',
+     Link('broadcast', 'abcdefgh/ijklmnop', 'game')),
+    ('https://lichess.org/study', None),
+    ('https://lichess.org/study/abcdefgh/short', None),
+    ('https://lichess.org/broadcast/abcdefgh', None),
+    ('https://lichess.org/broadcast/tata-steel/round-1', None),
+    ('https://lichess.org/broadcast/tata-steel/round-1/short/ijklmnop', None),
+    ('https://lichess.org/broadcast/a/b/abcdefgh/ijklmnop/more', None),
+    ('https://lichess.org/tournament', None),
+    ('https://lichess.org/tournament/abc', None),
+    ('https://lichess.org/tournament/calendar', None),
+    ('https://lichess.org/broadcast/by/lichess1', None),
+    ('https://lichess.org/swiss/abcd1234/more', None),
+    ('https://lichess.org/something', None),
+    ('https://lichess.org/short', None),
+    ('https://lichess.org/abcd/fgh', None),
+    ('https://lichess.org/abcdefgh/red', None),
+    ('https://lichess.org/@/', None),
+    ('https://lichess.org/tv', None),
+    ('https://lichess.org/tv/blitz/more', None),
+    ('https://example.com/abcdefgh', None),
+))
+def test_classify(dispatcher, url, expected):
+    """Test classifying a URL into a link."""
+    assert dispatcher.classify(url) == expected
+
+
+def test_extract(dispatcher):
+    """Test extracting the links of a message, without duplicates."""
+    result = dispatcher.extract([
+        'https://lichess.org/abcdefgh',
+        'https://example.com/',
+        'https://lichess.org/@/bob',
+        'https://lichess.org/abcdefgh/black',
+        'https://lichess.org/@/Bob/all',
+        'https://lichess.org/12345678',
+    ])
+
+    assert result == [
+        Link('game', 'abcdefgh'),
+        Link('player', 'bob'),
+        Link('game', '12345678'),
+    ]
+
+
+def test_extract_max_links(dispatcher):
+    """Test extracting up to a maximum number of links."""
+    message_urls = [
+        'https://lichess.org/abcdefgh',
+        'https://lichess.org/abcdefgh/white',
+        'https://lichess.org/@/bob',
+        'https://lichess.org/12345678',
+    ]
+
+    assert dispatcher.extract(message_urls, 2) == [
+        Link('game', 'abcdefgh'),
+        Link('player', 'bob'),
+    ]
+    assert dispatcher.extract(message_urls, 0) == []
+
+
+def test_register_twice(dispatcher):
+    """Test a kind or a prefix can't be registered twice."""
+    with pytest.raises(ValueError):
+        dispatcher.register('game', parse_game, path=GAME_PATH_PATTERN)
+
+    with pytest.raises(ValueError):
+        dispatcher.register(
+            'other', parse_player, prefix='@', path=PLAYER_PATH_PATTERN)
+
+
+def test_register_handler(dispatcher):
+    """Test a handler is registered by kind of link."""
+    def parse_puzzle(segments):
+        return (segments[0], None) if len(segments) == 1 else None
+
+    @dispatcher.register(
+        'puzzle', parse_puzzle, prefix='training', path=r'[a-zA-Z0-9]{5}')
+    def handle_puzzle(link):
+        return link.id
+
+    assert dispatcher.handlers['puzzle'] is handle_puzzle
+    assert dispatcher.classify('https://lichess.org/training/abc12') == Link(
+        'puzzle', 'abc12')
+    assert re.match(
+        dispatcher.url_pattern(), 'https://lichess.org/training/abc12')
+    assert not re.match(
+        dispatcher.url_pattern(), 'https://lichess.org/training/themes')
+
+
+@pytest.mark.parametrize('url', (
+    'https://lichess.org/abcdefgh',
+    'https://lichess.org/abcdefgh/black#12',
+    'https://lichess.org/abcdefgh?x=1',
+    'https://lichess.org/abcdefgh).',
+    'http://www.lichess.org/@/bob/all',
+    'https://Lichess.org/tv/blitz',
+    'https://lichess.org/@/bob/',
+    'https://lichess.org/tv/blitz?x=1',
+    'https://lichess.org/tournament/abcd1234',
+    'https://lichess.org/swiss/abcd1234/',
+    'https://lichess.org/study/abcdefgh/12345678',
+    'https://lichess.org/broadcast/tata-steel/abcdefgh',
+    'https://lichess.org/broadcast/tata-steel/round-1/abcdefgh/ijklmnop',
+))
+def test_url_pattern(dispatcher, url):
+    """Test the pattern matches the URLs of the registered kinds."""
+    assert re.match(dispatcher.url_pattern(), url)
+
+
+@pytest.mark.parametrize('url', (
+    'https://lichess.org/',
+    'https://lichess.org/forum/general-chess-discussion',
+    'https://lichess.org/blog',
+    'https://lichess.org/abcdefghi',
+    'https://lichess.org/tv',
+    'https://lichess.org/abcdefgh/red',
+    'https://lichess.org/training/daily',
+    'https://lichess.org/study/all/popular',
+    'https://lichess.org/broadcast/calendar',
+    'https://lichess.org/broadcast/by/lichess1',
+    'https://lichess.org/tournament/calendar',
+    'https://lichess.org/tournament/abcd1234/more',
+    'https://example.com/abcdefgh',
+    'https://lichess.org.example.com/abcdefgh',
+))
+def test_url_pattern_unknown(dispatcher, url):
+    """Test the pattern doesn't match other URLs, Lichess or not."""
+    assert not re.match(dispatcher.url_pattern(), url)
+    assert dispatcher.classify(url) is None